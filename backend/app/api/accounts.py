@@ -1,23 +1,32 @@
 """
 账号管理 API
 """
+import logging
+import anyio
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Account, AccountGroup, SignLog, NotifyChannel, AccountNotify, ApiToken, User, AuditAction
+from app.models import (
+    Account, AccountGroup, SignLog, SignRetry, NotifyChannel, NotifyOutbox, AccountNotify, ApiToken, User, AuditAction
+)
 from app.schemas import (
     AccountCreate, AccountUpdate, AccountResponse, AccountInfo,
     LastSign, ApiResponse
 )
 from app.schemas.account import NotifyChannelBrief, HealthCheckResponse, GroupBrief, CreateTokenRequest
-from app.services import anyrouter_service
+from app.services import anyrouter_service, async_anyrouter_service
+from app.services.anyrouter import health_check_operations
 from app.services.audit import log_action
+from app.services.upstream_cache import upstream_cache
+from app.services.rate_limiter import lane, LANE_BULK
 from app.utils import format_quota, format_quota_percent
 from app.api.deps import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/accounts", tags=["账号管理"])
 
 
@@ -98,8 +107,9 @@ def create_account(
     current_user: User = Depends(get_current_user)
 ):
     """添加账号"""
-    # 验证 session_cookie 和 user_id
-    success, user_info = anyrouter_service.get_user_info(data.session_cookie, data.user_id)
+    # 验证 session_cookie 和 user_id，同一会话中顺带拉取 API Tokens
+    results = anyrouter_service.refresh_account(data.session_cookie, data.user_id, ("user_info", "tokens"))
+    success, user_info = results["user_info"]
 
     if not success:
         raise HTTPException(status_code=400, detail=user_info.get("message", "验证失败"))
@@ -137,7 +147,7 @@ def create_account(
     db.refresh(account)
 
     # 同步 API Tokens
-    sync_account_tokens(db, account)
+    sync_account_tokens(db, account, pages=results["tokens"][1]["pages"])
 
     # 记录审计日志
     log_action(
@@ -219,8 +229,9 @@ def update_account(
         user_id = data.user_id or str(account.anyrouter_user_id)
         session_cookie = data.session_cookie or account.session_cookie
 
-        # 验证新的凭证
-        success, user_info = anyrouter_service.get_user_info(session_cookie, user_id)
+        # 验证新的凭证，同一会话中顺带拉取新凭证下的 API Tokens
+        results = anyrouter_service.refresh_account(session_cookie, user_id, ("user_info", "tokens"))
+        success, user_info = results["user_info"]
         if not success:
             raise HTTPException(status_code=400, detail="凭证验证失败")
 
@@ -252,6 +263,9 @@ def update_account(
     account.updated_at = datetime.now()
     db.commit()
 
+    if "credentials" in changes:
+        sync_account_tokens(db, account, pages=results["tokens"][1]["pages"])
+
     # 记录审计日志
     log_action(
         db=db,
@@ -286,8 +300,10 @@ def delete_account(
     # 删除关联的推送配置
     db.query(AccountNotify).filter(AccountNotify.account_id == account_id).delete()
 
-    # 删除签到日志
+    # 删除签到日志与待重试记录
     db.query(SignLog).filter(SignLog.account_id == account_id).delete()
+    db.query(SignRetry).filter(SignRetry.account_id == account_id).delete()
+    db.query(NotifyOutbox).filter(NotifyOutbox.account_id == account_id).delete()
 
     # 删除账号
     db.delete(account)
@@ -420,51 +436,81 @@ def get_cached_account_info(account_id: int, db: Session = Depends(get_db)):
     )
 
 
-def sync_account_tokens(db: Session, account: Account) -> int:
+def _apply_token_data(token: ApiToken, token_data: dict, synced_at: str):
+    """将上游返回的 Token 字段写入本地记录"""
+    token.key = token_data.get("key")
+    token.name = token_data.get("name")
+    token.status = token_data.get("status", 1)
+    token.remain_quota = token_data.get("remain_quota", 0)
+    token.used_quota = token_data.get("used_quota", 0)
+    token.unlimited_quota = token_data.get("unlimited_quota", False)
+    token.model_limits_enabled = token_data.get("model_limits_enabled", False)
+    token.model_limits = token_data.get("model_limits")
+    token.created_time = token_data.get("created_time")
+    token.accessed_time = token_data.get("accessed_time")
+    token.expired_time = token_data.get("expired_time", -1)
+    token.synced_at = synced_at
+
+
+def sync_account_tokens(
+    db: Session,
+    account: Account,
+    pages: Optional[Iterable[Tuple[bool, dict]]] = None
+) -> int:
     """
     同步账号的 API Tokens
 
+    分页并发拉取，每到一页即按 token_id 增量写入；全部页拉取成功后才删除上游已不存在的 Token，
+    中途失败时保留已有数据，不会因列表不完整而误删
+
+    Args:
+        db: 数据库会话
+        account: 账号对象
+        pages: 已拉取的分页结果（组合刷新中 tokens 操作的 pages），为空时实时拉取
+
     Returns:
         int: 同步的 token 数量
     """
     if not account.anyrouter_user_id:
         return 0
 
-    success, result = anyrouter_service.get_tokens(
-        account.session_cookie,
-        str(account.anyrouter_user_id)
-    )
+    existing = {
+        token.token_id: token
+        for token in db.query(ApiToken).filter(ApiToken.account_id == account.id).all()
+    }
+    seen = set()
+    synced_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    complete = True
 
-    if not success:
-        return 0
-
-    tokens = result.get("tokens", [])
-
-    # 删除旧的 tokens
-    db.query(ApiToken).filter(ApiToken.account_id == account.id).delete()
+    if pages is None:
+        pages = anyrouter_service.iter_token_pages(account.session_cookie, str(account.anyrouter_user_id))
 
-    # 添加新的 tokens
-    for token_data in tokens:
-        token = ApiToken(
-            account_id=account.id,
-            token_id=token_data.get("id"),
-            key=token_data.get("key"),
-            name=token_data.get("name"),
-            status=token_data.get("status", 1),
-            remain_quota=token_data.get("remain_quota", 0),
-            used_quota=token_data.get("used_quota", 0),
-            unlimited_quota=token_data.get("unlimited_quota", False),
-            model_limits_enabled=token_data.get("model_limits_enabled", False),
-            model_limits=token_data.get("model_limits"),
-            created_time=token_data.get("created_time"),
-            accessed_time=token_data.get("accessed_time"),
-            expired_time=token_data.get("expired_time", -1),
-            synced_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        )
-        db.add(token)
+    for success, result in pages:
+        if not success:
+            logger.warning(f"账号 {account.id} Token 同步中断: {result.get('message')}")
+            complete = False
+            break
+
+        for token_data in result.get("tokens", []):
+            token_id = token_data.get("id")
+            if token_id in seen:
+                continue
+            seen.add(token_id)
+            token = existing.get(token_id)
+            if token is None:
+                token = ApiToken(account_id=account.id, token_id=token_id)
+                db.add(token)
+                existing[token_id] = token
+            _apply_token_data(token, token_data, synced_at)
+        db.flush()
+
+    if complete:
+        for token_id, token in existing.items():
+            if token_id not in seen:
+                db.delete(token)
 
     db.commit()
-    return len(tokens)
+    return len(seen)
 
 
 @router.get("/{account_id}/tokens", response_model=ApiResponse)
@@ -503,6 +549,61 @@ def sync_tokens(account_id: int, db: Session = Depends(get_db)):
     )
 
 
+def apply_account_health(account: Account, success: bool, user_info: dict, now: datetime):
+    """
+    根据用户信息请求结果更新账号健康状态与缓存字段（不提交）
+
+    Args:
+        account: 账号对象
+        success: 获取用户信息是否成功
+        user_info: 用户信息或错误消息
+        now: 检查时间
+    """
+    if success:
+        account.health_status = "healthy"
+        account.health_message = None
+        # 顺便更新用户名
+        if user_info.get("username"):
+            account.username = user_info.get("username")
+        if user_info.get("display_name"):
+            account.display_name = user_info.get("display_name")
+        # 更新所有缓存字段
+        account.cached_quota = user_info.get("quota", 0)
+        account.cached_used_quota = user_info.get("used_quota", 0)
+        account.cached_request_count = user_info.get("request_count", 0)
+        account.cached_user_group = user_info.get("group", "default")
+        account.cached_aff_code = user_info.get("aff_code")
+        account.cached_aff_count = user_info.get("aff_count", 0)
+        account.cached_aff_history_quota = user_info.get("aff_history_quota", 0)
+        account.quota_updated_at = now
+    else:
+        account.health_status = "unhealthy"
+        account.health_message = user_info.get("message", "凭证验证失败")
+
+    account.last_health_check = now
+
+
+def apply_refreshed_user_info(account: Account, results: dict):
+    """
+    组合刷新结果中包含成功的用户信息时，更新账号缓存字段与健康状态（不提交）；
+    只有签到成功时也计为一次健康检查（凭证有效）
+
+    Args:
+        account: 账号对象
+        results: refresh_account 的返回值
+    """
+    success, user_info = results.get("user_info", (False, {}))
+    if success:
+        apply_account_health(account, True, user_info, datetime.now())
+        return
+
+    sign_success, sign_result = results.get("sign_in", (False, {}))
+    if sign_success and sign_result.get("success", False):
+        account.health_status = "healthy"
+        account.health_message = None
+        account.last_health_check = datetime.now()
+
+
 def check_account_health(db: Session, account: Account) -> HealthCheckResponse:
     """
     检查单个账号的健康状态
@@ -528,35 +629,19 @@ def check_account_health(db: Session, account: Account) -> HealthCheckResponse:
             checked_at=now
         )
 
-    # 尝试获取用户信息来验证凭证
-    success, user_info = anyrouter_service.get_user_info(
+    # 尝试获取用户信息来验证凭证（按配置在同一会话中同步 Tokens）
+    operations = health_check_operations()
+    results = anyrouter_service.refresh_account(
         account.session_cookie,
-        str(account.anyrouter_user_id)
+        str(account.anyrouter_user_id),
+        operations
     )
+    success, user_info = results["user_info"]
 
-    if success:
-        account.health_status = "healthy"
-        account.health_message = None
-        # 顺便更新用户名
-        if user_info.get("username"):
-            account.username = user_info.get("username")
-        if user_info.get("display_name"):
-            account.display_name = user_info.get("display_name")
-        # 更新所有缓存字段
-        account.cached_quota = user_info.get("quota", 0)
-        account.cached_used_quota = user_info.get("used_quota", 0)
-        account.cached_request_count = user_info.get("request_count", 0)
-        account.cached_user_group = user_info.get("group", "default")
-        account.cached_aff_code = user_info.get("aff_code")
-        account.cached_aff_count = user_info.get("aff_count", 0)
-        account.cached_aff_history_quota = user_info.get("aff_history_quota", 0)
-        account.quota_updated_at = now
-    else:
-        account.health_status = "unhealthy"
-        account.health_message = user_info.get("message", "凭证验证失败")
-
-    account.last_health_check = now
+    apply_account_health(account, success, user_info, now)
     db.commit()
+    if success and "tokens" in operations:
+        sync_account_tokens(db, account, pages=results["tokens"][1]["pages"])
 
     return HealthCheckResponse(
         account_id=account.id,
@@ -583,23 +668,57 @@ def health_check_account(account_id: int, db: Session = Depends(get_db)):
     )
 
 
+async def _refresh_accounts_bulk(credentials: list, operations: tuple) -> list:
+    """在应用事件循环上以批量通道并发执行组合刷新"""
+    with lane(LANE_BULK):
+        return await async_anyrouter_service.refresh_accounts(credentials, operations)
+
+
 @router.post("/health-check/all", response_model=ApiResponse)
 def health_check_all_accounts(db: Session = Depends(get_db)):
-    """对所有启用的账号执行健康检查"""
+    """
+    对所有启用的账号执行健康检查
+
+    路由在线程池中运行（数据库操作不阻塞事件循环），上游请求交给应用事件循环上的异步客户端并发执行
+    """
     accounts = db.query(Account).filter(Account.is_active == True).all()
 
+    # 缺少 user_id 的账号无需请求远程
+    checkable = [a for a in accounts if a.anyrouter_user_id]
+    operations = health_check_operations()
+    refreshed = anyio.from_thread.run(
+        _refresh_accounts_bulk,
+        [(a.session_cookie, str(a.anyrouter_user_id)) for a in checkable],
+        operations
+    )
+    info_map = {a.id: outcome["user_info"] for a, outcome in zip(checkable, refreshed)}
+
     results = []
     healthy_count = 0
     unhealthy_count = 0
+    now = datetime.now()
 
     for account in accounts:
-        result = check_account_health(db, account)
-        results.append(result.model_dump())
-        if result.health_status == "healthy":
+        success, user_info = info_map.get(account.id, (False, {"message": "缺少 user_id"}))
+        apply_account_health(account, success, user_info, now)
+        results.append(HealthCheckResponse(
+            account_id=account.id,
+            health_status=account.health_status,
+            health_message=account.health_message,
+            checked_at=now
+        ).model_dump())
+        if account.health_status == "healthy":
             healthy_count += 1
         else:
             unhealthy_count += 1
 
+    db.commit()
+
+    if "tokens" in operations:
+        for account, outcome in zip(checkable, refreshed):
+            if outcome["user_info"][0]:
+                sync_account_tokens(db, account, pages=outcome["tokens"][1]["pages"])
+
     return ApiResponse(
         success=True,
         message=f"健康检查完成: {healthy_count} 个健康, {unhealthy_count} 个异常",
@@ -648,8 +767,8 @@ def create_account_token(account_id: int, data: CreateTokenRequest, db: Session
 
 
 @router.get("/{account_id}/models", response_model=ApiResponse)
-def get_account_models(account_id: int, db: Session = Depends(get_db)):
-    """获取账号可用的模型列表"""
+def get_account_models(account_id: int, refresh: bool = False, db: Session = Depends(get_db)):
+    """获取账号可用的模型列表（同用户组账号共享缓存，refresh=true 时强制刷新）"""
     account = db.query(Account).filter(Account.id == account_id).first()
 
     if not account:
@@ -658,9 +777,11 @@ def get_account_models(account_id: int, db: Session = Depends(get_db)):
     if not account.anyrouter_user_id:
         raise HTTPException(status_code=400, detail="账号缺少 user_id")
 
-    success, result = anyrouter_service.get_models(
+    success, result = upstream_cache.get_models(
         account.session_cookie,
-        str(account.anyrouter_user_id)
+        str(account.anyrouter_user_id),
+        user_group=account.cached_user_group,
+        force_refresh=refresh
     )
 
     if not success:
@@ -673,8 +794,8 @@ def get_account_models(account_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{account_id}/groups", response_model=ApiResponse)
-def get_account_groups(account_id: int, db: Session = Depends(get_db)):
-    """获取账号可用的分组列表（AnyRouter 平台分组）"""
+def get_account_groups(account_id: int, refresh: bool = False, db: Session = Depends(get_db)):
+    """获取账号可用的分组列表（AnyRouter 平台分组，同用户组账号共享缓存，refresh=true 时强制刷新）"""
     account = db.query(Account).filter(Account.id == account_id).first()
 
     if not account:
@@ -683,9 +804,11 @@ def get_account_groups(account_id: int, db: Session = Depends(get_db)):
     if not account.anyrouter_user_id:
         raise HTTPException(status_code=400, detail="账号缺少 user_id")
 
-    success, result = anyrouter_service.get_groups(
+    success, result = upstream_cache.get_groups(
         account.session_cookie,
-        str(account.anyrouter_user_id)
+        str(account.anyrouter_user_id),
+        user_group=account.cached_user_group,
+        force_refresh=refresh
     )
 
     if not success:
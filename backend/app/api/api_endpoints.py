@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import ApiEndpoint
 from app.schemas import ApiResponse
-from app.services.anyrouter import anyrouter_service
+from app.services.upstream_cache import upstream_cache
 
 router = APIRouter(prefix="/api-endpoints", tags=["API节点"])
 
@@ -23,9 +23,9 @@ def get_endpoints(db: Session = Depends(get_db)):
 
 
 @router.post("/sync", response_model=ApiResponse)
-def sync_endpoints(db: Session = Depends(get_db)):
-    """从 AnyRouter 同步 API 节点信息"""
-    success, data = anyrouter_service.get_api_status()
+def sync_endpoints(refresh: bool = False, db: Session = Depends(get_db)):
+    """从 AnyRouter 同步 API 节点信息（节点状态有短时缓存，refresh=true 时强制刷新）"""
+    success, data = upstream_cache.get_api_status(force_refresh=refresh)
 
     if not success:
         raise HTTPException(status_code=500, detail=data.get("message", "同步失败"))
@@ -71,6 +71,7 @@ def export_backup(
             "name": ch.name,
             "config": ch.config,
             "is_enabled": ch.is_enabled,
+            "delivery_mode": ch.delivery_mode,
         })
 
     # 导出账号-推送关联
@@ -187,6 +188,7 @@ async def import_backup(
                         existing.type = ch["type"]
                         existing.config = ch["config"]
                         existing.is_enabled = ch["is_enabled"]
+                        existing.delivery_mode = ch.get("delivery_mode") or "immediate"
                         channel_id_map[old_id] = existing.id
                         imported_counts["notify_channels"] += 1
                     else:
@@ -197,6 +199,7 @@ async def import_backup(
                         name=ch["name"],
                         config=ch["config"],
                         is_enabled=ch["is_enabled"],
+                        delivery_mode=ch.get("delivery_mode") or "immediate",
                     )
                     db.add(new_channel)
                     db.flush()  # 获取新 ID
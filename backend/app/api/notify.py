@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import NotifyChannel, AccountNotify, User, AuditAction
+from app.models import NotifyChannel, AccountNotify, NotifyOutbox, User, AuditAction
 from app.schemas import (
     NotifyChannelCreate, NotifyChannelUpdate, NotifyChannelResponse,
     AccountNotifyResponse, AccountNotifyUpdate,
@@ -15,11 +15,19 @@ from app.schemas import (
 )
 from app.services import NotifyFactory
 from app.services.audit import log_action
+from app.services.notify_outbox import (
+    notify_dispatcher, STATUS_PENDING, STATUS_DEAD, DELIVERY_IMMEDIATE, DELIVERY_MODES
+)
 from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/notify", tags=["推送管理"])
 
 
+def _check_delivery_mode(mode: str):
+    if mode not in DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的发送方式，支持: {', '.join(DELIVERY_MODES)}")
+
+
 @router.get("/channels", response_model=ApiResponse)
 def get_channels(db: Session = Depends(get_db)):
     """获取所有推送渠道"""
@@ -42,6 +50,7 @@ def get_channels(db: Session = Depends(get_db)):
             name=channel.name,
             config=safe_config,
             is_enabled=channel.is_enabled,
+            delivery_mode=channel.delivery_mode or DELIVERY_IMMEDIATE,
             created_at=channel.created_at,
             updated_at=channel.updated_at
         ))
@@ -64,11 +73,13 @@ def create_channel(
             status_code=400,
             detail=f"不支持的渠道类型，支持: {', '.join(supported_types)}"
         )
+    _check_delivery_mode(data.delivery_mode)
 
     channel = NotifyChannel(
         type=data.type,
         name=data.name,
-        config=json.dumps(data.config)
+        config=json.dumps(data.config),
+        delivery_mode=data.delivery_mode
     )
 
     db.add(channel)
@@ -134,6 +145,12 @@ def update_channel(
             changes["is_enabled"] = f"{channel.is_enabled} -> {data.is_enabled}"
         channel.is_enabled = data.is_enabled
 
+    if data.delivery_mode is not None:
+        _check_delivery_mode(data.delivery_mode)
+        if channel.delivery_mode != data.delivery_mode:
+            changes["delivery_mode"] = f"{channel.delivery_mode} -> {data.delivery_mode}"
+        channel.delivery_mode = data.delivery_mode
+
     channel.updated_at = datetime.now()
     db.commit()
 
@@ -169,8 +186,9 @@ def delete_channel(
     channel_name = channel.name
     channel_type = channel.type
 
-    # 删除关联配置
+    # 删除关联配置与发件箱中的通知
     db.query(AccountNotify).filter(AccountNotify.channel_id == channel_id).delete()
+    db.query(NotifyOutbox).filter(NotifyOutbox.channel_id == channel_id).delete()
 
     db.delete(channel)
     db.commit()
@@ -259,3 +277,61 @@ def update_account_notify(account_id: int, data: AccountNotifyUpdate, db: Sessio
     db.commit()
 
     return ApiResponse(success=True, message="推送配置更新成功")
+
+
+@router.get("/outbox", response_model=ApiResponse)
+def get_outbox(status: str = None, page: int = 1, size: int = 20, db: Session = Depends(get_db)):
+    """获取通知发件箱（投递状态与失败原因）"""
+    query = db.query(NotifyOutbox, NotifyChannel.name).outerjoin(
+        NotifyChannel, NotifyChannel.id == NotifyOutbox.channel_id
+    )
+    if status:
+        query = query.filter(NotifyOutbox.status == status)
+
+    total = query.count()
+    rows = query.order_by(NotifyOutbox.id.desc()).offset((page - 1) * size).limit(size).all()
+    items = [
+        {
+            "id": entry.id,
+            "channel_id": entry.channel_id,
+            "channel_name": channel_name,
+            "account_id": entry.account_id,
+            "kind": entry.kind,
+            "title": entry.title,
+            "status": entry.status,
+            "attempts": entry.attempts,
+            "next_attempt_at": entry.next_attempt_at,
+            "last_error": entry.last_error,
+            "created_at": entry.created_at,
+            "sent_at": entry.sent_at
+        }
+        for entry, channel_name in rows
+    ]
+
+    return ApiResponse(success=True, data={
+        "items": items,
+        "total": total,
+        "page": page,
+        "size": size,
+        "stats": notify_dispatcher.get_stats(db)
+    })
+
+
+@router.post("/outbox/{entry_id}/retry", response_model=ApiResponse)
+def retry_outbox_entry(entry_id: int, db: Session = Depends(get_db)):
+    """重新发送已放弃（dead）的通知"""
+    entry = db.query(NotifyOutbox).filter(NotifyOutbox.id == entry_id).first()
+
+    if not entry:
+        raise HTTPException(status_code=404, detail="通知不存在")
+
+    if entry.status != STATUS_DEAD:
+        raise HTTPException(status_code=400, detail="只能重发已放弃的通知")
+
+    entry.status = STATUS_PENDING
+    entry.attempts = 0
+    entry.next_attempt_at = datetime.now()
+    db.commit()
+    notify_dispatcher.wake()
+
+    return ApiResponse(success=True, message="已重新加入发送队列")
@@ -3,13 +3,15 @@
 """
 import json
 from datetime import datetime
-from fastapi import APIRouter, Depends, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models import Setting, User, AuditAction
 from app.schemas import ApiResponse, SettingsResponse, SettingsUpdate
 from app.services.scheduler import update_sign_schedule, update_health_check_schedule
+from app.services.job_runs import get_job_runs, get_job_run_summary, JOB_NAMES
 from app.services.audit import log_action
 from app.api.deps import get_current_user
 
@@ -21,9 +23,17 @@ DEFAULT_SETTINGS = {
     "auto_sign_time": "08:00",
     "health_check_enabled": True,
     "health_check_interval": 6,
+    "health_check_batch_size": 50,
     "sign_retry_enabled": True,
     "sign_max_retries": 3,
-    "sign_retry_interval": 30
+    "sign_retry_interval": 30,
+    "sign_prewarm_enabled": False,
+    "sign_prewarm_minutes": 5,
+    "sign_engine_mode": "thread",
+    "sign_concurrency": 4,
+    "sign_window_minutes": 0,
+    "sign_wave_size": 20,
+    "sign_jitter_seconds": 0
 }
 
 
@@ -82,8 +92,10 @@ def update_settings(
 
     db.commit()
 
-    # 更新签到定时任务
-    if "auto_sign_enabled" in update_data or "auto_sign_time" in update_data:
+    # 更新签到定时任务（含签到前预热）
+    if update_data.keys() & {
+        "auto_sign_enabled", "auto_sign_time", "sign_prewarm_enabled", "sign_prewarm_minutes", "sign_window_minutes"
+    }:
         update_sign_schedule()
 
     # 更新健康检查定时任务
@@ -107,7 +119,9 @@ def update_settings(
 @router.get("/scheduler", response_model=ApiResponse)
 def get_scheduler_status(db: Session = Depends(get_db)):
     """获取调度器状态"""
-    from app.services.scheduler import scheduler
+    from app.services.scheduler import (
+        scheduler, last_prewarm, sign_progress, get_sign_wave_schedule, SIGN_PREWARM_JOB_PREFIX
+    )
 
     enabled = get_setting(db, "auto_sign_enabled", False)
     sign_time = get_setting(db, "auto_sign_time", "08:00")
@@ -117,9 +131,36 @@ def get_scheduler_status(db: Session = Depends(get_db)):
     if job and job.next_run_time:
         next_run = job.next_run_time.strftime("%Y-%m-%d %H:%M:%S")
 
+    # 签到窗口进行中时，各波次的预热任务也计入
+    prewarm_runs = [
+        job.next_run_time for job in scheduler.get_jobs()
+        if (job.id == "sign_prewarm" or job.id.startswith(SIGN_PREWARM_JOB_PREFIX)) and job.next_run_time
+    ]
+    prewarm_next_run = min(prewarm_runs).strftime("%Y-%m-%d %H:%M:%S") if prewarm_runs else None
+
     return ApiResponse(success=True, data={
         "enabled": enabled,
         "sign_time": sign_time,
         "next_run": next_run,
-        "running": scheduler.running
+        "running": scheduler.running,
+        "prewarm": {
+            "next_run": prewarm_next_run,
+            "last_run": last_prewarm
+        },
+        "progress": sign_progress,
+        "window_minutes": get_setting(db, "sign_window_minutes", 0),
+        "waves": get_sign_wave_schedule(db),
+        "job_runs": get_job_run_summary(db)
+    })
+
+
+@router.get("/scheduler/runs", response_model=ApiResponse)
+def get_scheduler_runs(job: Optional[str] = None, days: int = 7, limit: int = 500, db: Session = Depends(get_db)):
+    """获取调度任务运行历史（耗时、账号数、上游请求数、单账号耗时 p50/p95）"""
+    if job is not None and job not in JOB_NAMES:
+        raise HTTPException(status_code=400, detail=f"未知的任务，支持: {', '.join(JOB_NAMES)}")
+
+    return ApiResponse(success=True, data={
+        "items": get_job_runs(db, job, days=max(1, min(days, 90)), limit=max(1, min(limit, 2000))),
+        "jobs": JOB_NAMES
     })
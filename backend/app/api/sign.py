@@ -1,51 +1,46 @@
 """
 签到 API
 """
-import json
 import re
 from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Account, SignLog, NotifyChannel, AccountNotify
+from app.models import Account, SignLog, SignRetry
 from app.schemas import (
     SignResult, SignLogResponse, BatchSignResult, BatchSignResponse, ApiResponse
 )
-from app.services import anyrouter_service, NotifyFactory
+from app.services import anyrouter_service
+from app.services.anyrouter import sign_operations
+from app.api.accounts import apply_refreshed_user_info
+from app.services.rate_limiter import in_lane, LANE_BULK
+from app.services.sign_retry import get_retry_queue, flush_sign_retries
+from app.services.signed_today import signed_today
+from app.services.notify import DigestItem
+from app.services.notify_outbox import notify_dispatcher, enqueue_account_notification, NotifyDigest, KIND_SIGN
 from app.utils import format_quota
 from app.config import settings
 
 router = APIRouter(tags=["签到"])
 
 
-def send_notifications(db: Session, account: Account, title: str, content: str):
-    """发送推送通知"""
-    # 获取账号关联的推送渠道
-    notify_configs = db.query(AccountNotify, NotifyChannel).join(
-        NotifyChannel, NotifyChannel.id == AccountNotify.channel_id
-    ).filter(
-        AccountNotify.account_id == account.id,
-        AccountNotify.is_enabled == True,
-        NotifyChannel.is_enabled == True
-    ).all()
-
-    for account_notify, channel in notify_configs:
-        try:
-            config = json.loads(channel.config)
-            account_config = json.loads(account_notify.notify_config) if account_notify.notify_config else {}
-            # 合并配置：账号配置优先，渠道配置作为后备
-            merged_config = {**config, **account_config}
-
-            notifier = NotifyFactory.create(channel.type, config)
-            notifier.send(title, content, merged_config)
-        except Exception as e:
-            pass  # 静默失败，不影响主流程
+def send_notifications(
+    db: Session,
+    account: Account,
+    title: str,
+    content: str,
+    item: Optional[DigestItem] = None,
+    digest: Optional[NotifyDigest] = None
+):
+    """将推送通知写入发件箱（随签到日志一起提交，由后台投递，不阻塞接口响应；汇总渠道收集到 digest）"""
+    enqueue_account_notification(db, account, KIND_SIGN, title, content, item=item, digest=digest)
 
 
 @router.post("/accounts/{account_id}/sign", response_model=ApiResponse)
-def sign_account(account_id: int, db: Session = Depends(get_db)):
-    """单账号签到"""
+def sign_account(account_id: int, force: bool = False, db: Session = Depends(get_db)):
+    """单账号签到（今日已签到时不请求上游，force=true 时强制签到）"""
     account = db.query(Account).filter(Account.id == account_id).first()
 
     if not account:
@@ -57,11 +52,27 @@ def sign_account(account_id: int, db: Session = Depends(get_db)):
     if not account.anyrouter_user_id:
         raise HTTPException(status_code=400, detail="账号缺少 user_id")
 
-    # 执行签到
-    success, result = anyrouter_service.sign_in(
+    if not force and signed_today.contains(account.id):
+        return ApiResponse(
+            success=True,
+            message="今日已签到",
+            data=SignResult(
+                reward_quota=0,
+                reward_display=format_quota(0),
+                message="今日已签到",
+                sign_time=datetime.now(),
+                status="already_signed"
+            )
+        )
+
+    # 执行签到，并在同一会话中刷新额度
+    refreshed = anyrouter_service.refresh_account(
         account.session_cookie,
-        str(account.anyrouter_user_id)
+        str(account.anyrouter_user_id),
+        sign_operations()
     )
+    success, result = refreshed["sign_in"]
+    apply_refreshed_user_info(account, refreshed)
 
     sign_success = success and result.get("success", False)
     message = result.get("message", "")
@@ -96,7 +107,6 @@ def sign_account(account_id: int, db: Session = Depends(get_db)):
         status=log_status
     )
     db.add(log)
-    db.commit()
 
     # 发送通知（已签到的不发通知）
     if sign_success and not already_signed:
@@ -108,6 +118,11 @@ def sign_account(account_id: int, db: Session = Depends(get_db)):
         content = f"原因: {message}"
         send_notifications(db, account, title, content)
 
+    db.commit()
+    notify_dispatcher.wake()
+    if sign_success:
+        signed_today.mark(account.id)
+
     # 返回结果
     if already_signed:
         return_message = "今日已签到"
@@ -133,8 +148,9 @@ def sign_account(account_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/sign/batch", response_model=ApiResponse)
-def batch_sign(db: Session = Depends(get_db)):
-    """批量签到所有启用账号"""
+@in_lane(LANE_BULK)
+def batch_sign(force: bool = False, db: Session = Depends(get_db)):
+    """批量签到所有启用账号（今日已签到的账号不请求上游，force=true 时全部签到）"""
     accounts = db.query(Account).filter(
         Account.is_active == True,
         Account.anyrouter_user_id.isnot(None)
@@ -144,12 +160,30 @@ def batch_sign(db: Session = Depends(get_db)):
     success_count = 0
     fail_count = 0
     already_signed_count = 0
+    unsigned = set(signed_today.unsigned(account.id for account in accounts)) if not force else None
+    digest = NotifyDigest(KIND_SIGN, "批量签到")
+    # 签到成功的账号在日志提交后再记入今日已签到
+    signed_ids = []
 
     for account in accounts:
-        success, result = anyrouter_service.sign_in(
+        if unsigned is not None and account.id not in unsigned:
+            already_signed_count += 1
+            results.append(BatchSignResult(
+                account_id=account.id,
+                username=account.username or "",
+                success=True,
+                message="今日已签到"
+            ))
+            continue
+
+        # 执行签到，并在同一会话中刷新额度
+        refreshed = anyrouter_service.refresh_account(
             account.session_cookie,
-            str(account.anyrouter_user_id)
+            str(account.anyrouter_user_id),
+            sign_operations()
         )
+        success, result = refreshed["sign_in"]
+        apply_refreshed_user_info(account, refreshed)
         sign_success = success and result.get("success", False)
         message = result.get("message", "")
         reward_quota = 0
@@ -182,19 +216,22 @@ def batch_sign(db: Session = Depends(get_db)):
             status=log_status
         )
         db.add(log)
+        if sign_success:
+            signed_ids.append(account.id)
 
         # 发送通知（已签到的不发通知）
         if sign_success and not already_signed:
             title = f"{account.username} 签到成功"
             content = f"获得 {format_quota(reward_quota)}"
-            send_notifications(db, account, title, content)
+            item = DigestItem(account.username, True, message, format_quota(reward_quota))
+            send_notifications(db, account, title, content, item=item, digest=digest)
             success_count += 1
         elif already_signed:
             already_signed_count += 1
         else:
             title = f"{account.username} 签到失败"
             content = f"原因: {message}"
-            send_notifications(db, account, title, content)
+            send_notifications(db, account, title, content, item=DigestItem(account.username, False, message), digest=digest)
             fail_count += 1
 
         # 结果消息
@@ -212,7 +249,10 @@ def batch_sign(db: Session = Depends(get_db)):
             message=result_message
         ))
 
+    digest.flush(db)
     db.commit()
+    signed_today.mark_all(signed_ids)
+    notify_dispatcher.wake()
 
     return ApiResponse(
         success=True,
@@ -227,6 +267,38 @@ def batch_sign(db: Session = Depends(get_db)):
     )
 
 
+@router.get("/sign/retries", response_model=ApiResponse)
+def get_sign_retries(db: Session = Depends(get_db)):
+    """获取签到重试队列"""
+    items = get_retry_queue(db)
+    return ApiResponse(success=True, data={
+        "items": items,
+        "total": len(items),
+        "claimed": sum(1 for item in items if item["claimed"])
+    })
+
+
+@router.post("/sign/retries/run", response_model=ApiResponse)
+def run_sign_retries(account_id: int = None, db: Session = Depends(get_db)):
+    """立即执行等待中的重试（由重试轮询任务在下一轮领取）"""
+    count = flush_sign_retries(db, account_id)
+    return ApiResponse(success=True, message=f"已提前 {count} 个账号的重试", data={"count": count})
+
+
+@router.delete("/sign/retries/{account_id}", response_model=ApiResponse)
+def delete_sign_retry(account_id: int, db: Session = Depends(get_db)):
+    """将账号移出签到重试队列"""
+    entry = db.query(SignRetry).filter(SignRetry.account_id == account_id).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="该账号不在重试队列中")
+    if entry.claimed_at is not None:
+        raise HTTPException(status_code=409, detail="该账号正在重试中")
+
+    db.delete(entry)
+    db.commit()
+    return ApiResponse(success=True, message="已移出重试队列")
+
+
 @router.get("/sign-logs", response_model=ApiResponse)
 def get_all_sign_logs(
     page: int = 1,
@@ -0,0 +1,51 @@
+"""
+上游请求状态 API
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models import Account
+from app.schemas import ApiResponse
+from app.services.anyrouter import anyrouter_service
+from app.services.egress import egress_pool
+from app.services.upstream_cache import upstream_cache
+
+router = APIRouter(prefix="/upstream", tags=["上游状态"])
+
+
+@router.get("/stats", response_model=ApiResponse)
+def get_upstream_stats():
+    """获取上游请求统计（连接池复用、握手次数、数据缓存命中等）"""
+    data = anyrouter_service.get_stats()
+    data["data_cache"] = upstream_cache.get_stats()
+    return ApiResponse(success=True, data=data)
+
+
+@router.get("/egress", response_model=ApiResponse)
+def get_egress_status(db: Session = Depends(get_db)):
+    """获取各出口的健康状态、吞吐与账号分配"""
+    data = egress_pool.get_stats()
+    accounts = db.query(Account.id, Account.username, Account.anyrouter_user_id).order_by(Account.id).all()
+    data["assignments"] = [
+        {
+            "account_id": account.id,
+            "username": account.username,
+            "anyrouter_user_id": account.anyrouter_user_id,
+            **egress_pool.assignment(str(account.anyrouter_user_id))
+        }
+        for account in accounts
+    ]
+    return ApiResponse(success=True, data=data)
+
+
+@router.delete("/cache", response_model=ApiResponse)
+def invalidate_upstream_cache(kind: Optional[str] = None, user_group: Optional[str] = None):
+    """使模型 / 分组 / API 状态缓存失效"""
+    if kind is not None and kind not in upstream_cache.KINDS:
+        raise HTTPException(status_code=400, detail=f"不支持的缓存类型: {kind}")
+
+    count = upstream_cache.invalidate(kind, user_group)
+    return ApiResponse(success=True, message=f"已清除 {count} 条缓存")
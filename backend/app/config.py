@@ -60,11 +60,91 @@ class Settings(BaseSettings):
         22, 23, 25, 13, 6, 11, 39, 18, 20, 8, 14, 21, 32, 26,
         2, 30, 7, 4, 17, 5, 3, 28, 34, 37, 12, 36
     ]
+    anti_crawler_cache_size: int = 256  # 按 arg1 缓存的求解结果数量
 
     # ============ 请求配置（不变配置）============
     request_timeout: int = 30
     retry_times: int = 3
     retry_interval: int = 3
+    retry_budget_ratio: float = 0.2    # 滑动窗口内重试次数占请求次数的上限比例
+    retry_budget_min: int = 10         # 滑动窗口内至少允许的重试次数
+    retry_budget_window: int = 60      # 重试预算滑动窗口（秒）
+
+    # ============ 连接池配置 ============
+    http_pool_size: int = 8            # Session 池大小（最多同时借出的 Session 数）
+    http_pool_maxsize: int = 10        # 每个 Session 对单个主机的最大连接数
+    http_pool_connections: int = 4     # 每个 Session 缓存的主机连接池数量
+    http_pool_acquire_timeout: float = 30.0  # 池满时等待空闲 Session 的最长秒数，超时按连接失败重试
+    async_pool_limit: int = 100        # 异步客户端总连接数上限
+    async_pool_limit_per_host: int = 50  # 异步客户端单主机连接数上限
+    async_concurrency: int = 20        # 批量异步操作的最大并发账号数
+    token_page_size: int = 50          # Token 列表分页大小
+    token_fetch_concurrency: int = 4   # 同一账号同时请求的 Token 分页数
+    sign_refresh_user_info: bool = True  # 签到后在同一会话中刷新用户信息（额度缓存）
+    health_check_sync_tokens: bool = False  # 健康检查时在同一会话中同步 API Tokens
+    health_check_tick_minutes: int = 5  # 滚动健康检查的轮询间隔（分钟）
+    sign_prewarm_concurrency: int = 10  # 签到前预热 Cookie 的最大并发账号数
+    sign_log_chunk_size: int = 50      # 自动签到每完成多少个账号提交一次签到日志并报告进度
+    sign_retry_poll_interval: int = 30  # 签到重试队列的轮询间隔（秒）
+    sign_retry_batch_size: int = 100   # 每次从重试队列领取的最大账号数
+    sign_retry_max_backoff: int = 360  # 重试退避的上限（分钟）
+    sign_retry_jitter: float = 0.2     # 重试时间的随机抖动比例
+    job_run_retention_days: int = 30   # 调度任务运行记录的保留天数
+
+    # ============ 通知投递配置 ============
+    notify_workers: int = 8             # 通知投递线程数
+    notify_channel_concurrency: int = 2  # 每个推送渠道同时发送的通知数
+    notify_max_attempts: int = 5        # 发送失败的最大尝试次数，超过后标记为 dead
+    notify_retry_base: int = 30         # 首次重试等待（秒），之后按指数退避
+    notify_retry_max_backoff: int = 1800  # 重试等待上限（秒）
+    notify_poll_interval: int = 10      # 发件箱轮询间隔（秒）
+    notify_outbox_retention_days: int = 7  # 已发送通知的保留天数
+
+    # ============ 上游限流配置 ============
+    upstream_rate_limit: float = 10.0  # 每个上游主机每秒最多发出的请求数，0 表示不限速
+    upstream_burst: int = 20           # 令牌桶容量（允许的突发请求数）
+    upstream_max_in_flight: int = 16   # 每个上游主机的最大在途请求数，0 表示不限制
+
+    # ============ 出口池配置 ============
+    egress_pool: str = ""              # 逗号分隔的 [名称=]direct | 代理 URL | source:本地地址，空表示只用本机出口
+    egress_max_concurrency: int = 8    # 每个出口的并发上限（Session 池大小与在途请求数）
+    egress_health_threshold: float = 0.5  # 健康分低于该值时暂停使用该出口
+    egress_cooldown: int = 60          # 出口暂停时长（秒），期间账号切换到其他出口
+
+    # ============ 自适应超时与对冲请求配置 ============
+    adaptive_timeout_enabled: bool = True  # 按接口滚动延迟计算超时（不超过固定超时）
+    adaptive_timeout_multiplier: float = 3.0  # 读超时 = p99 × 倍数，连接超时 = p95 × 倍数
+    adaptive_timeout_min: float = 5.0  # 自适应读超时下限（秒）
+    adaptive_connect_timeout: float = 10.0  # 连接超时上限（秒）
+    latency_window: int = 200          # 每个接口保留的延迟样本数
+    latency_min_samples: int = 20      # 样本数达到该值后才启用自适应超时与对冲
+    hedged_reads_enabled: bool = False  # 幂等读接口超过 p95 未返回时发出对冲请求
+    hedge_budget_ratio: float = 0.05   # 对冲请求占请求次数的上限比例
+    hedge_budget_min: int = 2          # 窗口内至少允许的对冲请求数
+
+    # ============ 熔断配置 ============
+    circuit_window: int = 60           # 错误率统计窗口（秒）
+    circuit_min_requests: int = 10     # 窗口内请求数达到该值后才计算错误率
+    circuit_error_rate: float = 0.5    # 错误率阈值（网络异常与反爬虫挑战计入错误）
+    circuit_open_seconds: int = 60     # 熔断打开持续时间（秒），之后放行探测请求
+    circuit_half_open_probes: int = 1  # 半开状态同时放行的探测请求数
+    circuit_max_postpones: int = 6     # 签到任务因熔断顺延的最大次数
+
+    # ============ Cookie 缓存配置 ============
+    cookie_cache_ttl: int = 900        # 反爬虫 Cookie 缓存时间（秒），命中时跳过控制台预请求
+    cookie_cache_size: int = 5000      # 最多缓存的账号数
+
+    # ============ 上游数据缓存配置 ============
+    models_cache_ttl: int = 600        # 模型列表新鲜期（秒），按用户组共享
+    groups_cache_ttl: int = 600        # 分组列表新鲜期（秒），按用户组共享
+    status_cache_ttl: int = 60         # /api/status 新鲜期（秒）
+    upstream_cache_stale_ttl: int = 3600  # 过期后仍返回旧值并后台刷新的时长（秒）
+    upstream_cache_size: int = 256     # 每类数据最多缓存的条目数
+
+    # ============ 上游请求录制与回放 ============
+    upstream_cassette_mode: str = ""   # 空=关闭，record=录制上游交互，replay=从 cassette 回放（不访问上游）
+    upstream_cassette_path: str = "./data/upstream.cassette.jsonl.gz"
+    upstream_cassette_time_scale: float = 1.0  # 回放耗时倍数，0 表示不等待
 
     # ============ 配额换算 ============
     quota_to_usd_rate: int = 500000
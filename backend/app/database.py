@@ -2,7 +2,7 @@
 数据库连接配置
 """
 import logging
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from .config import settings
@@ -21,6 +21,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # 声明基类
 Base = declarative_base()
 
+# 后来新增的列：(表名, 列名, 列定义)，已有数据库启动时补建
+ADDED_COLUMNS = [
+    ("notify_channels", "delivery_mode", "VARCHAR(20) DEFAULT 'immediate'"),
+]
+
 
 def get_db():
     """获取数据库会话"""
@@ -34,14 +39,31 @@ def get_db():
 def init_db():
     """初始化数据库"""
     # 导入所有模型以确保表被创建
-    from app.models import User, Account, AccountGroup, SignLog, NotifyChannel, AccountNotify, Setting, ApiToken, ApiEndpoint
+    from app.models import (
+        User, Account, AccountGroup, SignLog, SignRetry, JobRun, NotifyChannel, AccountNotify, NotifyOutbox,
+        Setting, ApiToken, ApiEndpoint
+    )
 
     Base.metadata.create_all(bind=engine)
+    # 已有数据库补建后来新增的列与索引
+    _add_missing_columns()
+    for index in SignLog.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
     # 初始化默认管理员
     _init_default_admin()
 
 
+def _add_missing_columns():
+    """为已有数据库补建后来新增的列"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, ddl in ADDED_COLUMNS:
+            if column not in {c["name"] for c in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+                logger.info(f"已补建列: {table}.{column}")
+
+
 def _init_default_admin():
     """初始化默认管理员账号"""
     # 延迟导入避免循环依赖
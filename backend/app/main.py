@@ -4,6 +4,7 @@ FastAPI 应用入口
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
@@ -20,11 +21,14 @@ from app.api import (
     statistics_router,
     groups_router,
     audit_router,
-    logs_router
+    logs_router,
+    upstream_router
 )
 from app.api.deps import get_current_user
 from app.database import init_db
 from app.services.scheduler import init_scheduler, shutdown_scheduler
+from app.services.anyrouter_async import async_anyrouter_service
+from app.services.metrics import registry as metrics_registry
 
 # 初始化日志系统
 setup_logging()
@@ -50,6 +54,7 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     shutdown_scheduler()
+    await async_anyrouter_service.close()
     logger.info(f"{settings.app_name} 已关闭")
 
 
@@ -86,6 +91,7 @@ app.include_router(statistics_router, prefix="/api/v1", dependencies=[Depends(ge
 app.include_router(groups_router, prefix="/api/v1", dependencies=[Depends(get_current_user)])
 app.include_router(audit_router, prefix="/api/v1", dependencies=[Depends(get_current_user)])
 app.include_router(logs_router, prefix="/api/v1", dependencies=[Depends(get_current_user)])
+app.include_router(upstream_router, prefix="/api/v1", dependencies=[Depends(get_current_user)])
 
 
 @app.get("/")
@@ -102,3 +108,9 @@ def root():
 def health():
     """健康检查"""
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """运行指标（Prometheus 文本格式）"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
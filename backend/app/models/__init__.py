@@ -4,7 +4,9 @@
 from .account import Account
 from .account_group import AccountGroup
 from .sign_log import SignLog
-from .notify import NotifyChannel, AccountNotify
+from .sign_retry import SignRetry
+from .job_run import JobRun
+from .notify import NotifyChannel, AccountNotify, NotifyOutbox
 from .setting import Setting
 from .api_token import ApiToken
 from .api_endpoint import ApiEndpoint
@@ -12,6 +14,6 @@ from .user import User
 from .audit_log import AuditLog, AuditAction, ACTION_NAMES
 
 __all__ = [
-    "Account", "AccountGroup", "SignLog", "NotifyChannel", "AccountNotify",
+    "Account", "AccountGroup", "SignLog", "SignRetry", "JobRun", "NotifyChannel", "AccountNotify", "NotifyOutbox",
     "Setting", "ApiToken", "ApiEndpoint", "User", "AuditLog", "AuditAction", "ACTION_NAMES"
 ]
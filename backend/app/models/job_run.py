@@ -0,0 +1,30 @@
+"""
+调度任务运行记录模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime
+
+from app.database import Base
+
+
+class JobRun(Base):
+    """调度任务的一次运行（自动签到波次、重试批次、健康检查轮次）"""
+
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job = Column(String(50), nullable=False, index=True)  # auto_sign | sign_retry | health_check
+    status = Column(String(20), default="success")  # success | failed
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_seconds = Column(Float, default=0.0)
+    accounts = Column(Integer, default=0)  # 处理的账号数（含跳过）
+    success_count = Column(Integer, default=0)
+    fail_count = Column(Integer, default=0)
+    skip_count = Column(Integer, default=0)  # 今日已签到、熔断跳过等
+    upstream_calls = Column(Integer, default=0)  # 上游请求次数（含重试）
+    sleep_seconds = Column(Float, default=0.0)  # 挑战后等待与重试退避的累计时间
+    latency_p50_ms = Column(Float, nullable=True)  # 单账号耗时中位数
+    latency_p95_ms = Column(Float, nullable=True)
+    stage_seconds = Column(Text, nullable=True)  # JSON：各阶段累计耗时 {preflight, challenge_solve, sleep, main, queue}
+    error = Column(Text, nullable=True)
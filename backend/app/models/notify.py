@@ -17,6 +17,7 @@ class NotifyChannel(Base):
     name = Column(String(100), nullable=False)
     config = Column(Text, nullable=False)  # JSON 格式的配置
     is_enabled = Column(Boolean, default=True)
+    delivery_mode = Column(String(20), default="immediate")  # immediate 逐条发送 | digest 每次任务汇总为一条
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -31,3 +32,23 @@ class AccountNotify(Base):
     channel_id = Column(Integer, ForeignKey("notify_channels.id"), nullable=False)
     notify_config = Column(Text, nullable=True)  # JSON 格式的账号专属配置
     is_enabled = Column(Boolean, default=True)
+
+
+class NotifyOutbox(Base):
+    """通知发件箱：待发送 / 已发送的通知，由后台投递线程发送"""
+
+    __tablename__ = "notify_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel_id = Column(Integer, ForeignKey("notify_channels.id"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+    kind = Column(String(20), nullable=False)  # sign 签到 | health 健康告警
+    title = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False)
+    account_config = Column(Text, nullable=True)  # JSON 格式的账号专属配置（发送时与渠道配置合并）
+    status = Column(String(20), default="pending", index=True)  # pending 待发送 | sending 发送中 | sent 已发送 | dead 放弃
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.now, index=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime, nullable=True)
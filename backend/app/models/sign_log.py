@@ -2,7 +2,7 @@
 签到日志模型
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, Text, Boolean, DateTime, BigInteger, ForeignKey
+from sqlalchemy import Column, Integer, Text, Boolean, DateTime, BigInteger, ForeignKey, Index
 
 from app.database import Base
 
@@ -11,6 +11,10 @@ class SignLog(Base):
     """签到日志"""
 
     __tablename__ = "sign_logs"
+    __table_args__ = (
+        # 按账号查询当天签到记录
+        Index("ix_sign_logs_account_time", "account_id", "sign_time"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
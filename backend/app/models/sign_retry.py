@@ -0,0 +1,22 @@
+"""
+签到重试队列模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
+
+from app.database import Base
+
+
+class SignRetry(Base):
+    """待重试签到的账号（每个账号最多一条）"""
+
+    __tablename__ = "sign_retries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, unique=True)
+    attempts = Column(Integer, default=0)  # 已重试次数
+    due_at = Column(DateTime, nullable=False, index=True)  # 下次重试时间
+    last_error = Column(Text, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)  # 被轮询任务领取的时间，为空表示等待中
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
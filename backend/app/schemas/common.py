@@ -18,9 +18,17 @@ class SettingsResponse(BaseModel):
     auto_sign_time: str = "08:00"
     health_check_enabled: bool = True
     health_check_interval: int = 6
+    health_check_batch_size: int = 50
     sign_retry_enabled: bool = True
     sign_max_retries: int = 3
     sign_retry_interval: int = 30
+    sign_prewarm_enabled: bool = False
+    sign_prewarm_minutes: int = 5
+    sign_engine_mode: str = "thread"
+    sign_concurrency: int = 4
+    sign_window_minutes: int = 0
+    sign_wave_size: int = 20
+    sign_jitter_seconds: int = 0
 
 
 class SettingsUpdate(BaseModel):
@@ -29,9 +37,17 @@ class SettingsUpdate(BaseModel):
     auto_sign_time: Optional[str] = None
     health_check_enabled: Optional[bool] = None
     health_check_interval: Optional[int] = None
+    health_check_batch_size: Optional[int] = None
     sign_retry_enabled: Optional[bool] = None
     sign_max_retries: Optional[int] = None
     sign_retry_interval: Optional[int] = None
+    sign_prewarm_enabled: Optional[bool] = None
+    sign_prewarm_minutes: Optional[int] = None
+    sign_engine_mode: Optional[str] = None
+    sign_concurrency: Optional[int] = None
+    sign_window_minutes: Optional[int] = None
+    sign_wave_size: Optional[int] = None
+    sign_jitter_seconds: Optional[int] = None
 
 
 class RecentSign(BaseModel):
@@ -11,6 +11,7 @@ class NotifyChannelCreate(BaseModel):
     type: str  # pushplus, wechat_mp, wechat_work, dingtalk, feishu, email
     name: str
     config: Dict[str, Any]
+    delivery_mode: str = "immediate"  # immediate 逐条发送 | digest 每次任务汇总为一条
 
 
 class NotifyChannelUpdate(BaseModel):
@@ -18,6 +19,7 @@ class NotifyChannelUpdate(BaseModel):
     name: Optional[str] = None
     config: Optional[Dict[str, Any]] = None
     is_enabled: Optional[bool] = None
+    delivery_mode: Optional[str] = None
 
 
 class NotifyChannelResponse(BaseModel):
@@ -27,6 +29,7 @@ class NotifyChannelResponse(BaseModel):
     name: str
     config: Dict[str, Any]
     is_enabled: bool
+    delivery_mode: str = "immediate"
     created_at: datetime
     updated_at: datetime
 
@@ -2,6 +2,11 @@
 业务服务
 """
 from .anyrouter import anyrouter_service, AnyRouterService
+from .anyrouter_async import async_anyrouter_service, AsyncAnyRouterService
 from .notify import NotifyFactory, NotifyBase
 
-__all__ = ["anyrouter_service", "AnyRouterService", "NotifyFactory", "NotifyBase"]
+__all__ = [
+    "anyrouter_service", "AnyRouterService",
+    "async_anyrouter_service", "AsyncAnyRouterService",
+    "NotifyFactory", "NotifyBase"
+]
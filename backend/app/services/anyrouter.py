@@ -1,198 +1,444 @@
 """
 AnyRouter API 服务
 """
-import re
-import json
 import time
 import logging
-from typing import Optional, Tuple, Dict, Any
+import threading
+import contextvars
+from concurrent.futures import (
+    ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
+)
+from typing import Optional, Tuple, Dict, Any, List, Iterator, Sequence
 
 import requests
+from requests.cookies import cookiejar_from_dict
 
 from app.config import settings
+from app.services.anyrouter_core import (
+    AnyRouterBase, RequestRun, RefreshPlan, TokenPagePlan, CHALLENGE_DELAY, collect_token_pages
+)
+# 其他模块沿用本模块的导入路径
+from app.services.anyrouter_core import AntiCrawlerSolver, sign_operations, health_check_operations  # noqa: F401
+from app.services.egress import DEFAULT_EGRESS
+from app.services.cassette import CassetteMiss, decode_body
+from app.services.http_pool import SessionPoolTimeout
+from app.services.http_response import UpstreamResponse, read_response
+from app.services.upstream_policy import RequestPolicy
+from app.services.metrics import registry as metrics_registry
+from app.services.circuit_breaker import CircuitOpenError, FAILURE_NETWORK, FAILURE_CIRCUIT_OPEN
 
 logger = logging.getLogger(__name__)
 
 
-class AntiCrawlerSolver:
-    """阿里云盾反爬虫挑战解决器"""
+class HedgeLeg:
+    """
+    对冲中的一路请求
 
-    def __init__(self):
-        self.mask = settings.anti_crawler_mask
-        self.pos_list = settings.anti_crawler_pos_list
+    每路使用独立的尝试记录，只有胜出一路的记录合并回调用方；
+    落选后置位 abandoned，不再重发挑战请求，响应直接丢弃且不计入指标
+    """
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        self.abandoned = threading.Event()
+        self.future = None
 
-    def solve(self, html_content: str) -> Optional[str]:
-        """解决反爬虫挑战"""
+    def result(self, record: Dict[str, Any]) -> UpstreamResponse:
+        """等待本路结果，并将本路的尝试记录合并到 record"""
         try:
-            arg1_match = re.search(r"var arg1='([^']+)'", html_content)
-            if not arg1_match:
-                return None
-
-            arg1 = arg1_match.group(1)
-            arg2 = self._reorder_string(arg1)
-            result = self._xor_decrypt(arg2)
-            return result
-        except Exception as e:
-            logger.error(f"解决反爬虫挑战失败: {e}")
-            return None
-
-    def _reorder_string(self, input_str: str) -> str:
-        """根据位置列表重排序字符串"""
-        output_list = [''] * len(self.pos_list)
-        for i, char in enumerate(input_str):
-            for j, pos in enumerate(self.pos_list):
-                if pos == i + 1:
-                    output_list[j] = char
-                    break
-        return ''.join(output_list)
-
-    def _xor_decrypt(self, input_str: str) -> str:
-        """XOR 解密"""
-        result = ''
-        mask = self.mask
-        for i in range(0, min(len(input_str), len(mask)), 2):
-            if i + 1 < len(input_str) and i + 1 < len(mask):
-                str_char = int(input_str[i:i + 2], 16)
-                mask_char = int(mask[i:i + 2], 16)
-                xor_char = hex(str_char ^ mask_char)[2:].zfill(2)
-                result += xor_char
-        return result
-
-
-class AnyRouterService:
-    """AnyRouter API 服务"""
-
-    BASE_HEADERS = {
-        "accept": "application/json, text/plain, */*",
-        "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-        "cache-control": "no-store",
-        "pragma": "no-cache",
-        "priority": "u=1, i",
-        "referer": "https://anyrouter.top/console",
-        "sec-ch-ua": '"Microsoft Edge";v="143", "Chromium";v="143", "Not A(Brand";v="24"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"Windows"',
-        "sec-fetch-dest": "empty",
-        "sec-fetch-mode": "cors",
-        "sec-fetch-site": "same-origin",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0"
-    }
+            return self.future.result()
+        finally:
+            record.update(self.record)
+
+
+# 当前线程执行的对冲请求（在对冲线程池中设置）
+hedge_leg: contextvars.ContextVar[Optional[HedgeLeg]] = contextvars.ContextVar("hedge_leg", default=None)
+
+
+def _leg_abandoned() -> bool:
+    """当前请求是否为已落选的对冲请求"""
+    leg = hedge_leg.get()
+    return leg is not None and leg.abandoned.is_set()
+
+
+class AnyRouterService(AnyRouterBase):
+    """AnyRouter API 服务（requests，Session 按次从出口的 Session 池借出，避免跨线程共享）"""
 
     def __init__(self):
-        self.anti_crawler = AntiCrawlerSolver()
-        self.base_url = settings.anyrouter_base_url
+        super().__init__()
+        hedge_workers = settings.http_pool_size * 2
+        self._hedge_executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="upstream-hedge")
+        # 对冲线程池的空闲线程数：只在有空闲线程时提交，请求不会在线程池中排队
+        self._hedge_slots = threading.BoundedSemaphore(hedge_workers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取上游请求统计（连接池复用、握手次数等）"""
+        return {
+            "pool": self.egresses.get(DEFAULT_EGRESS).pool.get_stats(),
+            "egress": self.egresses.get_stats(),
+            "cookie_cache": self.cookie_cache.get_stats(),
+            "anti_crawler": self.anti_crawler.cache_info(),
+            "retry_budget": self.retry_budget.get_stats(),
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "circuit_breakers": self.breakers.get_stats(),
+            "latency": self.latency.get_stats(),
+            "timeouts": {
+                name: dict(zip(("connect", "read"), self._timeout_for(policy)))
+                for name, policy in self.policies.items()
+            },
+            "hedge_budget": self.hedge_budget.get_stats(),
+            "cassette": self.cassette.get_stats() if self.cassette is not None else None
+        }
 
-    def _get_session(self) -> requests.Session:
+    def collect_metrics(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        """将当前状态（熔断、限流排队、缓存命中）导出为 /metrics 中的指标"""
+        states = {"closed": 0, "half_open": 1, "open": 2}
+        breakers = self.breakers.get_stats()
+        hosts = self.rate_limiter.get_stats()
+        cache = self.cookie_cache.get_stats()
+        egresses = self.egresses.get_stats()["egresses"]
+        return [
+            ("anyrouter_circuit_state", "gauge", "熔断器状态（0=closed 1=half_open 2=open）",
+             [({"endpoint": name}, states.get(stats["state"], 0)) for name, stats in breakers.items()]),
+            ("anyrouter_in_flight", "gauge", "在途上游请求数",
+             [({"host": host}, stats["in_flight"]) for host, stats in hosts.items()]),
+            ("anyrouter_queue_waiting", "gauge", "等待限流许可的请求数",
+             [({"host": host, "lane": name}, lane["waiting"])
+              for host, stats in hosts.items() for name, lane in stats["lanes"].items()]),
+            ("anyrouter_cookie_cache_requests_total", "counter", "Cookie 缓存查询次数",
+             [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])]),
+            ("anyrouter_session_pool_idle", "gauge", "连接池空闲 Session 数",
+             [({"egress": egress["name"]}, egress["pool"]["idle"]) for egress in egresses]),
+            ("anyrouter_egress_health", "gauge", "出口健康分（0~1）",
+             [({"egress": egress["name"]}, egress["health"]) for egress in egresses]),
+            ("anyrouter_egress_up", "gauge", "出口是否可用（1=可用 0=暂停）",
+             [({"egress": egress["name"]}, int(egress["state"] == "up")) for egress in egresses]),
+            ("anyrouter_retry_budget_rejected_total", "counter", "因重试预算耗尽放弃的重试次数",
+             [({}, self.retry_budget.get_stats()["rejected"])]),
+        ]
+
+    def _get_cookies_with_challenge(
+        self,
+        session_cookie: str,
+        user_id: str,
+        session: requests.Session = None,
+        use_cache: bool = True
+    ) -> Dict[str, str]:
         """
-        获取新的 Session 实例
-        避免在多线程环境下复用 Session 导致的 SSL 连接问题
+        获取 Cookies 并处理反爬虫挑战
+
+        优先使用缓存的 Cookies 跳过控制台预请求；缓存失效时请求会收到挑战页，
+        由 _attempt 求解后重发
         """
-        session = requests.Session()
-        # 配置重试适配器，增强连接稳定性
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
-
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
-        return session
-
-    def _get_headers(self, user_id: str) -> Dict[str, str]:
-        """获取请求头，包含 new-api-user"""
-        headers = self.BASE_HEADERS.copy()
-        headers["new-api-user"] = str(user_id)
-        return headers
-
-    def _is_anti_crawler_challenge(self, text: str) -> bool:
-        """检查是否为反爬虫挑战"""
-        return "acw_sc__v2" in text and "var arg1=" in text
-
-    def _get_cookies_with_challenge(self, session_cookie: str, user_id: str, session: requests.Session = None) -> Dict[str, str]:
-        """获取 Cookies 并处理反爬虫挑战"""
+        egress = getattr(session, "egress", None) or self._egress_for(user_id).name
+        if use_cache:
+            cached = self.cookie_cache.get_cookies(egress, user_id, session_cookie)
+            if cached is not None:
+                return cached
+
+        if session is None:
+            with self.egresses.get(egress).lease() as leased:
+                return self._get_cookies_with_challenge(session_cookie, user_id, leased, use_cache=False)
+
+        policy = self.policies["console"]
         cookies = {"session": session_cookie}
         headers = self._get_headers(user_id)
-        if session is None:
-            session = self._get_session()
+
+        url = f"{self.base_url}{policy.path}"
 
         try:
-            response = session.get(
-                f"{self.base_url}{settings.anyrouter_console_url}",
-                headers=headers,
-                cookies=cookies,
-                timeout=10
-            )
+            response = self._send(session, policy, url, headers, cookies, None)
 
             # 收集返回的 cookies
             for cookie in response.cookies:
                 cookies[cookie.name] = cookie.value
 
             # 检查并解决反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
+            if self._accept_challenge(response, cookies):
+                time.sleep(CHALLENGE_DELAY)
+                self._observe_challenge_sleep(policy.name)
 
+            # 缓存 Cookies，有效期内的后续请求跳过预请求
+            self.cookie_cache.set_cookies(egress, user_id, cookies)
             return cookies
         except Exception as e:
             logger.error(f"获取 Cookies 失败: {e}")
             return {"session": session_cookie}
 
-    def get_user_info(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
-        """
-        获取用户信息
+    @staticmethod
+    def _should_retry_error(policy: RequestPolicy, error: Exception) -> bool:
+        """根据网络异常判断是否需要重试"""
+        if isinstance(error, requests.ConnectionError):
+            # 连接失败（含连接超时、本地连接池繁忙）时请求未发出
+            return True
+        return policy.idempotent and isinstance(error, requests.Timeout)
 
-        Args:
-            session_cookie: Session Cookie
-            user_id: 用户 ID (new-api-user)
-
-        Returns:
-            Tuple[bool, Dict]: (是否成功, 用户信息或错误消息)
+    def _send(
+        self,
+        session: requests.Session,
+        policy: RequestPolicy,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        payload: Optional[Dict[str, Any]]
+    ) -> UpstreamResponse:
         """
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
+        发出一次请求并读取响应，成功响应的耗时计入延迟统计，所有响应计入指标
 
-        try:
-            url = f"{self.base_url}{settings.anyrouter_user_api}"
-            response = session.get(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=settings.request_timeout
-            )
-
-            # 如果还是反爬虫挑战，再次处理
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = session.get(
+        开启 cassette 时录制本次交互，回放模式下从 cassette 取出响应而不访问上游。
+        请求经 Session 所属的出口发出，结果计入该出口的健康分
+        """
+        kwargs = {}
+        if payload is not None:
+            kwargs["json"] = payload
+        egress = self.egresses.get(getattr(session, "egress", DEFAULT_EGRESS))
+        with self.rate_limiter.slot(url, egress=egress.name):
+            started = time.monotonic()
+            try:
+                if self.cassette is not None and self.cassette.replaying:
+                    response = self._replay(policy, url, headers)
+                else:
+                    raw = session.request(
+                        policy.method,
                         url,
                         headers=headers,
                         cookies=cookies,
-                        timeout=settings.request_timeout
+                        timeout=self._timeout_for(policy),
+                        stream=True,
+                        **kwargs
                     )
+                    response = read_response(raw)
+                    if self.cassette is not None:
+                        self.cassette.record(
+                            policy.method, url, headers.get("new-api-user"), response.status_code, raw.headers,
+                            response.cookies.get_dict(), response.kind, raw.encoding, response.body,
+                            started, time.monotonic() - started
+                        )
+            except requests.RequestException:
+                if not _leg_abandoned():
+                    egress.record(False, time.monotonic() - started)
+                raise
+        elapsed = time.monotonic() - started
+        if _leg_abandoned():
+            # 落选的对冲请求：响应会被丢弃，不计入健康分、延迟与指标
+            return response
+        egress.record(response.status_code < 500 and response.status_code != 429, elapsed)
+        self.metrics.observe_phase(policy.name, "main", elapsed)
+        self.metrics.count_response(policy.name, response.status_code)
+        if response.status_code < 500:
+            self.latency.observe(policy.name, elapsed)
+        return response
+
+    def _replay(self, policy: RequestPolicy, url: str, headers: Dict[str, str]) -> UpstreamResponse:
+        """从 cassette 取出录制的响应并按录制耗时等待；没有匹配的交互时按连接失败处理"""
+        try:
+            exchange = self.cassette.next_exchange(policy.method, url, headers.get("new-api-user"))
+        except CassetteMiss as e:
+            raise requests.ConnectionError(str(e))
+        time.sleep(self.cassette.delay(exchange))
+        return UpstreamResponse(
+            kind=exchange["k"],
+            status_code=exchange["s"],
+            body=decode_body(exchange["b"]),
+            cookies=cookiejar_from_dict(exchange["c"]),
+            encoding=exchange["e"]
+        )
+
+    def _timeout_for(self, policy: RequestPolicy) -> Tuple[float, float]:
+        """按接口滚动延迟计算 (连接超时, 读超时)，不超过策略中的固定超时"""
+        return self.latency.timeout_for(policy.name, policy.get_timeout())
+
+    def _attempt_hedged(
+        self,
+        policy: RequestPolicy,
+        url: str,
+        session_cookie: Optional[str],
+        user_id: Optional[str],
+        payload: Optional[Dict[str, Any]],
+        record: Dict[str, Any]
+    ) -> UpstreamResponse:
+        """
+        带对冲的单次尝试
+
+        首个请求开始执行后超过该接口 p95 仍未返回时，在对冲预算允许的情况下再发一个相同请求，
+        取先成功返回的结果；未开启对冲、样本不足或对冲线程已占满时，在调用方线程直接请求
+        """
+        delay = self._hedge_delay(policy)
+        if delay is None or not self._hedge_slots.acquire(blocking=False):
+            return self._attempt(policy, url, session_cookie, user_id, payload, record)
+
+        primary = self._start_leg(HedgeLeg(dict(record)), policy, url, session_cookie, user_id, payload)
+        try:
+            response = primary.future.result(timeout=delay)
+            record.update(primary.record)
+            return response
+        except FutureTimeoutError:
+            pass
+
+        # 首个请求尚未开始执行时超时的是排队而非上游，不对冲
+        if not (primary.future.running() and self._hedge_slots.acquire(blocking=False)):
+            return primary.result(record)
+        hedge_record = self._hedge_record(record)
+        if hedge_record is None:
+            self._hedge_slots.release()
+            return primary.result(record)
+
+        hedge = self._start_leg(HedgeLeg(hedge_record), policy, url, session_cookie, user_id, payload)
+        done, _ = wait([primary.future, hedge.future], return_when=FIRST_COMPLETED)
+        first, other = (primary, hedge) if primary.future in done else (hedge, primary)
+        try:
+            response = first.future.result()
+        except requests.RequestException:
+            first, other = other, first
+            response = first.result(record)
+        else:
+            record.update(first.record)
+        # 未被采用的请求在后台完成后自行归还 Session，其响应不再使用
+        other.abandoned.set()
+        self.latency.record_hedge(policy.name, won=first is hedge)
+        return response
+
+    def _start_leg(
+        self,
+        leg: HedgeLeg,
+        policy: RequestPolicy,
+        url: str,
+        session_cookie: Optional[str],
+        user_id: Optional[str],
+        payload: Optional[Dict[str, Any]]
+    ) -> HedgeLeg:
+        """在对冲线程池中执行一路请求（调用方已占用一个空闲线程名额，结束时归还）"""
+        def run() -> UpstreamResponse:
+            hedge_leg.set(leg)
+            try:
+                return self._attempt(policy, url, session_cookie, user_id, payload, leg.record)
+            finally:
+                self._hedge_slots.release()
+
+        # 工作线程沿用调用方的上下文（请求通道、组合刷新绑定等）
+        leg.future = self._hedge_executor.submit(contextvars.copy_context().run, run)
+        return leg
+
+    def _attempt(
+        self,
+        policy: RequestPolicy,
+        url: str,
+        session_cookie: Optional[str],
+        user_id: Optional[str],
+        payload: Optional[Dict[str, Any]],
+        record: Dict[str, Any]
+    ) -> UpstreamResponse:
+        """
+        单次尝试：预请求获取 Cookies、发送、必要时求解挑战并重发
+
+        处于同一账号的组合刷新中时，复用绑定的 Cookies
+        """
+        binding = self._binding_for(policy, user_id)
+        with self._egress_for(user_id).lease() as session:
+            cookies = self._bound_cookies(policy, binding)
+            if cookies is None:
+                started = time.monotonic()
+                cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
+                self._bind_cookies(policy, record, binding, cookies, started)
+            headers = self._request_headers(policy, user_id, payload)
+
+            response = self._send(session, policy, url, headers, cookies, payload)
+
+            if self._accept_attempt_challenge(policy, response, cookies, user_id, record):
+                time.sleep(CHALLENGE_DELAY)
+                self._observe_challenge_sleep(policy.name, record)
+                # 已落选的对冲请求不再重发
+                if not _leg_abandoned():
+                    response = self._send(session, policy, url, headers, cookies, payload)
+
+            self._drop_stale_cookies(policy, response, user_id, binding)
+            return response
+
+    def _execute(
+        self,
+        policy_name: str,
+        session_cookie: Optional[str] = None,
+        user_id: Optional[str] = None,
+        path_suffix: str = "",
+        payload: Optional[Dict[str, Any]] = None
+    ) -> UpstreamResponse:
+        """
+        按接口策略执行请求
+
+        统一处理 Cookie 预请求、反爬虫挑战、重试与退避；重试需先从全局重试预算中申请，
+        预算耗尽时直接返回最后一次结果（重试判定见 RequestRun）
+
+        Args:
+            policy_name: 策略名称（见 build_policies）
+            session_cookie: Session Cookie（公开接口可为空）
+            user_id: 用户 ID (new-api-user)
+            path_suffix: 追加在接口路径后的部分（查询参数、资源 ID 等）
+            payload: JSON 请求体
+
+        Returns:
+            UpstreamResponse: 最后一次尝试的响应
 
-            data = response.json()
-            if data.get("success"):
-                return True, data.get("data", {})
+        Raises:
+            requests.RequestException: 所有尝试均因网络异常失败
+            CircuitOpenError: 接口熔断中，请求未发出
+        """
+        policy = self.policies[policy_name]
+        url = f"{self.base_url}{policy.path}{path_suffix}"
+        run = RequestRun(self, policy, user_id)
+        while run.next_attempt():
+            if run.delay:
+                time.sleep(run.delay)
+            if not run.proceed():
+                break
+            try:
+                response = self._attempt_hedged(policy, url, session_cookie, user_id, payload, run.record)
+            except requests.RequestException as e:
+                # 本地连接池繁忙时请求未发出，不计入熔断
+                run.fail(e, self._should_retry_error(policy, e), counted=not isinstance(e, SessionPoolTimeout))
             else:
-                return False, {"message": data.get("message", "获取用户信息失败")}
+                run.complete(response)
+        return run.result()
+
+    def _fetch(
+        self,
+        policy_name: str,
+        session_cookie: str,
+        user_id: str,
+        fail_msg: str,
+        path_suffix: str = "",
+        payload: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        执行请求并解析 {success, data, message} 格式的响应
 
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
+        失败时返回的字典带有 error_type（见 circuit_breaker 中的失败类型）
+        """
+        try:
+            response = self._execute(policy_name, session_cookie, user_id, path_suffix, payload)
+            return self._parse_result(policy_name, user_id, response, fail_msg)
+        except CircuitOpenError as e:
+            return False, {"message": str(e), "error_type": FAILURE_CIRCUIT_OPEN}
         except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
+            return False, {"message": f"网络请求失败: {str(e)}", "error_type": FAILURE_NETWORK}
         except Exception as e:
             return False, {"message": f"未知错误: {str(e)}"}
 
+    def get_user_info(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """
+        获取用户信息
+
+        Args:
+            session_cookie: Session Cookie
+            user_id: 用户 ID (new-api-user)
+
+        Returns:
+            Tuple[bool, Dict]: (是否成功, 用户信息或错误消息)
+        """
+        success, data = self._fetch("user_info", session_cookie, user_id, "获取用户信息失败")
+        if success:
+            return True, data.get("data", {})
+        return False, data
+
     def sign_in(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
         """
         执行签到
@@ -204,54 +450,50 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, 签到结果或错误消息)
         """
-        for attempt in range(settings.retry_times):
-            if attempt > 0:
-                time.sleep(settings.retry_interval)
-
-            session = self._get_session()
-            cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-            headers = self._get_headers(user_id)
-
-            try:
-                response = session.post(
-                    f"{self.base_url}{settings.anyrouter_sign_api}",
-                    headers=headers,
-                    cookies=cookies,
-                    timeout=settings.request_timeout
-                )
-
-                # 处理反爬虫挑战
-                if self._is_anti_crawler_challenge(response.text):
-                    result = self.anti_crawler.solve(response.text)
-                    if result:
-                        cookies["acw_sc__v2"] = result
-                        time.sleep(2)
-                        response = session.post(
-                            f"{self.base_url}{settings.anyrouter_sign_api}",
-                            headers=headers,
-                            cookies=cookies,
-                            timeout=settings.request_timeout
-                        )
+        try:
+            return self._parse_sign_in(user_id, self._execute("sign_in", session_cookie, user_id))
+        except CircuitOpenError as e:
+            return False, {"success": False, "message": str(e), "error_type": FAILURE_CIRCUIT_OPEN}
+        except requests.RequestException as e:
+            logger.error(f"签到请求失败: {e}")
+        except Exception as e:
+            logger.error(f"签到异常: {e}")
 
-                if not response.text.strip():
-                    continue
+        return False, {"success": False, "message": "重试次数已用完", "error_type": FAILURE_NETWORK}
 
-                if self._is_anti_crawler_challenge(response.text):
-                    continue
+    def refresh_account(
+        self,
+        session_cookie: str,
+        user_id: str,
+        operations: Sequence[str]
+    ) -> Dict[str, Tuple[bool, Dict[str, Any]]]:
+        """
+        组合刷新：按顺序执行账号的多个操作，共用一组 Cookies
 
-                data = response.json()
-                return True, data
+        整组操作只做一次预请求与挑战求解（Cookie 缓存失效时也是如此）；
+        凭证失效时剩余操作不再发出，直接返回同样的失败。
+        Session 按请求借出（池为 LIFO，连续的请求通常拿回同一个 Session，连接保持复用）
 
-            except json.JSONDecodeError:
-                continue
-            except requests.RequestException as e:
-                logger.error(f"签到请求失败: {e}")
-                continue
-            except Exception as e:
-                logger.error(f"签到异常: {e}")
-                continue
+        Args:
+            session_cookie: Session Cookie
+            user_id: 用户 ID (new-api-user)
+            operations: 操作列表（见 REFRESH_OPERATIONS），按给定顺序执行
 
-        return False, {"success": False, "message": "重试次数已用完"}
+        Returns:
+            Dict[str, Tuple[bool, Dict]]: {操作: (是否成功, 结果)}，结果同对应的单个方法；
+            tokens 的结果为 {"pages": [(是否成功, 分页结果), ...]}（同 iter_token_pages 的产出）
+        """
+        plan = RefreshPlan(operations)
+        with self._refresh_scope(user_id):
+            for operation in plan:
+                plan.record(operation, *self._run_operation(operation, session_cookie, user_id))
+        return plan.results
+
+    def _run_operation(self, operation: str, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """执行组合刷新中的单个操作"""
+        if operation == "tokens":
+            return collect_token_pages(list(self.iter_token_pages(session_cookie, user_id)))
+        return self._operation_method(operation)(session_cookie, user_id)
 
     def get_tokens(self, session_cookie: str, user_id: str, page: int = 0, size: int = 50) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -266,44 +508,61 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, Token 列表或错误消息)
         """
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
+        success, data = self._fetch(
+            "tokens", session_cookie, user_id, "获取 Token 列表失败",
+            path_suffix=f"?p={page}&size={size}"
+        )
+        if success:
+            return True, self._token_page_result(page, data)
+        return False, data
 
-        try:
-            url = f"{self.base_url}{settings.anyrouter_token_api}?p={page}&size={size}"
-            response = session.get(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = session.get(
-                        url,
-                        headers=headers,
-                        cookies=cookies,
-                        timeout=settings.request_timeout
-                    )
+    def iter_token_pages(
+        self,
+        session_cookie: str,
+        user_id: str,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+        """
+        分页获取全部 API Token，按页到达顺序逐页产出
 
-            data = response.json()
-            if data.get("success"):
-                return True, {"tokens": data.get("data", [])}
-            else:
-                return False, {"message": data.get("message", "获取 Token 列表失败")}
+        先请求首页得到总数，其余页以有界并发同时请求；接口未返回总数时，
+        按并发数成批探测后续页，直到出现不满一页为止
 
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
-        except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
-        except Exception as e:
-            return False, {"message": f"未知错误: {str(e)}"}
+        Args:
+            session_cookie: Session Cookie
+            user_id: 用户 ID (new-api-user)
+            page_size: 每页数量，默认 settings.token_page_size
+            concurrency: 同时请求的页数，默认 settings.token_fetch_concurrency
+
+        Yields:
+            Tuple[bool, Dict]: (True, {"page", "tokens", "total"})；
+            任一页失败时产出 (False, {"message"}) 后结束，调用方据此判断列表是否完整
+        """
+        plan = TokenPagePlan(page_size, concurrency)
+        success, first = self.get_tokens(session_cookie, user_id, page=0, size=plan.size)
+        yield success, first
+        if not success or not plan.start(first):
+            return
+
+        def fetch(page: int) -> Tuple[bool, Dict[str, Any]]:
+            return self.get_tokens(session_cookie, user_id, page=page, size=plan.size)
+
+        with ThreadPoolExecutor(max_workers=plan.workers, thread_name_prefix="token-pages") as executor:
+            for batch in plan.batches():
+                # 工作线程沿用调用方的上下文（请求通道等）
+                futures = [executor.submit(contextvars.copy_context().run, fetch, page) for page in batch]
+                try:
+                    for future in as_completed(futures):
+                        success, result = future.result()
+                        if not success:
+                            yield False, result
+                            return
+                        if plan.accept(result):
+                            yield True, result
+                finally:
+                    for future in futures:
+                        future.cancel()
 
     def get_models(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -316,44 +575,10 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, 模型列表或错误消息)
         """
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
-
-        try:
-            url = f"{self.base_url}{settings.anyrouter_models_api}"
-            response = session.get(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = session.get(
-                        url,
-                        headers=headers,
-                        cookies=cookies,
-                        timeout=settings.request_timeout
-                    )
-
-            data = response.json()
-            if data.get("success"):
-                return True, {"models": data.get("data", [])}
-            else:
-                return False, {"message": data.get("message", "获取模型列表失败")}
-
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
-        except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
-        except Exception as e:
-            return False, {"message": f"未知错误: {str(e)}"}
+        success, data = self._fetch("models", session_cookie, user_id, "获取模型列表失败")
+        if success:
+            return True, {"models": data.get("data", [])}
+        return False, data
 
     def get_groups(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -366,44 +591,10 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, 分组列表或错误消息)
         """
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
-
-        try:
-            url = f"{self.base_url}{settings.anyrouter_groups_api}"
-            response = session.get(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = session.get(
-                        url,
-                        headers=headers,
-                        cookies=cookies,
-                        timeout=settings.request_timeout
-                    )
-
-            data = response.json()
-            if data.get("success"):
-                return True, {"groups": data.get("data", {})}
-            else:
-                return False, {"message": data.get("message", "获取分组列表失败")}
-
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
-        except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
-        except Exception as e:
-            return False, {"message": f"未知错误: {str(e)}"}
+        success, data = self._fetch("groups", session_cookie, user_id, "获取分组列表失败")
+        if success:
+            return True, {"groups": data.get("data", {})}
+        return False, data
 
     def _token_request(
         self,
@@ -415,48 +606,11 @@ class AnyRouterService:
         fail_msg: str = "操作失败"
     ) -> Tuple[bool, Dict[str, Any]]:
         """令牌相关请求的通用方法"""
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
-        headers["content-type"] = "application/json"
-
-        try:
-            url = f"{self.base_url}{settings.anyrouter_token_api}"
-            request_fn = session.post if method == "post" else session.put
-            response = request_fn(
-                url,
-                headers=headers,
-                cookies=cookies,
-                json=payload,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = request_fn(
-                        url,
-                        headers=headers,
-                        cookies=cookies,
-                        json=payload,
-                        timeout=settings.request_timeout
-                    )
-
-            data = response.json()
-            if data.get("success"):
-                return True, {"message": data.get("message", success_msg)}
-            else:
-                return False, {"message": data.get("message", fail_msg)}
-
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
-        except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
-        except Exception as e:
-            return False, {"message": f"未知错误: {str(e)}"}
+        policy_name = "token_create" if method == "post" else "token_update"
+        success, data = self._fetch(policy_name, session_cookie, user_id, fail_msg, payload=payload)
+        if success:
+            return True, {"message": data.get("message", success_msg)}
+        return False, data
 
     def create_token(
         self,
@@ -511,44 +665,13 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, 结果或错误消息)
         """
-        session = self._get_session()
-        cookies = self._get_cookies_with_challenge(session_cookie, user_id, session)
-        headers = self._get_headers(user_id)
-
-        try:
-            url = f"{self.base_url}{settings.anyrouter_token_api}/{token_id}"
-            response = session.delete(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies["acw_sc__v2"] = result
-                    time.sleep(2)
-                    response = session.delete(
-                        url,
-                        headers=headers,
-                        cookies=cookies,
-                        timeout=settings.request_timeout
-                    )
-
-            data = response.json()
-            if data.get("success"):
-                return True, {"message": data.get("message", "删除成功")}
-            else:
-                return False, {"message": data.get("message", "删除令牌失败")}
-
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
-        except requests.RequestException as e:
-            return False, {"message": f"网络请求失败: {str(e)}"}
-        except Exception as e:
-            return False, {"message": f"未知错误: {str(e)}"}
+        success, data = self._fetch(
+            "token_delete", session_cookie, user_id, "删除令牌失败",
+            path_suffix=f"/{token_id}"
+        )
+        if success:
+            return True, {"message": data.get("message", "删除成功")}
+        return False, data
 
     def get_api_status(self) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -557,33 +680,10 @@ class AnyRouterService:
         Returns:
             Tuple[bool, Dict]: (是否成功, API 状态信息或错误消息)
         """
-        session = self._get_session()
         try:
-            url = f"{self.base_url}{settings.anyrouter_status_api}"
-            response = session.get(
-                url,
-                headers=self.BASE_HEADERS,
-                timeout=settings.request_timeout
-            )
-
-            # 处理反爬虫挑战
-            if self._is_anti_crawler_challenge(response.text):
-                result = self.anti_crawler.solve(response.text)
-                if result:
-                    cookies = {"acw_sc__v2": result}
-                    time.sleep(2)
-                    response = session.get(
-                        url,
-                        headers=self.BASE_HEADERS,
-                        cookies=cookies,
-                        timeout=settings.request_timeout
-                    )
-
-            data = response.json()
-            return True, data.get("data", {})
-
-        except json.JSONDecodeError:
-            return False, {"message": "响应解析失败"}
+            return self._parse_api_status(self._execute("api_status"))
+        except CircuitOpenError as e:
+            return False, {"message": str(e)}
         except requests.RequestException as e:
             return False, {"message": f"网络请求失败: {str(e)}"}
         except Exception as e:
@@ -592,3 +692,4 @@ class AnyRouterService:
 
 # 单例
 anyrouter_service = AnyRouterService()
+metrics_registry.register_collector(anyrouter_service.collect_metrics)
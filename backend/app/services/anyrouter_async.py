@@ -0,0 +1,603 @@
+"""
+AnyRouter API 异步服务（基于 aiohttp）
+
+与 AnyRouterService 保持相同的方法签名与返回值，供 FastAPI 异步路由和
+调度任务在同一个事件循环中并发处理大量账号。
+"""
+import time
+import asyncio
+import logging
+from http.cookies import SimpleCookie
+from typing import Optional, Tuple, Dict, Any, List, AsyncIterator, Sequence
+
+import aiohttp
+
+from app.config import settings
+from app.services.anyrouter_core import (
+    AnyRouterBase, RequestRun, RefreshPlan, TokenPagePlan, CHALLENGE_DELAY,
+    check_refresh_operations, collect_token_pages
+)
+from app.services.cassette import CassetteMiss, decode_body
+from app.services.egress import Egress
+from app.services.http_response import UpstreamResponse, PEEK_CHUNK_SIZE, classify
+from app.services.upstream_policy import RequestPolicy
+from app.services.circuit_breaker import CircuitOpenError, FAILURE_NETWORK, FAILURE_CIRCUIT_OPEN
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAnyRouterService(AnyRouterBase):
+    """AnyRouter API 异步服务"""
+
+    def __init__(self):
+        super().__init__()
+        # 与同步服务共享出口池（分配、健康分与限流），每个出口一个 ClientSession
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def __aenter__(self) -> "AsyncAnyRouterService":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _get_client(self, egress: Egress) -> aiohttp.ClientSession:
+        """
+        获取出口共享的 ClientSession
+
+        ClientSession 与创建它的事件循环绑定，切换事件循环（如调度线程中的 asyncio.run）时重新创建；
+        绑定本地源地址的出口使用独立的连接器，代理出口在发送时指定 proxy
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 旧事件循环已结束，其中的 ClientSession 无法再关闭，直接丢弃
+            self._sessions = {}
+            self._loop = loop
+        session = self._sessions.get(egress.name)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.async_pool_limit,
+                limit_per_host=settings.async_pool_limit_per_host,
+                ttl_dns_cache=300,
+                keepalive_timeout=30,
+                local_addr=(egress.source_address, 0) if egress.source_address else None
+            )
+            # 不使用共享 CookieJar，每个请求显式携带所属账号的 Cookie
+            session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=settings.request_timeout)
+            )
+            self._sessions[egress.name] = session
+        return session
+
+    async def close(self):
+        """关闭所有出口的 ClientSession"""
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions = {}
+        self._loop = None
+
+    async def _get_cookies_with_challenge(self, session_cookie: str, user_id: str) -> Dict[str, str]:
+        """获取 Cookies 并处理反爬虫挑战（优先使用与同步服务共享的 Cookie 缓存）"""
+        cached = self.cookie_cache.get_cookies(self._egress_for(user_id).name, user_id, session_cookie)
+        if cached is not None:
+            return cached
+        cookies = await self._fetch_cookies(session_cookie, user_id)
+        return cookies if cookies is not None else {"session": session_cookie}
+
+    async def _fetch_cookies(self, session_cookie: str, user_id: str) -> Optional[Dict[str, str]]:
+        """请求控制台获取 Cookies、求解挑战并写入缓存，失败时返回 None"""
+        egress = self._egress_for(user_id).name
+        cookies = {"session": session_cookie}
+        headers = self._get_headers(user_id)
+
+        try:
+            policy = self.policies["console"]
+            url = f"{self.base_url}{policy.path}"
+            upstream = await self._send(policy, url, headers, cookies)
+            # 收集返回的 cookies
+            for name, morsel in upstream.cookies.items():
+                cookies[name] = morsel.value
+
+            # 检查并解决反爬虫挑战
+            if self._accept_challenge(upstream, cookies):
+                await asyncio.sleep(CHALLENGE_DELAY)
+                self._observe_challenge_sleep(policy.name)
+
+            self.cookie_cache.set_cookies(egress, user_id, cookies)
+            return cookies
+        except Exception as e:
+            logger.error(f"获取 Cookies 失败: {e}")
+            return None
+
+    async def _read(self, response: aiohttp.ClientResponse) -> UpstreamResponse:
+        """读取响应字节并判断类型（JSON 从字节直接解析，不做整体文本解码）"""
+        body = await response.read()
+        return UpstreamResponse(
+            kind=classify(body[:PEEK_CHUNK_SIZE]),
+            status_code=response.status,
+            body=body,
+            cookies=response.cookies,
+            encoding=response.charset
+        )
+
+    def _timeout_for(self, policy: RequestPolicy) -> aiohttp.ClientTimeout:
+        """按接口滚动延迟计算超时（与同步服务共享延迟统计）"""
+        connect, read = self.latency.timeout_for(policy.name, policy.get_timeout())
+        return aiohttp.ClientTimeout(total=policy.get_timeout(), sock_connect=connect, sock_read=read)
+
+    async def _send(
+        self,
+        policy: RequestPolicy,
+        url: str,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        payload: Optional[Dict[str, Any]] = None
+    ) -> UpstreamResponse:
+        """
+        发送请求并读取响应，成功响应的耗时计入延迟统计，所有响应计入指标（cassette 录制 / 回放同同步服务）
+
+        请求经账号（new-api-user）当前使用的出口发出，结果计入该出口的健康分
+        """
+        egress = self._egress_for(headers.get("new-api-user"))
+        async with self.rate_limiter.slot_async(url, egress=egress.name):
+            started = time.monotonic()
+            try:
+                if self.cassette is not None and self.cassette.replaying:
+                    upstream = await self._replay(policy, url, headers)
+                else:
+                    async with self._get_client(egress).request(
+                        policy.method,
+                        url,
+                        headers=headers,
+                        cookies=cookies,
+                        json=payload,
+                        proxy=egress.proxy,
+                        timeout=self._timeout_for(policy)
+                    ) as response:
+                        upstream = await self._read(response)
+                        if self.cassette is not None:
+                            self.cassette.record(
+                                policy.method, url, headers.get("new-api-user"), upstream.status_code,
+                                {name.lower(): value for name, value in response.headers.items()},
+                                {name: morsel.value for name, morsel in upstream.cookies.items()},
+                                upstream.kind, response.charset, upstream.body, started, time.monotonic() - started
+                            )
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                egress.record(False, time.monotonic() - started)
+                raise
+        elapsed = time.monotonic() - started
+        egress.record(upstream.status_code < 500 and upstream.status_code != 429, elapsed)
+        self.metrics.observe_phase(policy.name, "main", elapsed)
+        self.metrics.count_response(policy.name, upstream.status_code)
+        if upstream.status_code < 500:
+            self.latency.observe(policy.name, elapsed)
+        return upstream
+
+    async def _replay(self, policy: RequestPolicy, url: str, headers: Dict[str, str]) -> UpstreamResponse:
+        """从 cassette 取出录制的响应（语义同 AnyRouterService._replay）"""
+        try:
+            exchange = self.cassette.next_exchange(policy.method, url, headers.get("new-api-user"))
+        except CassetteMiss as e:
+            raise aiohttp.ClientConnectionError(str(e))
+        await asyncio.sleep(self.cassette.delay(exchange))
+        cookies = SimpleCookie()
+        for name, value in exchange["c"].items():
+            cookies[name] = value
+        return UpstreamResponse(
+            kind=exchange["k"],
+            status_code=exchange["s"],
+            body=decode_body(exchange["b"]),
+            cookies=cookies,
+            encoding=exchange["e"]
+        )
+
+    async def _attempt(
+        self,
+        policy: RequestPolicy,
+        url: str,
+        session_cookie: Optional[str],
+        user_id: Optional[str],
+        payload: Optional[Dict[str, Any]],
+        record: Dict[str, Any]
+    ) -> UpstreamResponse:
+        """
+        单次尝试：获取 Cookies、发送、响应为挑战页时解决后重发一次
+
+        处于同一账号的组合刷新中时，复用绑定的 Cookies（ClientSession 本身按出口共享）
+        """
+        binding = self._binding_for(policy, user_id)
+        cookies = self._bound_cookies(policy, binding)
+        if cookies is None:
+            started = time.monotonic()
+            cookies = await self._get_cookies_with_challenge(session_cookie, user_id)
+            self._bind_cookies(policy, record, binding, cookies, started)
+        headers = self._request_headers(policy, user_id, payload)
+
+        response = await self._send(policy, url, headers, cookies, payload)
+
+        # 处理反爬虫挑战（缓存的 Cookies 失效时也会走到这里）
+        if self._accept_attempt_challenge(policy, response, cookies, user_id, record):
+            await asyncio.sleep(CHALLENGE_DELAY)
+            self._observe_challenge_sleep(policy.name, record)
+            response = await self._send(policy, url, headers, cookies, payload)
+
+        self._drop_stale_cookies(policy, response, user_id, binding)
+        return response
+
+    async def _attempt_hedged(
+        self,
+        policy: RequestPolicy,
+        url: str,
+        session_cookie: Optional[str],
+        user_id: Optional[str],
+        payload: Optional[Dict[str, Any]],
+        record: Dict[str, Any]
+    ) -> UpstreamResponse:
+        """带对冲的单次尝试（语义同 AnyRouterService._attempt_hedged，任务不排队，落选的请求会被取消）"""
+        delay = self._hedge_delay(policy)
+        if delay is None:
+            return await self._attempt(policy, url, session_cookie, user_id, payload, record)
+
+        # 每路使用独立的尝试记录，只有胜出一路的记录合并回 record
+        records = {"primary": dict(record)}
+        primary = asyncio.ensure_future(self._attempt(policy, url, session_cookie, user_id, payload, records["primary"]))
+        hedge = None
+        winner = "primary"
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return await primary
+            hedge_record = self._hedge_record(record)
+            if hedge_record is None:
+                return await primary
+
+            records["hedge"] = hedge_record
+            hedge = asyncio.ensure_future(self._attempt(policy, url, session_cookie, user_id, payload, hedge_record))
+            done, _ = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+            first = primary if primary in done else hedge
+            other = hedge if first is primary else primary
+            winner = "primary" if first is primary else "hedge"
+            try:
+                response = first.result()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                first = other
+                winner = "primary" if first is primary else "hedge"
+                response = await other
+            self.latency.record_hedge(policy.name, won=first is hedge)
+            return response
+        finally:
+            record.update(records[winner])
+            # 落选的请求被取消，不再发出重发请求，也不计入指标
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _should_retry_error(policy: RequestPolicy, error: Exception) -> bool:
+        """根据网络异常判断是否需要重试"""
+        if isinstance(error, aiohttp.ClientConnectorError):
+            # 连接失败时请求未发出
+            return True
+        return policy.idempotent and isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+    async def _request(
+        self,
+        policy_name: str,
+        session_cookie: Optional[str] = None,
+        user_id: Optional[str] = None,
+        path_suffix: str = "",
+        payload: Optional[Dict[str, Any]] = None
+    ) -> UpstreamResponse:
+        """
+        按接口策略执行请求（与 AnyRouterService._execute 共用策略表、重试预算与重试判定）
+
+        Raises:
+            aiohttp.ClientError / asyncio.TimeoutError: 所有尝试均因网络异常失败
+            CircuitOpenError: 接口熔断中，请求未发出
+        """
+        policy = self.policies[policy_name]
+        url = f"{self.base_url}{policy.path}{path_suffix}"
+        run = RequestRun(self, policy, user_id)
+        while run.next_attempt():
+            if run.delay:
+                await asyncio.sleep(run.delay)
+            if not run.proceed():
+                break
+            try:
+                response = await self._attempt_hedged(policy, url, session_cookie, user_id, payload, run.record)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                run.fail(e, self._should_retry_error(policy, e))
+            else:
+                run.complete(response)
+        return run.result()
+
+    async def _fetch_data(
+        self,
+        policy_name: str,
+        session_cookie: str,
+        user_id: str,
+        fail_msg: str,
+        path_suffix: str = "",
+        payload: Optional[Dict[str, Any]] = None
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """请求并解析 {success, data, message} 格式的响应（失败时带 error_type）"""
+        try:
+            response = await self._request(policy_name, session_cookie, user_id, path_suffix, payload)
+            return self._parse_result(policy_name, user_id, response, fail_msg)
+        except CircuitOpenError as e:
+            return False, {"message": str(e), "error_type": FAILURE_CIRCUIT_OPEN}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return False, {"message": f"网络请求失败: {str(e)}", "error_type": FAILURE_NETWORK}
+        except Exception as e:
+            return False, {"message": f"未知错误: {str(e)}"}
+
+    async def get_user_info(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """获取用户信息"""
+        success, data = await self._fetch_data(
+            "user_info", session_cookie, user_id, "获取用户信息失败"
+        )
+        if success:
+            return True, data.get("data", {})
+        return False, data
+
+    async def get_user_infos(
+        self,
+        credentials: List[Tuple[str, str]],
+        concurrency: Optional[int] = None
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        并发获取多个账号的用户信息
+
+        Args:
+            credentials: [(session_cookie, user_id), ...]
+            concurrency: 最大并发数，默认取 settings.async_concurrency
+
+        Returns:
+            List[Tuple[bool, Dict]]: 与 credentials 顺序一致的结果列表
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.async_concurrency)
+
+        async def fetch(session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await self.get_user_info(session_cookie, user_id)
+                except Exception as e:
+                    return False, {"message": f"未知错误: {str(e)}"}
+
+        return await asyncio.gather(*(fetch(cookie, uid) for cookie, uid in credentials))
+
+    async def prewarm_cookies(
+        self,
+        credentials: List[Tuple[str, str]],
+        concurrency: Optional[int] = None
+    ) -> List[bool]:
+        """
+        并发为多个账号重新获取并缓存反爬虫 Cookies（签到前预热）
+
+        不读取现有缓存，预热后的 Cookies 在整个缓存有效期内可用，签到时跳过控制台预请求
+
+        Args:
+            credentials: [(session_cookie, user_id), ...]
+            concurrency: 最大并发数，默认取 settings.sign_prewarm_concurrency
+
+        Returns:
+            List[bool]: 与 credentials 顺序一致的是否已就绪（取得并缓存了 Cookies）
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.sign_prewarm_concurrency))
+
+        async def prewarm(session_cookie: str, user_id: str) -> bool:
+            async with semaphore:
+                return await self._fetch_cookies(session_cookie, user_id) is not None
+
+        return await asyncio.gather(*(prewarm(cookie, uid) for cookie, uid in credentials))
+
+    async def refresh_account(
+        self,
+        session_cookie: str,
+        user_id: str,
+        operations: Sequence[str]
+    ) -> Dict[str, Tuple[bool, Dict[str, Any]]]:
+        """组合刷新：按顺序执行账号的多个操作，只做一次预请求（语义同 AnyRouterService.refresh_account）"""
+        plan = RefreshPlan(operations)
+        with self._refresh_scope(user_id):
+            for operation in plan:
+                plan.record(operation, *await self._run_operation(operation, session_cookie, user_id))
+        return plan.results
+
+    async def _run_operation(self, operation: str, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """执行组合刷新中的单个操作"""
+        if operation == "tokens":
+            return collect_token_pages([page async for page in self.iter_token_pages(session_cookie, user_id)])
+        return await self._operation_method(operation)(session_cookie, user_id)
+
+    async def refresh_accounts(
+        self,
+        credentials: List[Tuple[str, str]],
+        operations: Sequence[str],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Tuple[bool, Dict[str, Any]]]]:
+        """
+        并发对多个账号执行组合刷新
+
+        Args:
+            credentials: [(session_cookie, user_id), ...]
+            operations: 每个账号执行的操作列表
+            concurrency: 最大并发账号数，默认取 settings.async_concurrency
+
+        Returns:
+            List[Dict]: 与 credentials 顺序一致的 {操作: (是否成功, 结果)} 列表
+        """
+        check_refresh_operations(operations)
+        semaphore = asyncio.Semaphore(concurrency or settings.async_concurrency)
+
+        async def refresh(session_cookie: str, user_id: str) -> Dict[str, Tuple[bool, Dict[str, Any]]]:
+            async with semaphore:
+                try:
+                    return await self.refresh_account(session_cookie, user_id, operations)
+                except Exception as e:
+                    error = {"message": f"未知错误: {str(e)}"}
+                    return {operation: (False, dict(error)) for operation in operations}
+
+        return await asyncio.gather(*(refresh(cookie, uid) for cookie, uid in credentials))
+
+    async def sign_in(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """执行签到"""
+        try:
+            return self._parse_sign_in(user_id, await self._request("sign_in", session_cookie, user_id))
+        except CircuitOpenError as e:
+            return False, {"success": False, "message": str(e), "error_type": FAILURE_CIRCUIT_OPEN}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"签到请求失败: {e}")
+        except Exception as e:
+            logger.error(f"签到异常: {e}")
+
+        return False, {"success": False, "message": "重试次数已用完", "error_type": FAILURE_NETWORK}
+
+    async def get_tokens(self, session_cookie: str, user_id: str, page: int = 0, size: int = 50) -> Tuple[bool, Dict[str, Any]]:
+        """获取 API Token 列表"""
+        success, data = await self._fetch_data(
+            "tokens", session_cookie, user_id, "获取 Token 列表失败",
+            path_suffix=f"?p={page}&size={size}"
+        )
+        if success:
+            return True, self._token_page_result(page, data)
+        return False, data
+
+    async def iter_token_pages(
+        self,
+        session_cookie: str,
+        user_id: str,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[bool, Dict[str, Any]]]:
+        """分页获取全部 API Token，按页到达顺序逐页产出（语义同 AnyRouterService.iter_token_pages）"""
+        plan = TokenPagePlan(page_size, concurrency)
+        success, first = await self.get_tokens(session_cookie, user_id, page=0, size=plan.size)
+        yield success, first
+        if not success or not plan.start(first):
+            return
+
+        semaphore = asyncio.Semaphore(plan.workers)
+
+        async def fetch(page: int) -> Tuple[bool, Dict[str, Any]]:
+            async with semaphore:
+                return await self.get_tokens(session_cookie, user_id, page=page, size=plan.size)
+
+        for batch in plan.batches():
+            tasks = [asyncio.ensure_future(fetch(page)) for page in batch]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    success, result = await next_done
+                    if not success:
+                        yield False, result
+                        return
+                    if plan.accept(result):
+                        yield True, result
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def get_models(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """获取可用模型列表"""
+        success, data = await self._fetch_data(
+            "models", session_cookie, user_id, "获取模型列表失败"
+        )
+        if success:
+            return True, {"models": data.get("data", [])}
+        return False, data
+
+    async def get_groups(self, session_cookie: str, user_id: str) -> Tuple[bool, Dict[str, Any]]:
+        """获取账号分组列表"""
+        success, data = await self._fetch_data(
+            "groups", session_cookie, user_id, "获取分组列表失败"
+        )
+        if success:
+            return True, {"groups": data.get("data", {})}
+        return False, data
+
+    async def _token_request(
+        self,
+        session_cookie: str,
+        user_id: str,
+        payload: Dict[str, Any],
+        method: str = "post",
+        success_msg: str = "操作成功",
+        fail_msg: str = "操作失败"
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """令牌相关请求的通用方法"""
+        policy_name = "token_create" if method == "post" else "token_update"
+        success, data = await self._fetch_data(
+            policy_name, session_cookie, user_id, fail_msg, payload=payload
+        )
+        if success:
+            return True, {"message": data.get("message", success_msg)}
+        return False, data
+
+    async def create_token(
+        self,
+        session_cookie: str,
+        user_id: str,
+        name: str,
+        remain_quota: int = 500000,
+        expired_time: int = -1,
+        unlimited_quota: bool = False,
+        model_limits_enabled: bool = False,
+        model_limits: str = "",
+        allow_ips: str = "",
+        group: str = "default"
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """创建访问令牌"""
+        payload = {
+            "name": name,
+            "remain_quota": remain_quota,
+            "expired_time": expired_time,
+            "unlimited_quota": unlimited_quota,
+            "model_limits_enabled": model_limits_enabled,
+            "model_limits": model_limits,
+            "allow_ips": allow_ips,
+            "group": group
+        }
+        return await self._token_request(
+            session_cookie, user_id, payload,
+            method="post", success_msg="创建成功", fail_msg="创建令牌失败"
+        )
+
+    async def update_token(
+        self,
+        session_cookie: str,
+        user_id: str,
+        token_data: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """更新访问令牌"""
+        return await self._token_request(
+            session_cookie, user_id, token_data,
+            method="put", success_msg="更新成功", fail_msg="更新令牌失败"
+        )
+
+    async def delete_token(self, session_cookie: str, user_id: str, token_id: int) -> Tuple[bool, Dict[str, Any]]:
+        """删除访问令牌"""
+        success, data = await self._fetch_data(
+            "token_delete", session_cookie, user_id, "删除令牌失败",
+            path_suffix=f"/{token_id}"
+        )
+        if success:
+            return True, {"message": data.get("message", "删除成功")}
+        return False, data
+
+    async def get_api_status(self) -> Tuple[bool, Dict[str, Any]]:
+        """获取 API 节点状态（公开接口，无需认证）"""
+        try:
+            return self._parse_api_status(await self._request("api_status"))
+        except CircuitOpenError as e:
+            return False, {"message": str(e)}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return False, {"message": f"网络请求失败: {str(e)}"}
+        except Exception as e:
+            return False, {"message": f"未知错误: {str(e)}"}
+
+
+# 单例（供 FastAPI 事件循环使用；调度线程中请使用独立实例并在结束时关闭）
+async_anyrouter_service = AsyncAnyRouterService()
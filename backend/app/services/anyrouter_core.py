@@ -0,0 +1,658 @@
+"""
+AnyRouter API 服务的公共部分（与传输无关）
+
+同步服务（requests）与异步服务（aiohttp）共用的策略与判定逻辑：
+重试 / 预算 / 熔断的执行状态、响应分类与解析、反爬虫挑战求解、对冲决策、
+组合刷新的执行计划与 Token 分页计划。两个服务只负责各自的 I/O（发送、等待、并发）。
+"""
+import re
+import json
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, Any, List, Iterator, Sequence, Callable
+
+from app.config import settings
+from app.services.egress import Egress, egress_pool
+from app.services.cache import cookie_cache
+from app.services.cassette import cassette
+from app.services.http_response import UpstreamResponse
+from app.services.upstream_policy import RequestPolicy, build_policies, retry_budget, hedge_budget
+from app.services.latency import latency_tracker
+from app.services.metrics import upstream_metrics
+from app.services.rate_limiter import rate_limiter
+from app.services.circuit_breaker import (
+    circuit_breakers, classify_failure, CircuitOpenError,
+    BREAKER_FAILURES, FAILURE_AUTH, FAILURE_NETWORK
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 挑战页中的 arg1 参数
+ARG1_PATTERN = re.compile(r"var arg1='([^']+)'")
+
+# 可按整块字节异或的输入（纯 ASCII 十六进制）
+HEX_PATTERN = re.compile(r"[0-9a-fA-F]*")
+
+# 求解挑战后重发前的等待时间（秒）
+CHALLENGE_DELAY = 2
+
+# 组合刷新（refresh_account）支持的操作
+REFRESH_OPERATIONS = ("sign_in", "user_info", "tokens", "models", "groups")
+
+
+class AccountBinding:
+    """
+    组合刷新期间绑定到账号的 Cookies
+
+    同一账号的后续请求复用首个请求取得的 Cookies（含挑战求解结果），不再做预请求。
+    不在整个组合刷新期间占用 Session：每个请求只在自身 I/O 期间借出 Session，
+    Token 分页与对冲请求的工作线程也各自借出，不会出现持有 Session 时等待池中 Session 的情况
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = str(user_id)
+        self.cookies: Optional[Dict[str, str]] = None
+
+    def applies_to(self, user_id: Optional[str]) -> bool:
+        return user_id is not None and str(user_id) == self.user_id
+
+
+# 当前上下文中的组合刷新绑定（Token 分页与对冲请求的工作线程 / 任务沿用调用方上下文）
+account_binding: contextvars.ContextVar[Optional[AccountBinding]] = contextvars.ContextVar(
+    "account_binding", default=None
+)
+
+
+def check_refresh_operations(operations: Sequence[str]):
+    """校验组合刷新的操作列表"""
+    unknown = [operation for operation in operations if operation not in REFRESH_OPERATIONS]
+    if unknown:
+        raise ValueError(f"不支持的组合刷新操作: {', '.join(unknown)}")
+
+
+def sign_operations() -> Tuple[str, ...]:
+    """签到使用的组合刷新操作"""
+    return ("sign_in", "user_info") if settings.sign_refresh_user_info else ("sign_in",)
+
+
+def health_check_operations() -> Tuple[str, ...]:
+    """健康检查使用的组合刷新操作"""
+    return ("user_info", "tokens") if settings.health_check_sync_tokens else ("user_info",)
+
+
+def collect_token_pages(pages: List[Tuple[bool, Dict[str, Any]]]) -> Tuple[bool, Dict[str, Any]]:
+    """将 Token 分页结果合并为组合刷新中 tokens 操作的结果"""
+    failed = next((result for success, result in pages if not success), None)
+    if failed is not None:
+        return False, {**failed, "pages": pages}
+    return True, {"pages": pages}
+
+
+def parse_token_page(data: Any) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[int]]:
+    """
+    解析 Token 列表接口的 data 字段
+
+    兼容两种格式：旧版直接返回列表；新版返回 {items, total, page, page_size}
+
+    Returns:
+        Tuple: (当前页 Token 列表, 总数（未知时为 None）, 服务端页码（未知时为 None）)
+    """
+    if isinstance(data, dict):
+        return data.get("items") or [], data.get("total"), data.get("page")
+    return data or [], None, None
+
+
+def should_retry(policy: RequestPolicy, response: UpstreamResponse) -> bool:
+    """根据响应判断是否需要重试"""
+    if response.is_challenge:
+        # 挑战页说明请求未被处理，非幂等请求也可安全重发
+        return True
+    if response.is_empty:
+        return policy.retry_on_empty
+    if not policy.idempotent:
+        return False
+    # 5xx 或网关返回的非 JSON 错误页
+    return response.status_code >= 500 or response.kind == "other"
+
+
+class AntiCrawlerSolver:
+    """
+    阿里云盾反爬虫挑战解决器
+
+    初始化时预计算重排下标表与 XOR 掩码字节，单次求解为 O(n)；
+    同一 arg1 的结果通过 LRU 缓存复用，突发的重复挑战无需重复计算
+    """
+
+    def __init__(self, mask: Optional[str] = None, pos_list: Optional[List[int]] = None, cache_size: Optional[int] = None):
+        self.mask = settings.anti_crawler_mask if mask is None else mask
+        self.pos_list = settings.anti_crawler_pos_list if pos_list is None else pos_list
+
+        # 重排下标表：output[j] = input[pos_list[j] - 1]
+        # 位置重复时只保留第一次出现（与逐字符匹配首个位置的语义一致）
+        seen = set()
+        self._gather_indexes = []
+        for pos in self.pos_list:
+            if pos >= 1 and pos not in seen:
+                seen.add(pos)
+                self._gather_indexes.append(pos - 1)
+        self._max_index = max(self._gather_indexes, default=-1)
+
+        # 掩码只取完整的字节对
+        self._mask_bytes = bytes.fromhex(self.mask[:len(self.mask) // 2 * 2])
+
+        size = settings.anti_crawler_cache_size if cache_size is None else cache_size
+        self._solve_arg1 = lru_cache(maxsize=size)(self._compute)
+
+    def solve(self, html_content: str) -> Optional[str]:
+        """解决反爬虫挑战"""
+        try:
+            arg1_match = ARG1_PATTERN.search(html_content)
+            if not arg1_match:
+                return None
+
+            return self._solve_arg1(arg1_match.group(1))
+        except Exception as e:
+            logger.error(f"解决反爬虫挑战失败: {e}")
+            return None
+
+    def _compute(self, arg1: str) -> str:
+        """根据 arg1 计算 acw_sc__v2"""
+        return self._xor_decrypt(self._reorder_string(arg1))
+
+    def _reorder_string(self, input_str: str) -> str:
+        """根据预计算的下标表重排序字符串"""
+        if len(input_str) > self._max_index:
+            return ''.join([input_str[i] for i in self._gather_indexes])
+        length = len(input_str)
+        return ''.join([input_str[i] for i in self._gather_indexes if i < length])
+
+    def _xor_decrypt(self, input_str: str) -> str:
+        """XOR 解密（整块字节异或；非纯十六进制的输入逐对处理）"""
+        size = min(len(input_str) // 2, len(self._mask_bytes))
+        if size == 0:
+            return ''
+        chunk = input_str[:size * 2]
+        if not HEX_PATTERN.fullmatch(chunk):
+            return self._xor_pairs(chunk)
+        data = int.from_bytes(bytes.fromhex(chunk), "big")
+        mask = int.from_bytes(self._mask_bytes[:size], "big")
+        return (data ^ mask).to_bytes(size, "big").hex()
+
+    def _xor_pairs(self, input_str: str) -> str:
+        """
+        逐对按 int(x, 16) 异或
+
+        与旧版逐字符实现的宽松解析保持一致（容忍空白、正负号与全角数字），
+        无法解析时抛出 ValueError，由 solve 返回 None
+        """
+        return ''.join(
+            hex(int(input_str[i:i + 2], 16) ^ self._mask_bytes[i // 2])[2:].zfill(2)
+            for i in range(0, len(input_str), 2)
+        )
+
+    def cache_info(self) -> Dict[str, int]:
+        """获取求解缓存统计"""
+        info = self._solve_arg1.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+
+class RequestRun:
+    """
+    单个请求按接口策略执行时的重试状态
+
+    负责熔断检查、重试预算、退避时间、尝试记录与失败分类，并决定是否继续尝试；
+    退避等待与发送由调用方完成。用法：
+
+        run = RequestRun(service, policy, user_id)
+        while run.next_attempt():
+            等待 run.delay 秒
+            if not run.proceed():
+                break
+            发送请求，成功时 run.complete(response)，网络异常时 run.fail(error, ...)
+        return run.result()
+
+    Raises:
+        CircuitOpenError: 接口熔断中，请求未发出（创建时检查）
+    """
+
+    def __init__(self, service: "AnyRouterBase", policy: RequestPolicy, user_id: Optional[str]):
+        self.service = service
+        self.policy = policy
+        self.user_id = user_id
+        self.breaker = service.breakers.get(policy.name)
+        if not self.breaker.allow():
+            raise CircuitOpenError(policy.name, self.breaker.retry_after())
+        service.retry_budget.record_request()
+
+        self.attempt = 0
+        # 本次尝试发出前需等待的退避时间（秒）
+        self.delay = 0.0
+        self.record: Dict[str, Any] = {}
+        self.response: Optional[UpstreamResponse] = None
+        self.error: Optional[Exception] = None
+        self._done = False
+        self._started = 0.0
+
+    def next_attempt(self) -> bool:
+        """准备下一次尝试；已得到结果、次数用完或重试预算耗尽时返回 False"""
+        if self._done or self.attempt >= self.policy.max_attempts:
+            return False
+        self.attempt += 1
+        self.delay = 0.0
+        self.record = {
+            "endpoint": self.policy.name,
+            "attempt": self.attempt,
+            "user_id": self.user_id,
+            "challenge": False,
+            "preflight_ms": 0.0,
+            "sleep_ms": 0.0,
+        }
+        if self.attempt == 1:
+            return True
+
+        if not self.service.retry_budget.try_acquire_retry():
+            logger.warning(f"{self.policy.name} 重试预算已耗尽，放弃第 {self.attempt} 次尝试")
+            return False
+        self.service.metrics.count_retry(self.policy.name)
+        self.delay = self.policy.backoff_delay(self.attempt - 1)
+        self.record["sleep_ms"] = self.delay * 1000
+        self.service.metrics.observe_phase(self.policy.name, "sleep", self.delay)
+        return True
+
+    def proceed(self) -> bool:
+        """退避结束后调用：重试前确认熔断器仍允许请求，并开始计时"""
+        if self.attempt > 1 and not self.breaker.allow():
+            logger.warning(f"{self.policy.name} 已熔断，放弃第 {self.attempt} 次尝试")
+            return False
+        self._started = time.monotonic()
+        return True
+
+    def complete(self, response: UpstreamResponse):
+        """本次尝试得到响应：分类失败类型，凭证失效或无需重试时结束"""
+        self.response, self.error = response, None
+        failure = classify_failure(response)
+        self._finish(failure)
+        if failure == FAILURE_AUTH:
+            # 凭证失效，重试无意义
+            self.service.cookie_cache.invalidate_cookies(self.service._egress_for(self.user_id).name, self.user_id)
+            self._done = True
+        elif not should_retry(self.policy, response):
+            self._done = True
+
+    def fail(self, error: Exception, retry: bool, counted: bool = True):
+        """
+        本次尝试因网络异常失败
+
+        Args:
+            error: 异常
+            retry: 该异常是否可重试（由各传输按异常类型判断）
+            counted: 是否计入熔断（本地连接池繁忙等请求未发出的情况不计入）
+        """
+        self.response, self.error = None, error
+        self._finish(FAILURE_NETWORK if counted else None)
+        if not retry:
+            self._done = True
+
+    def _finish(self, failure: Optional[str]):
+        self.breaker.record(failure in BREAKER_FAILURES)
+        self.record["elapsed_ms"] = round((time.monotonic() - self._started) * 1000, 1)
+        self.record["status"] = self.response.status_code if self.response is not None else None
+        self.record["outcome"] = self.response.kind if self.response is not None else type(self.error).__name__
+        self.record["failure"] = failure
+        self.service._record_attempt(self.record)
+
+    def result(self) -> UpstreamResponse:
+        """最后一次尝试的响应；所有尝试均因网络异常失败时抛出最后的异常"""
+        if self.response is not None:
+            return self.response
+        raise self.error
+
+
+class RefreshPlan:
+    """
+    组合刷新的执行计划
+
+    按给定顺序产出待执行的操作；某个操作返回凭证失效后，剩余操作不再执行，直接记为同样的失败
+    """
+
+    def __init__(self, operations: Sequence[str]):
+        check_refresh_operations(operations)
+        self.operations = tuple(operations)
+        self.results: Dict[str, Tuple[bool, Dict[str, Any]]] = {}
+        self._auth_failure: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for operation in self.operations:
+            if self._auth_failure is not None:
+                self.results[operation] = (False, dict(self._auth_failure))
+            else:
+                yield operation
+
+    def record(self, operation: str, success: bool, data: Dict[str, Any]):
+        """记录操作结果"""
+        self.results[operation] = (success, data)
+        if data.get("error_type") == FAILURE_AUTH:
+            self._auth_failure = {"message": data.get("message"), "error_type": FAILURE_AUTH}
+
+
+class TokenPagePlan:
+    """
+    Token 分页计划
+
+    首页返回总数时，其余页一次全部规划（并发度由调用方限制）；
+    未返回总数时按并发数成批探测后续页，直到出现不满一页为止
+    """
+
+    def __init__(self, page_size: Optional[int] = None, concurrency: Optional[int] = None):
+        self.size = page_size or settings.token_page_size
+        self.workers = max(1, concurrency or settings.token_fetch_concurrency)
+        self.total: Optional[int] = None
+        self.next_page = 0
+        self.exhausted = False
+
+    def start(self, first: Dict[str, Any]) -> bool:
+        """根据首页结果确定后续页，返回是否还有后续页"""
+        self.total = first["total"]
+        # 新版接口页码从 1 开始（p=0 按第 1 页处理），以服务端返回的页码为准
+        self.next_page = first["page"] + 1
+        if self.total is not None:
+            self.exhausted = -(-self.total // self.size) <= 1
+        else:
+            self.exhausted = len(first["tokens"]) < self.size
+        return not self.exhausted
+
+    def batches(self) -> Iterator[range]:
+        """依次产出需要同时请求的页码批次"""
+        while not self.exhausted:
+            if self.total is not None:
+                yield range(self.next_page, self.next_page + -(-self.total // self.size) - 1)
+                return
+            yield range(self.next_page, self.next_page + self.workers)
+            self.next_page += self.workers
+
+    def accept(self, result: Dict[str, Any]) -> bool:
+        """记录一页结果（出现不满一页时不再探测），返回该页是否需要产出"""
+        if len(result["tokens"]) < self.size:
+            self.exhausted = True
+        return bool(result["tokens"])
+
+
+class AnyRouterBase:
+    """
+    AnyRouter API 服务基类
+
+    持有两种传输共享的状态（出口池、策略表、重试 / 对冲预算、熔断器、延迟统计、Cookie 缓存），
+    实现与传输无关的判定与解析；子类实现发送、等待与并发
+    """
+
+    BASE_HEADERS = {
+        "accept": "application/json, text/plain, */*",
+        "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
+        "cache-control": "no-store",
+        "pragma": "no-cache",
+        "priority": "u=1, i",
+        "referer": "https://anyrouter.top/console",
+        "sec-ch-ua": '"Microsoft Edge";v="143", "Chromium";v="143", "Not A(Brand";v="24"',
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": '"Windows"',
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-origin",
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36 Edg/143.0.0.0"
+    }
+
+    def __init__(self):
+        self.anti_crawler = AntiCrawlerSolver()
+        self.base_url = settings.anyrouter_base_url
+        self.cookie_cache = cookie_cache
+        # 出口池：账号固定分配到出口；反爬虫 Cookie 与出口绑定，出口名称作为 Cookie 缓存键的一部分
+        self.egresses = egress_pool
+        # 各接口的请求策略与进程级重试预算
+        self.policies = build_policies()
+        self.retry_budget = retry_budget
+        # 进程级按主机限流，批量任务与页面操作共享额度
+        self.rate_limiter = rate_limiter
+        # 按接口的熔断器，上游持续异常时直接失败
+        self.breakers = circuit_breakers
+        # 按接口滚动延迟：自适应超时与对冲请求
+        self.latency = latency_tracker
+        self.metrics = upstream_metrics
+        self.cassette = cassette
+        self.hedge_budget = hedge_budget
+
+    def _egress_for(self, user_id: Optional[str]) -> Egress:
+        """账号当前使用的出口"""
+        return self.egresses.for_account(user_id)
+
+    def _get_headers(self, user_id: str) -> Dict[str, str]:
+        """获取请求头，包含 new-api-user"""
+        headers = self.BASE_HEADERS.copy()
+        headers["new-api-user"] = str(user_id)
+        return headers
+
+    def _request_headers(self, policy: RequestPolicy, user_id: Optional[str], payload: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """单次尝试的请求头（需要凭证的接口带 new-api-user）"""
+        headers = self._get_headers(user_id) if policy.authenticated else self.BASE_HEADERS.copy()
+        if payload is not None:
+            headers["content-type"] = "application/json"
+        return headers
+
+    def get_circuit_retry_after(self, policy_name: str) -> float:
+        """接口熔断打开时返回距离恢复探测的秒数，未熔断时返回 0"""
+        return self.breakers.get(policy_name).retry_after()
+
+    def _record_attempt(self, record: Dict[str, Any]):
+        """
+        记录单次尝试的耗时明细
+
+        record 包含 endpoint、attempt、status、outcome、elapsed_ms、preflight_ms、
+        challenge、sleep_ms 等字段，以结构化日志输出并计入指标
+        """
+        self.metrics.observe_attempt(record)
+        logger.debug(
+            f"上游请求 {record['endpoint']} 第 {record['attempt']} 次: "
+            f"{record['outcome']} {record['elapsed_ms']}ms",
+            extra={"extra_data": record}
+        )
+
+    # ---------- Cookies 与反爬虫挑战 ----------
+
+    @staticmethod
+    def _binding_for(policy: RequestPolicy, user_id: Optional[str]) -> Optional[AccountBinding]:
+        """当前请求可用的组合刷新绑定（只用于同一账号的认证请求）"""
+        binding = account_binding.get()
+        if binding is not None and policy.authenticated and binding.applies_to(user_id):
+            return binding
+        return None
+
+    @staticmethod
+    def _bound_cookies(policy: RequestPolicy, binding: Optional[AccountBinding]) -> Optional[Dict[str, str]]:
+        """无需预请求即可使用的 Cookies：公开接口为空，组合刷新中复用绑定的 Cookies；需要预请求时返回 None"""
+        if not policy.authenticated:
+            return {}
+        if binding is not None:
+            return binding.cookies
+        return None
+
+    def _bind_cookies(
+        self,
+        policy: RequestPolicy,
+        record: Dict[str, Any],
+        binding: Optional[AccountBinding],
+        cookies: Dict[str, str],
+        started: float
+    ):
+        """记录预请求耗时，并将取得的 Cookies 绑定到组合刷新"""
+        preflight = time.monotonic() - started
+        record["preflight_ms"] = round(preflight * 1000, 1)
+        self.metrics.observe_phase(policy.name, "preflight", preflight)
+        if binding is not None:
+            binding.cookies = cookies
+
+    def _accept_challenge(
+        self,
+        response: UpstreamResponse,
+        cookies: Dict[str, str],
+        user_id: Optional[str] = None,
+        endpoint: str = "console"
+    ) -> bool:
+        """
+        响应为反爬虫挑战时求解，并将结果写入 cookies
+
+        Args:
+            response: 上游响应
+            cookies: 当前请求使用的 Cookies（原地更新）
+            user_id: 账号 ID，提供时同步更新该账号的 Cookie 缓存
+            endpoint: 收到挑战页的接口名称（用于指标）
+
+        Returns:
+            bool: 是否已求解；调用方应等待 CHALLENGE_DELAY 秒后携带新 Cookies 重发请求
+        """
+        if not response.is_challenge:
+            return False
+
+        started = time.monotonic()
+        result = self.anti_crawler.solve(response.text)
+        self.metrics.observe_phase(endpoint, "challenge_solve", time.monotonic() - started)
+        self.metrics.count_challenge(endpoint, solved=bool(result))
+        if not result:
+            if user_id is not None:
+                self.cookie_cache.invalidate_cookies(self._egress_for(user_id).name, user_id)
+            return False
+
+        cookies["acw_sc__v2"] = result
+        if user_id is not None:
+            self.cookie_cache.set_cookies(self._egress_for(user_id).name, user_id, cookies)
+        return True
+
+    def _accept_attempt_challenge(
+        self,
+        policy: RequestPolicy,
+        response: UpstreamResponse,
+        cookies: Dict[str, str],
+        user_id: Optional[str],
+        record: Dict[str, Any]
+    ) -> bool:
+        """单次尝试收到挑战页时按策略求解，返回是否应在等待后重发（求解后的重发不计入尝试次数）"""
+        if not (policy.handle_challenge and response.is_challenge):
+            return False
+        record["challenge"] = True
+        return self._accept_challenge(response, cookies, user_id if policy.authenticated else None, policy.name)
+
+    def _observe_challenge_sleep(self, endpoint: str, record: Optional[Dict[str, Any]] = None):
+        """记录求解挑战后的等待"""
+        self.metrics.observe_phase(endpoint, "sleep", CHALLENGE_DELAY)
+        if record is not None:
+            record["sleep_ms"] += CHALLENGE_DELAY * 1000
+
+    def _drop_stale_cookies(
+        self,
+        policy: RequestPolicy,
+        response: UpstreamResponse,
+        user_id: Optional[str],
+        binding: Optional[AccountBinding]
+    ):
+        """求解后仍是挑战页时，缓存（及组合刷新绑定）的 Cookies 已不可用"""
+        if policy.authenticated and response.is_challenge:
+            self.cookie_cache.invalidate_cookies(self._egress_for(user_id).name, user_id)
+            if binding is not None:
+                binding.cookies = None
+
+    # ---------- 对冲 ----------
+
+    def _hedge_delay(self, policy: RequestPolicy) -> Optional[float]:
+        """
+        对冲等待时间：首个请求超过该时间仍未返回时考虑发出对冲请求
+
+        未开启对冲或样本不足时返回 None；返回值非空时已计入对冲预算的请求数
+        """
+        if not (policy.hedge and settings.hedged_reads_enabled):
+            return None
+        delay = self.latency.hedge_delay(policy.name)
+        if delay is not None:
+            self.hedge_budget.record_request()
+        return delay
+
+    def _hedge_record(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """对冲预算允许时标记本次尝试已对冲，并返回对冲请求使用的尝试记录；预算耗尽时返回 None"""
+        if not self.hedge_budget.try_acquire_retry():
+            return None
+        record["hedged"] = True
+        return dict(record)
+
+    # ---------- 响应解析 ----------
+
+    def _parse_result(
+        self,
+        policy_name: str,
+        user_id: Optional[str],
+        response: UpstreamResponse,
+        fail_msg: str
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        解析 {success, data, message} 格式的响应
+
+        失败时返回的字典带有 error_type（见 circuit_breaker 中的失败类型）
+        """
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            self.metrics.count_json_failure(policy_name)
+            self.cookie_cache.invalidate_cookies(self._egress_for(user_id).name, user_id)
+            return False, {"message": "响应解析失败", "error_type": classify_failure(response)}
+        if data.get("success"):
+            return True, data
+        return False, {"message": data.get("message", fail_msg), "error_type": classify_failure(response)}
+
+    def _parse_sign_in(self, user_id: str, response: UpstreamResponse) -> Tuple[bool, Dict[str, Any]]:
+        """解析签到响应：上游返回的业务失败（如已签到）原样返回，并标注 error_type"""
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            self.metrics.count_json_failure("sign_in")
+            self.cookie_cache.invalidate_cookies(self._egress_for(user_id).name, user_id)
+            return False, {"success": False, "message": "重试次数已用完", "error_type": classify_failure(response)}
+        if isinstance(data, dict) and not data.get("success"):
+            data["error_type"] = classify_failure(response)
+        return True, data
+
+    def _parse_api_status(self, response: UpstreamResponse) -> Tuple[bool, Dict[str, Any]]:
+        """解析 API 节点状态响应"""
+        try:
+            data = response.json()
+        except json.JSONDecodeError:
+            self.metrics.count_json_failure("api_status")
+            return False, {"message": "响应解析失败"}
+        return True, data.get("data", {})
+
+    @staticmethod
+    def _token_page_result(page: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Token 列表接口的单页结果"""
+        tokens, total, current = parse_token_page(data.get("data"))
+        return {"tokens": tokens, "total": total, "page": page if current is None else current}
+
+    # ---------- 组合刷新 ----------
+
+    @contextmanager
+    def _refresh_scope(self, user_id: str):
+        """组合刷新期间绑定账号 Cookies，结束时记录整个账号的耗时"""
+        started = time.monotonic()
+        token = account_binding.set(AccountBinding(user_id))
+        try:
+            yield
+        finally:
+            account_binding.reset(token)
+            self.metrics.observe_account(time.monotonic() - started)
+
+    def _operation_method(self, operation: str) -> Callable:
+        """组合刷新中除 tokens 外的操作对应的方法"""
+        return {
+            "sign_in": self.sign_in,
+            "user_info": self.get_user_info,
+            "models": self.get_models,
+            "groups": self.get_groups,
+        }[operation]
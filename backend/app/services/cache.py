@@ -0,0 +1,232 @@
+"""
+进程内 TTL 缓存
+
+线程安全，条目按写入时间过期，超出容量时淘汰最久未使用的条目（LRU），并统计命中率
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    带过期时间与容量上限的缓存
+
+    Args:
+        ttl: 默认过期时间（秒）
+        max_size: 最大条目数，超出时淘汰最久未使用的条目
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取未过期的值，不存在或已过期时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """写入值"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """删除指定条目"""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class CookieCache(TTLCache):
+    """
+    反爬虫 Cookie 缓存
+
+    acw_sc__v2 等 Cookie 与客户端出口（IP）绑定，因此以 (出口标识, user_id) 为键；
+    缓存值中保存了对应的 session，凭证变更后旧条目自动失效
+    """
+
+    def get_cookies(self, egress: str, user_id: str, session_cookie: str) -> Optional[Dict[str, str]]:
+        """获取账号缓存的 Cookies（返回副本）"""
+        key = (egress, str(user_id))
+        cookies = self.get(key)
+        if cookies is None:
+            return None
+        if cookies.get("session") != session_cookie:
+            # 凭证已变更，按未命中处理
+            with self._lock:
+                self._data.pop(key, None)
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return dict(cookies)
+
+    def set_cookies(self, egress: str, user_id: str, cookies: Dict[str, str]):
+        """缓存账号的 Cookies"""
+        self.set((egress, str(user_id)), dict(cookies))
+
+    def invalidate_cookies(self, egress: str, user_id: str) -> bool:
+        """使账号缓存的 Cookies 失效"""
+        return self.invalidate((egress, str(user_id)))
+
+
+class RefreshingCache(TTLCache):
+    """
+    过期后可继续返回旧值并后台刷新的缓存（stale-while-revalidate）
+
+    条目写入后 ttl 内为新鲜数据；之后的 stale_ttl 内仍直接返回旧值，同时提交一次后台刷新；
+    同一键同一时刻只有一个加载在进行，并发未命中的调用方等待该次加载的结果
+
+    Args:
+        ttl: 新鲜期（秒）
+        stale_ttl: 过期后仍可返回旧值的时长（秒）
+        max_size: 最大条目数
+        executor: 执行后台刷新的线程池，未提供时自建
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_size: int = 1024, executor: Optional[Executor] = None):
+        super().__init__(ttl + stale_ttl, max_size)
+        self.fresh_ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.load_failures = 0
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Tuple[bool, Any]],
+        force: bool = False
+    ) -> Tuple[bool, Any]:
+        """
+        获取缓存值，未命中时调用 loader 加载
+
+        Args:
+            key: 缓存键
+            loader: 返回 (是否成功, 数据) 的加载函数，仅成功结果会被缓存
+            force: 忽略缓存，强制重新加载
+
+        Returns:
+            Tuple[bool, Any]: 与 loader 相同的返回值
+        """
+        if not force:
+            entry = self.get(key)
+            if entry is not None:
+                fresh_until, value = entry
+                if fresh_until <= time.monotonic():
+                    with self._lock:
+                        self.stale_hits += 1
+                    self._refresh_in_background(key, loader)
+                return True, value
+        return self._load(key, loader)
+
+    def _load(self, key: Hashable, loader: Callable[[], Tuple[bool, Any]]) -> Tuple[bool, Any]:
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight[key] = event
+
+        if not owner:
+            # 等待正在进行的加载，失败时自行加载一次
+            event.wait()
+            entry = self.get(key)
+            if entry is not None:
+                return True, entry[1]
+            return loader()
+
+        try:
+            success, value = loader()
+            if success:
+                self.set(key, (time.monotonic() + self.fresh_ttl, value))
+            else:
+                with self._lock:
+                    self.load_failures += 1
+            return success, value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Tuple[bool, Any]]):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self.refreshes += 1
+
+        def refresh():
+            try:
+                self._load(key, loader)
+            except Exception as e:
+                logger.warning(f"后台刷新缓存失败 {key}: {e}")
+
+        self._executor.submit(refresh)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计（含旧值命中与后台刷新次数）"""
+        data = super().get_stats()
+        data["ttl"] = self.fresh_ttl
+        data["stale_ttl"] = self.stale_ttl
+        data["stale_hits"] = self.stale_hits
+        data["refreshes"] = self.refreshes
+        data["load_failures"] = self.load_failures
+        return data
+
+
+cookie_cache = CookieCache(ttl=settings.cookie_cache_ttl, max_size=settings.cookie_cache_size)
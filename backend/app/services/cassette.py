@@ -0,0 +1,216 @@
+"""
+上游请求录制与回放（cassette）
+
+- 录制：每次上游交互（方法、路径、账号、状态码、响应头、响应体、相对开始时间与耗时）
+  按行写入 cassette 文件（JSON Lines，文件名以 .gz 结尾时 gzip 压缩）
+- 回放：不访问上游，按 (方法, 路径, 账号) 依次取出录制的响应，并按原始耗时 × 倍数等待
+
+用于离线重放一次真实的签到任务，对比不同版本客户端的上游请求数与总耗时。
+cassette 中包含用户信息、Token 等响应内容（不记录请求 Cookie），应按敏感数据保管。
+"""
+import gzip
+import json
+import time
+import base64
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, IO, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# 录制的响应头
+RECORDED_HEADERS = ("content-type",)
+
+
+class CassetteMiss(LookupError):
+    """回放时 cassette 中没有与请求匹配的交互"""
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _request_path(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def encode_body(body: bytes) -> str:
+    """UTF-8 文本原样保存，其余内容以 b64: 前缀保存"""
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return "b64:" + base64.b64encode(body).decode("ascii")
+
+
+def decode_body(value: str) -> bytes:
+    if value.startswith("b64:"):
+        return base64.b64decode(value[4:])
+    return value.encode("utf-8")
+
+
+class Cassette:
+    """
+    单个 cassette 文件
+
+    Args:
+        path: 文件路径
+        mode: record / replay
+        time_scale: 回放时耗时的倍数，0 表示不等待
+    """
+
+    def __init__(self, path: str, mode: str, time_scale: float = 1.0):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"未知的 cassette 模式: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.time_scale = max(0.0, time_scale)
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._file: Optional[IO[str]] = None
+        self.recorded = 0
+        self.served = 0
+        self.misses: Counter = Counter()
+        self.exchanges: List[Dict[str, Any]] = []
+        self._queues: Dict[Tuple, Deque[int]] = defaultdict(deque)
+        self._used: set = set()
+
+        if mode == MODE_RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = _open(self.path, "w")
+            self._write({"version": 1, "created": datetime.now().isoformat(), "base_url": settings.anyrouter_base_url})
+            atexit.register(self.close)
+        else:
+            self._load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def _write(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def _load(self):
+        with _open(self.path, "r") as f:
+            for index, line in enumerate(f):
+                entry = json.loads(line)
+                if index == 0 and "version" in entry:
+                    continue
+                position = len(self.exchanges)
+                self.exchanges.append(entry)
+                self._queues[(entry["m"], entry["p"], entry.get("u"))].append(position)
+                self._queues[(entry["m"], entry["p"].split("?", 1)[0], None)].append(position)
+        logger.info(f"已加载 cassette {self.path}: {len(self.exchanges)} 条交互")
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        user_id: Optional[str],
+        status: int,
+        headers: Dict[str, str],
+        cookies: Dict[str, str],
+        kind: str,
+        encoding: Optional[str],
+        body: bytes,
+        started: float,
+        elapsed: float
+    ):
+        """写入一次上游交互（started 为 time.monotonic() 时间）"""
+        entry = {
+            "t": round(started - self._started, 4),
+            "d": round(elapsed, 4),
+            "m": method,
+            "p": _request_path(url),
+            "u": user_id,
+            "s": status,
+            "h": {name: headers[name] for name in RECORDED_HEADERS if headers.get(name)},
+            "c": cookies,
+            "k": kind,
+            "e": encoding,
+            "b": encode_body(body),
+        }
+        with self._lock:
+            if self._file is None:
+                return
+            self._write(entry)
+            self.recorded += 1
+
+    def next_exchange(self, method: str, url: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """
+        取出与请求匹配的下一条交互：优先匹配同一账号的同一路径，其次只匹配方法与路径
+
+        Raises:
+            CassetteMiss: 没有可用的交互
+        """
+        path = _request_path(url)
+        with self._lock:
+            for key in ((method, path, user_id), (method, path.split("?", 1)[0], None)):
+                queue = self._queues.get(key)
+                while queue:
+                    position = queue.popleft()
+                    if position not in self._used:
+                        self._used.add(position)
+                        self.served += 1
+                        return self.exchanges[position]
+            self.misses[f"{method} {path.split('?', 1)[0]}"] += 1
+        raise CassetteMiss(f"cassette 中没有匹配的交互: {method} {path}")
+
+    def delay(self, exchange: Dict[str, Any]) -> float:
+        """回放时应等待的秒数"""
+        return exchange["d"] * self.time_scale
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                logger.info(f"cassette 已保存: {self.path}（{self.recorded} 条交互）")
+
+    def summary(self) -> Dict[str, Any]:
+        """录制内容概要：按路径的请求数与首个请求到最后一个响应的时长"""
+        routes = Counter(f"{e['m']} {e['p'].split('?', 1)[0]}" for e in self.exchanges)
+        if self.exchanges:
+            duration = max(e["t"] + e["d"] for e in self.exchanges) - min(e["t"] for e in self.exchanges)
+        else:
+            duration = 0.0
+        return {"requests": sum(routes.values()), "routes": dict(routes), "duration_s": round(duration, 3)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": str(self.path),
+                "recorded": self.recorded,
+                "loaded": len(self.exchanges),
+                "served": self.served,
+                "unused": len(self.exchanges) - len(self._used) if self.replaying else 0,
+                "misses": dict(self.misses),
+                "time_scale": self.time_scale,
+            }
+
+
+def open_cassette() -> Optional[Cassette]:
+    """按配置打开 cassette，未启用时返回 None"""
+    mode = settings.upstream_cassette_mode
+    if not mode:
+        return None
+    cassette = Cassette(settings.upstream_cassette_path, mode, settings.upstream_cassette_time_scale)
+    logger.warning(f"上游请求 {mode} 模式已开启: {cassette.path}")
+    return cassette
+
+
+# 单例（同步与异步服务共享）
+cassette = open_cassette()
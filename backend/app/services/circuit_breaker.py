@@ -0,0 +1,229 @@
+"""
+上游熔断器与失败分类
+
+- 失败分类：network（网络异常、5xx、空响应或非 JSON 页面）、challenge（反爬虫挑战未能通过）、
+  auth（凭证失效）、business（上游正常处理但返回失败，如参数错误）
+- 熔断器：按接口维护滚动窗口内的错误率，只有 network / challenge 计入错误；
+  状态在 closed → open → half_open 之间切换，open 期间请求直接失败，不再打到上游
+"""
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.http_response import UpstreamResponse
+
+logger = logging.getLogger(__name__)
+
+FAILURE_NETWORK = "network"
+FAILURE_CHALLENGE = "challenge"
+FAILURE_AUTH = "auth"
+FAILURE_BUSINESS = "business"
+# 熔断打开时请求被直接拒绝
+FAILURE_CIRCUIT_OPEN = "circuit_open"
+
+# 说明上游不可用的失败类型，计入熔断器错误率
+BREAKER_FAILURES = (FAILURE_NETWORK, FAILURE_CHALLENGE)
+
+# 凭证失效时上游返回的消息关键字
+AUTH_MESSAGE_MARKERS = ("未登录", "无权进行此操作", "access token", "登录已过期")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+def classify_failure(response: Optional[UpstreamResponse] = None, error: Optional[Exception] = None) -> Optional[str]:
+    """
+    判断一次请求的失败类型
+
+    Returns:
+        Optional[str]: 失败类型，请求成功时返回 None
+    """
+    if error is not None or response is None:
+        return FAILURE_NETWORK
+    if response.is_challenge:
+        return FAILURE_CHALLENGE
+    if response.status_code in (401, 403):
+        return FAILURE_AUTH
+    if response.status_code >= 500 or response.kind != "json":
+        return FAILURE_NETWORK
+
+    try:
+        data = response.json()
+    except ValueError:
+        return FAILURE_NETWORK
+    if not isinstance(data, dict) or data.get("success", True):
+        return None
+
+    message = str(data.get("message", ""))
+    if any(marker in message for marker in AUTH_MESSAGE_MARKERS):
+        return FAILURE_AUTH
+    return FAILURE_BUSINESS
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"上游接口 {name} 暂不可用（熔断中），{int(retry_after) + 1} 秒后重试")
+
+
+class CircuitBreaker:
+    """
+    单个接口的熔断器
+
+    Args:
+        name: 接口名称
+        window: 错误率统计窗口（秒）
+        min_requests: 窗口内请求数达到该值后才会计算错误率
+        error_rate: 错误率阈值，达到时打开熔断
+        open_seconds: 打开状态持续时间，之后进入半开状态放行探测请求
+        half_open_probes: 半开状态下同时放行的探测请求数
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60,
+        min_requests: int = 10,
+        error_rate: float = 0.5,
+        open_seconds: float = 60,
+        half_open_probes: int = 1
+    ):
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._results: deque = deque()   # (时间, 是否失败)
+        self._failures = 0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        while self._results and self._results[0][0] < cutoff:
+            _, failed = self._results.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float):
+        self.state = STATE_OPEN
+        self.opened_at = now
+        self.times_opened += 1
+        self._probes = 0
+        logger.warning(f"上游接口 {self.name} 熔断打开，{self.open_seconds} 秒后尝试恢复")
+
+    def _current_state(self, now: float) -> str:
+        if self.state == STATE_OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = STATE_HALF_OPEN
+            self._probes = 0
+        return self.state
+
+    def allow(self) -> bool:
+        """是否放行请求；放行后必须调用 record 报告结果"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, failed: bool):
+        """报告一次已放行请求的结果"""
+        now = time.monotonic()
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed:
+                    self._open(now)
+                else:
+                    logger.info(f"上游接口 {self.name} 熔断恢复")
+                    self.state = STATE_CLOSED
+                    self._results.clear()
+                    self._failures = 0
+                return
+            if self.state == STATE_OPEN:
+                # 打开前已放行的请求
+                return
+
+            self._results.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            total = len(self._results)
+            if failed and total >= self.min_requests and self._failures / total >= self.error_rate:
+                self._open(now)
+
+    def is_open(self) -> bool:
+        """是否处于打开状态（半开视为未打开）"""
+        with self._lock:
+            return self._current_state(time.monotonic()) == STATE_OPEN
+
+    def retry_after(self) -> float:
+        """距离进入半开状态的秒数"""
+        with self._lock:
+            if self._current_state(time.monotonic()) != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            state = self._current_state(now)
+            total = len(self._results)
+            return {
+                "state": state,
+                "requests": total,
+                "failures": self._failures,
+                "error_rate": round(self._failures / total, 4) if total else 0.0,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_after": round(max(0.0, self.opened_at + self.open_seconds - now), 1) if state == STATE_OPEN else 0.0,
+            }
+
+
+class CircuitBreakerRegistry:
+    """按接口名称创建与查询熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = CircuitBreaker(
+                        name,
+                        window=settings.circuit_window,
+                        min_requests=settings.circuit_min_requests,
+                        error_rate=settings.circuit_error_rate,
+                        open_seconds=settings.circuit_open_seconds,
+                        half_open_probes=settings.circuit_half_open_probes
+                    )
+                    self._breakers[name] = breaker
+        return breaker
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.get_stats() for breaker in breakers}
+
+
+# 单例（同步与异步服务共享）
+circuit_breakers = CircuitBreakerRegistry()
@@ -0,0 +1,203 @@
+"""
+HTTP 连接池
+
+为 AnyRouter 请求提供一个有界的 Session 池：
+- 每个 Session 挂载独立的 HTTPAdapter，连接可在多次调用之间保持 keep-alive
+- Session 以“借出/归还”的方式使用，同一时刻只被一个线程持有，避免多线程共享导致的 SSL 问题
+- 统计借出次数、复用命中次数、新建 TCP/TLS 连接（握手）次数
+- 池满时最多等待 acquire_timeout 秒，超时抛出 SessionPoolTimeout（请求未发出，可重试）
+"""
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class SessionPoolTimeout(requests.ConnectionError):
+    """等待空闲 Session 超时（请求未发出，按连接失败重试）"""
+
+
+class PoolStats:
+    """连接池计数器（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.leases = 0               # 借出次数
+        self.pool_hits = 0            # 复用已有 Session 的次数
+        self.sessions_created = 0     # 新建 Session 数
+        self.connections_opened = 0   # 新建连接数（即 TCP/TLS 握手次数）
+        self.acquire_timeouts = 0     # 等待空闲 Session 超时次数
+
+    def incr(self, field: str, value: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + value)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leases": self.leases,
+                "pool_hits": self.pool_hits,
+                "sessions_created": self.sessions_created,
+                "connections_opened": self.connections_opened,
+                "acquire_timeouts": self.acquire_timeouts,
+            }
+
+
+def _counting_pool_class(base, stats: PoolStats):
+    """生成在新建连接时计数的 urllib3 连接池类"""
+
+    class CountingConnectionPool(base):
+        def _new_conn(self):
+            stats.incr("connections_opened")
+            return super()._new_conn()
+
+    CountingConnectionPool.__name__ = f"Counting{base.__name__}"
+    return CountingConnectionPool
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """记录新建连接次数的 HTTPAdapter"""
+
+    def __init__(self, stats: PoolStats, source_address: Optional[str] = None, **kwargs):
+        self.stats = stats
+        self.source_address = source_address
+        super().__init__(**kwargs)
+
+    def _counting_classes(self) -> Dict[str, type]:
+        return {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.source_address:
+            # 从指定的本地地址发起连接（端口由系统分配）
+            kwargs["source_address"] = (self.source_address, 0)
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._counting_classes()
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = self._counting_classes()
+        return manager
+
+
+class SessionPool:
+    """
+    有界 Session 池
+
+    Args:
+        size: 最多同时存在的 Session 数量，超出时借用方阻塞等待
+        pool_maxsize: 每个 Session 对单个主机保持的最大连接数
+        pool_connections: 每个 Session 缓存的主机连接池数量
+        proxies: 出站代理（requests 的 proxies 格式）
+        source_address: 绑定的本地源地址
+        egress: 所属出口名称，记录在借出的 Session 上
+        acquire_timeout: 池满时等待空闲 Session 的最长秒数
+    """
+
+    def __init__(
+        self,
+        size: int = 8,
+        pool_maxsize: int = 10,
+        pool_connections: int = 4,
+        proxies: Optional[Dict[str, str]] = None,
+        source_address: Optional[str] = None,
+        egress: str = "default",
+        acquire_timeout: float = 30.0
+    ):
+        self.size = max(1, size)
+        self.pool_maxsize = pool_maxsize
+        self.pool_connections = pool_connections
+        self.proxies = proxies
+        self.source_address = source_address
+        self.egress = egress
+        self.acquire_timeout = acquire_timeout
+        self.stats = PoolStats()
+        self._idle: "queue.LifoQueue[requests.Session]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> requests.Session:
+        """创建挂载了计数适配器的 Session"""
+        session = requests.Session()
+        session.egress = self.egress
+        if self.proxies:
+            session.proxies.update(self.proxies)
+            # 出口固定，不受环境变量中的代理设置影响
+            session.trust_env = False
+        adapter = CountingHTTPAdapter(
+            self.stats,
+            source_address=self.source_address,
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            # 重试由上层按接口策略统一控制，适配器层不再重试，避免重试次数相乘
+            max_retries=0,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.stats.incr("sessions_created")
+        return session
+
+    def _acquire(self) -> requests.Session:
+        try:
+            session = self._idle.get_nowait()
+            self.stats.incr("pool_hits")
+            return session
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._create_session()
+
+        # 池已满，等待其他线程归还
+        try:
+            session = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            self.stats.incr("acquire_timeouts")
+            raise SessionPoolTimeout(f"等待空闲 Session 超时（{self.acquire_timeout} 秒，池大小 {self.size}）")
+        self.stats.incr("pool_hits")
+        return session
+
+    def _release(self, session: requests.Session):
+        # 清空 Cookie，防止上一个账号的 Cookie 泄漏给下一个借用者
+        session.cookies.clear()
+        self._idle.put(session)
+
+    @contextmanager
+    def lease(self) -> Iterator[requests.Session]:
+        """借出一个 Session，使用完毕后自动归还"""
+        session = self._acquire()
+        self.stats.incr("leases")
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def close(self):
+        """关闭所有空闲 Session"""
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            session.close()
+            with self._lock:
+                self._created -= 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取连接池统计"""
+        data = self.stats.snapshot()
+        data["size"] = self.size
+        data["idle"] = self._idle.qsize()
+        data["pool_maxsize"] = self.pool_maxsize
+        return data
@@ -0,0 +1,133 @@
+"""
+上游响应读取
+
+以流式方式读取响应体：先查看首个数据块判断是 JSON 还是 HTML（反爬虫挑战页），
+JSON 直接从原始字节解析一次，不再经过 response.text 的整体解码；
+安装了 orjson 时使用 orjson 解析。
+"""
+import json
+import logging
+from typing import Any, Optional
+
+import requests
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 首个数据块大小，足以容纳挑战页的关键标记
+PEEK_CHUNK_SIZE = 8192
+
+CHALLENGE_MARKERS = (b"acw_sc__v2", b"var arg1=")
+
+
+def loads(data: bytes) -> Any:
+    """从字节解析 JSON，解析失败统一抛出 json.JSONDecodeError"""
+    if orjson is not None:
+        # orjson.JSONDecodeError 是 json.JSONDecodeError 的子类
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class UpstreamResponse:
+    """
+    已读取完毕的上游响应
+
+    Attributes:
+        kind: json（JSON 载荷）| challenge（反爬虫挑战页）| empty（空响应）| other（其他内容）
+        status_code: HTTP 状态码
+        cookies: 响应设置的 Cookies
+        body: 原始响应字节
+    """
+
+    def __init__(self, kind: str, status_code: int, body: bytes, cookies, encoding: Optional[str] = None):
+        self.kind = kind
+        self.status_code = status_code
+        self.body = body
+        self.cookies = cookies
+        self.encoding = encoding or "utf-8"
+        self._text: Optional[str] = None
+        self._data: Any = None
+        self._parsed = False
+
+    @property
+    def is_challenge(self) -> bool:
+        return self.kind == "challenge"
+
+    @property
+    def is_empty(self) -> bool:
+        return self.kind == "empty"
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def text(self) -> str:
+        """按需解码为文本（JSON 响应通常无需调用）"""
+        if self._text is None:
+            self._text = self.body.decode(self.encoding, errors="replace")
+        return self._text
+
+    def json(self) -> Any:
+        """解析 JSON（只解析一次），非 JSON 响应抛出 json.JSONDecodeError"""
+        if not self._parsed:
+            if self.kind != "json":
+                raise json.JSONDecodeError(f"非 JSON 响应: {self.kind}", "", 0)
+            self._data = loads(self.body)
+            self._parsed = True
+        return self._data
+
+
+def classify(first_chunk: bytes) -> str:
+    """根据首个数据块判断响应类型"""
+    head = first_chunk.lstrip()
+    if not head:
+        return "empty"
+    if head[:1] in (b"{", b"["):
+        return "json"
+    if all(marker in first_chunk for marker in CHALLENGE_MARKERS):
+        return "challenge"
+    return "other"
+
+
+def read_response(response: requests.Response) -> UpstreamResponse:
+    """
+    读取以 stream=True 发起的请求的响应
+
+    - JSON：拼接原始字节，留待一次性解析
+    - 挑战页：读取完整页面供求解
+    - 其他内容（如控制台 HTML）：只保留首个数据块，其余部分读取后直接丢弃
+    读取完成后连接归还到连接池
+    """
+    try:
+        chunks = response.iter_content(chunk_size=PEEK_CHUNK_SIZE)
+        # 分块传输时单块可能很小，累积到足够判断类型为止
+        first_chunk = b""
+        for chunk in chunks:
+            first_chunk += chunk
+            head = first_chunk.lstrip()
+            if head[:1] in (b"{", b"[") or len(first_chunk) >= PEEK_CHUNK_SIZE:
+                break
+        kind = classify(first_chunk)
+
+        if kind in ("json", "challenge"):
+            rest = b"".join(chunks)
+            body = first_chunk + rest if rest else first_chunk
+        else:
+            for _ in chunks:
+                pass
+            body = first_chunk
+
+        return UpstreamResponse(
+            kind=kind,
+            status_code=response.status_code,
+            body=body,
+            cookies=response.cookies,
+            encoding=response.encoding
+        )
+    finally:
+        response.close()
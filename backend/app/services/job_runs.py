@@ -0,0 +1,204 @@
+"""
+调度任务运行记录
+
+自动签到（每个波次）、签到重试轮询与滚动健康检查每次运行结束后写入 job_runs 表：
+起止时间、处理账号数、成功 / 失败 / 跳过数、上游请求次数、累计等待时间、
+单账号耗时的 p50 / p95 以及各阶段累计耗时，用于观察签到是否逐渐变慢、将要超出签到窗口：
+- 上游统计来自 metrics 的埋点，按任务上下文累计（见 RunStats），同时运行的任务互不混入
+- 没有处理任何账号且没有异常的运行（如重试队列为空的轮询）不记录
+- 记录按 JOB_RUN_RETENTION_DAYS 保留
+"""
+import json
+import math
+import time
+import logging
+import functools
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import JobRun
+from app.services.metrics import RunStats, collect_run_stats
+
+logger = logging.getLogger(__name__)
+
+JOB_AUTO_SIGN = "auto_sign"
+JOB_SIGN_RETRY = "sign_retry"
+JOB_HEALTH_CHECK = "health_check"
+JOB_NAMES = {
+    JOB_AUTO_SIGN: "自动签到",
+    JOB_SIGN_RETRY: "签到重试",
+    JOB_HEALTH_CHECK: "健康检查",
+}
+
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """最近秩百分位数（q 取 0-100），无样本时为 None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class JobRunRecorder:
+    """一次任务运行的计数（由任务函数累加，上游统计由埋点自动累计）"""
+
+    def __init__(self, job: str):
+        self.job = job
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self.success = 0
+        self.failed = 0
+        self.skipped = 0
+        self.error: Optional[str] = None
+
+    def add(self, success: int = 0, failed: int = 0, skipped: int = 0):
+        self.success += success
+        self.failed += failed
+        self.skipped += skipped
+
+    @property
+    def accounts(self) -> int:
+        return self.success + self.failed + self.skipped
+
+    def to_model(self, stats: RunStats) -> JobRun:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return JobRun(
+            job=self.job,
+            status=STATUS_FAILED if self.error else STATUS_SUCCESS,
+            started_at=self.started_at,
+            finished_at=datetime.now(),
+            duration_seconds=round(time.monotonic() - self._started, 3),
+            accounts=self.accounts,
+            success_count=self.success,
+            fail_count=self.failed,
+            skip_count=self.skipped,
+            upstream_calls=stats.upstream_calls,
+            sleep_seconds=round(stats.stage_seconds.get("sleep", 0.0), 3),
+            latency_p50_ms=ms(percentile(stats.account_seconds, 50)),
+            latency_p95_ms=ms(percentile(stats.account_seconds, 95)),
+            stage_seconds=json.dumps({stage: round(seconds, 3) for stage, seconds in stats.stage_seconds.items()}),
+            error=self.error
+        )
+
+
+_current_recorder: ContextVar[Optional[JobRunRecorder]] = ContextVar("job_run", default=None)
+_last_purge: Optional[datetime] = None
+
+
+def current_job_run() -> JobRunRecorder:
+    """当前任务的运行记录（不在 record_job_run 中时返回一个不保存的记录）"""
+    return _current_recorder.get() or JobRunRecorder("")
+
+
+def record_job_run(job: str) -> Callable:
+    """装饰器：记录调度任务的每次运行"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = JobRunRecorder(job)
+            token = _current_recorder.set(recorder)
+            try:
+                with collect_run_stats() as stats:
+                    try:
+                        return func(*args, **kwargs)
+                    except Exception as e:
+                        recorder.error = str(e)
+                        raise
+            finally:
+                _current_recorder.reset(token)
+                save_job_run(recorder, stats)
+        return wrapper
+    return decorator
+
+
+def save_job_run(recorder: JobRunRecorder, stats: RunStats):
+    """写入运行记录（记录失败只打日志，不影响任务本身）"""
+    global _last_purge
+    if not recorder.accounts and not recorder.error:
+        return
+
+    db = SessionLocal()
+    try:
+        run = recorder.to_model(stats)
+        db.add(run)
+        if _last_purge is None or datetime.now() - _last_purge > timedelta(hours=1):
+            cutoff = datetime.now() - timedelta(days=settings.job_run_retention_days)
+            db.query(JobRun).filter(JobRun.started_at < cutoff).delete(synchronize_session=False)
+            _last_purge = datetime.now()
+        db.commit()
+        logger.info(
+            f"{JOB_NAMES.get(run.job, run.job)}运行记录: 耗时 {run.duration_seconds:.1f} 秒，账号 {run.accounts}，"
+            f"上游请求 {run.upstream_calls}，等待 {run.sleep_seconds:.1f} 秒，p95 {run.latency_p95_ms or 0:.0f} ms"
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"保存任务运行记录失败: {e}")
+    finally:
+        db.close()
+
+
+def job_run_to_dict(run: JobRun) -> Dict[str, Any]:
+    return {
+        "id": run.id,
+        "job": run.job,
+        "job_name": JOB_NAMES.get(run.job, run.job),
+        "status": run.status,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "duration_seconds": run.duration_seconds,
+        "accounts": run.accounts,
+        "success_count": run.success_count,
+        "fail_count": run.fail_count,
+        "skip_count": run.skip_count,
+        "upstream_calls": run.upstream_calls,
+        "sleep_seconds": run.sleep_seconds,
+        "latency_p50_ms": run.latency_p50_ms,
+        "latency_p95_ms": run.latency_p95_ms,
+        "stage_seconds": json.loads(run.stage_seconds) if run.stage_seconds else {},
+        "error": run.error,
+    }
+
+
+def get_job_runs(db: Session, job: Optional[str] = None, days: int = 7, limit: int = 500) -> List[Dict[str, Any]]:
+    """运行历史（按开始时间倒序）"""
+    query = db.query(JobRun).filter(JobRun.started_at >= datetime.now() - timedelta(days=days))
+    if job:
+        query = query.filter(JobRun.job == job)
+    return [job_run_to_dict(run) for run in query.order_by(JobRun.started_at.desc()).limit(limit)]
+
+
+def get_job_run_summary(db: Session, days: int = 7) -> Dict[str, Any]:
+    """各任务最近一次运行，以及近 days 天的运行次数与平均耗时"""
+    since = datetime.now() - timedelta(days=days)
+    aggregates = {
+        job: (runs, avg_duration, avg_p95)
+        for job, runs, avg_duration, avg_p95 in db.query(
+            JobRun.job,
+            func.count(JobRun.id),
+            func.avg(JobRun.duration_seconds),
+            func.avg(JobRun.latency_p95_ms)
+        ).filter(JobRun.started_at >= since).group_by(JobRun.job)
+    }
+
+    summary = {}
+    for job in JOB_NAMES:
+        last = db.query(JobRun).filter(JobRun.job == job).order_by(JobRun.started_at.desc()).first()
+        runs, avg_duration, avg_p95 = aggregates.get(job, (0, None, None))
+        summary[job] = {
+            "last": job_run_to_dict(last) if last else None,
+            "runs": runs,
+            "avg_duration_seconds": round(avg_duration, 3) if avg_duration is not None else None,
+            "avg_latency_p95_ms": round(avg_p95, 1) if avg_p95 is not None else None,
+        }
+    return summary
@@ -0,0 +1,121 @@
+"""
+上游延迟统计与自适应超时
+
+按接口保留最近一段成功请求的耗时，计算滚动 p50 / p95 / p99：
+- 超时：读超时取 p99 × 倍数、连接超时取 p95 × 倍数，并限制在配置的上下限内；
+  样本不足时使用策略中的固定超时
+- 对冲请求：首个请求超过 p95 仍未返回时再发一个，取先返回的结果
+"""
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+
+class EndpointLatency:
+    """单个接口的滚动延迟样本"""
+
+    def __init__(self, window: int):
+        self.samples: deque = deque(maxlen=window)
+        self.observed = 0
+        self.hedged = 0        # 发出对冲请求的次数
+        self.hedge_wins = 0    # 对冲请求先返回的次数
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+
+class LatencyTracker:
+    """
+    按接口统计延迟并给出超时与对冲等待时间
+
+    Args:
+        window: 每个接口保留的样本数
+        min_samples: 样本数达到该值后才启用自适应超时与对冲
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._endpoints: Dict[str, EndpointLatency] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> EndpointLatency:
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            endpoint = self._endpoints.setdefault(name, EndpointLatency(self.window))
+        return endpoint
+
+    def observe(self, name: str, seconds: float):
+        """记录一次成功请求的耗时"""
+        with self._lock:
+            endpoint = self._get(name)
+            endpoint.samples.append(seconds)
+            endpoint.observed += 1
+
+    def record_hedge(self, name: str, won: bool):
+        """记录一次对冲请求及其是否先返回"""
+        with self._lock:
+            endpoint = self._get(name)
+            endpoint.hedged += 1
+            endpoint.hedge_wins += int(won)
+
+    def _percentiles(self, name: str) -> Tuple[Optional[float], Optional[float]]:
+        """样本充足时返回 (p95, p99)，否则返回 (None, None)"""
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None or len(endpoint.samples) < self.min_samples:
+                return None, None
+            return endpoint.percentile(0.95), endpoint.percentile(0.99)
+
+    def timeout_for(self, name: str, default: float) -> Tuple[float, float]:
+        """
+        计算 (连接超时, 读超时)
+
+        Args:
+            name: 接口名称
+            default: 策略中的固定超时，也是自适应读超时的上限
+        """
+        p95, p99 = self._percentiles(name) if settings.adaptive_timeout_enabled else (None, None)
+        connect_max = min(settings.adaptive_connect_timeout, default)
+        if p99 is None:
+            return connect_max, default
+
+        multiplier = settings.adaptive_timeout_multiplier
+        floor = min(settings.adaptive_timeout_min, default)
+        read = min(default, max(floor, p99 * multiplier))
+        connect = min(connect_max, max(1.0, p95 * multiplier))
+        return round(connect, 3), round(read, 3)
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """对冲请求的等待时间（p95），样本不足时返回 None"""
+        p95, _ = self._percentiles(name)
+        return p95
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = dict(self._endpoints)
+        stats = {}
+        for name, endpoint in endpoints.items():
+            with self._lock:
+                p50, p95, p99 = (endpoint.percentile(q) for q in (0.5, 0.95, 0.99))
+                stats[name] = {
+                    "samples": len(endpoint.samples),
+                    "observed": endpoint.observed,
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+                    "hedged": endpoint.hedged,
+                    "hedge_wins": endpoint.hedge_wins,
+                }
+        return stats
+
+
+# 单例（同步与异步服务共享）
+latency_tracker = LatencyTracker(window=settings.latency_window, min_samples=settings.latency_min_samples)
@@ -0,0 +1,288 @@
+"""
+运行指标
+
+进程内的计数器 / 直方图注册表，按 Prometheus 文本格式（0.0.4）输出，不依赖 prometheus_client。
+AnyRouter 客户端在请求各阶段埋点：预请求、挑战求解、等待（挑战后的固定等待与重试退避）、主请求。
+调度任务运行期间，同样的埋点还会累计到当前上下文的 RunStats（见 job_runs）。
+"""
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+# 采集函数返回 [(指标名, 类型, 说明, [(标签字典, 值), ...]), ...]
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra.items())
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """单调递增计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, value: float = 1):
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(tuple(str(label) for label in labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # 每组标签：[各桶计数..., 总和, 样本数]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        key = tuple(str(label) for label in labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[index] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(data)) for key, data in self._values.items())
+        lines = []
+        for key, data in items:
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += data[index]
+                labels = _format_labels(self.labelnames, key, {"le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(data[-2], 6))}")
+            lines.append(f"{self.name}_count{labels} {data[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def register_collector(self, collector: Collector):
+        """注册在输出时才读取的指标（如连接池、缓存的现有统计）"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出全部指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                lines.append(f"# collector error: {_escape(e)}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class RunStats:
+    """
+    一次任务运行期间的上游统计
+
+    通过上下文变量传递，签到引擎的工作线程与事件循环沿用调用方的上下文，
+    同时运行的多个任务各自统计，互不混入
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.upstream_calls = 0
+        self.stage_seconds: Dict[str, float] = {}
+        self.account_seconds: List[float] = []
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def count_call(self):
+        with self._lock:
+            self.upstream_calls += 1
+
+    def observe_account(self, seconds: float):
+        with self._lock:
+            self.account_seconds.append(seconds)
+
+
+_current_run: ContextVar[Optional[RunStats]] = ContextVar("run_stats", default=None)
+
+
+@contextmanager
+def collect_run_stats() -> Iterator[RunStats]:
+    """在当前上下文内累计上游统计"""
+    stats = RunStats()
+    token = _current_run.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_run.reset(token)
+
+
+def current_run_stats() -> Optional[RunStats]:
+    """当前上下文的任务统计（不在任务中时为 None）"""
+    return _current_run.get()
+
+
+class UpstreamMetrics:
+    """AnyRouter 客户端埋点"""
+
+    PHASES = ("preflight", "challenge_solve", "sleep", "main", "attempt")
+
+    def __init__(self, metrics: MetricsRegistry):
+        self.duration = metrics.histogram(
+            "anyrouter_request_phase_seconds",
+            "AnyRouter 请求各阶段耗时（preflight / challenge_solve / sleep / main / attempt）",
+            ("endpoint", "phase")
+        )
+        self.responses = metrics.counter(
+            "anyrouter_responses_total", "AnyRouter 响应数（按 HTTP 状态码）", ("endpoint", "status")
+        )
+        self.challenges = metrics.counter(
+            "anyrouter_challenges_total", "遇到反爬虫挑战的次数", ("endpoint", "result")
+        )
+        self.retries = metrics.counter(
+            "anyrouter_retries_total", "重试次数", ("endpoint",)
+        )
+        self.failures = metrics.counter(
+            "anyrouter_failures_total", "失败次数（按失败类型）", ("endpoint", "type")
+        )
+        self.json_failures = metrics.counter(
+            "anyrouter_json_parse_failures_total", "响应 JSON 解析失败次数", ("endpoint",)
+        )
+        self.account_duration = metrics.histogram(
+            "anyrouter_account_refresh_seconds", "单个账号组合刷新（签到 / 健康检查等）的总耗时"
+        )
+
+    def observe_phase(self, endpoint: str, phase: str, seconds: float):
+        self.duration.observe(seconds, endpoint, phase)
+        stats = _current_run.get()
+        if stats is not None and phase != "attempt":
+            stats.observe_stage(phase, seconds)
+
+    def observe_account(self, seconds: float):
+        self.account_duration.observe(seconds)
+        stats = _current_run.get()
+        if stats is not None:
+            stats.observe_account(seconds)
+
+    def count_response(self, endpoint: str, status: int):
+        self.responses.inc(endpoint, status)
+
+    def count_challenge(self, endpoint: str, solved: bool):
+        self.challenges.inc(endpoint, "solved" if solved else "unsolved")
+
+    def count_retry(self, endpoint: str):
+        self.retries.inc(endpoint)
+
+    def count_json_failure(self, endpoint: str):
+        self.json_failures.inc(endpoint)
+
+    def observe_attempt(self, record: Dict[str, Any]):
+        """记录一次尝试的总耗时与失败类型（由 _record_attempt 调用）"""
+        endpoint = record["endpoint"]
+        self.observe_phase(endpoint, "attempt", record["elapsed_ms"] / 1000)
+        stats = _current_run.get()
+        if stats is not None:
+            stats.count_call()
+        if record.get("failure"):
+            self.failures.inc(endpoint, record["failure"])
+
+
+upstream_metrics = UpstreamMetrics(registry)
@@ -2,7 +2,7 @@
 推送服务
 """
 from .email import EmailNotify
-from .base import NotifyBase, NotifyFactory
+from .base import NotifyBase, NotifyFactory, DigestItem
 from .pushplus import PushPlusNotify
 from .wechat_mp import WeChatMPNotify
 from .wechat_work import WeChatWorkNotify
@@ -12,6 +12,7 @@ from .feishu import FeishuNotify
 __all__ = [
     "NotifyBase",
     "NotifyFactory",
+    "DigestItem",
     "PushPlusNotify",
     "WeChatMPNotify",
     "WeChatWorkNotify",
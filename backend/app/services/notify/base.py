@@ -2,12 +2,22 @@
 推送服务基类
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from dataclasses import dataclass
+from typing import Dict, Any, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class DigestItem:
+    """汇总通知中的一个账号"""
+    account: str
+    success: bool
+    message: str
+    reward_display: str = ""
+
+
 class NotifyBase(ABC):
     """推送服务基类"""
 
@@ -29,6 +39,50 @@ class NotifyBase(ABC):
         """
         pass
 
+    @staticmethod
+    def _digest_title(label: str, items: List[DigestItem]) -> Tuple[str, List[DigestItem]]:
+        """汇总标题（成功 / 失败计数）与排序后的条目（失败在前）"""
+        success = [item for item in items if item.success]
+        failed = [item for item in items if not item.success]
+        counts = [f"{name} {len(group)}" for name, group in (("成功", success), ("失败", failed)) if group]
+        return f"{label}汇总 - {' / '.join(counts)}", failed + success
+
+    @classmethod
+    def render_digest(cls, label: str, items: List[DigestItem]) -> Tuple[str, str]:
+        """
+        将一次任务中的多个账号结果渲染为一条通知（渠道可按自身格式覆盖）
+
+        Returns:
+            Tuple[str, str]: (标题, 内容)
+        """
+        title, ordered = cls._digest_title(label, items)
+
+        lines = []
+        for item in ordered:
+            mark = "✅" if item.success else "❌"
+            detail = item.reward_display or item.message
+            lines.append(f"{mark} {item.account}: {detail}" if detail else f"{mark} {item.account}")
+        return title, "\n".join(lines)
+
+    @classmethod
+    def render_digest_markdown(cls, label: str, items: List[DigestItem]) -> Tuple[str, str]:
+        """
+        以 Markdown 表格（账号 / 结果 / 奖励）渲染汇总通知，供支持 Markdown 的渠道覆盖使用
+
+        Returns:
+            Tuple[str, str]: (标题, 内容)
+        """
+        title, ordered = cls._digest_title(label, items)
+
+        def cell(text: str) -> str:
+            return (text or "-").replace("|", "\\|").replace("\n", " ")
+
+        lines = ["| 账号 | 结果 | 奖励 |", "| --- | --- | --- |"]
+        for item in ordered:
+            result = f"✅ {item.message or '成功'}" if item.success else f"❌ {item.message or '失败'}"
+            lines.append(f"| {cell(item.account)} | {cell(result)} | {cell(item.reward_display)} |")
+        return title, "\n".join(lines)
+
     @abstractmethod
     def test(self) -> bool:
         """
@@ -61,6 +115,11 @@ class NotifyFactory:
             raise ValueError(f"未知的推送渠道类型: {channel_type}")
         return notifier_class(config)
 
+    @classmethod
+    def get_class(cls, channel_type: str):
+        """获取推送服务类（未注册时返回基类，使用默认的汇总格式）"""
+        return cls._notifiers.get(channel_type, NotifyBase)
+
     @classmethod
     def get_supported_types(cls):
         """获取支持的推送类型"""
@@ -8,9 +8,9 @@ import time
 import urllib.parse
 import requests
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
-from .base import NotifyBase, NotifyFactory
+from .base import DigestItem, NotifyBase, NotifyFactory
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +34,11 @@ class DingTalkNotify(NotifyBase):
 
         return f"&timestamp={timestamp}&sign={sign}"
 
+    @classmethod
+    def render_digest(cls, label: str, items: List[DigestItem]) -> Tuple[str, str]:
+        """钉钉消息为 Markdown 格式，汇总以表格展示"""
+        return cls.render_digest_markdown(label, items)
+
     def send(self, title: str, content: str, account_config: Dict[str, Any] = None) -> bool:
         try:
             webhook = self.config.get("webhook")
@@ -41,7 +41,7 @@ class EmailNotify(NotifyBase):
             <html>
             <body style="font-family: Arial, sans-serif; padding: 20px;">
                 <h2 style="color: {'#51cf66' if '成功' in title else '#ff6b6b'};">{title}</h2>
-                <p style="color: #333; line-height: 1.6;">{content}</p>
+                <p style="color: #333; line-height: 1.6;">{content.replace(chr(10), "<br>")}</p>
                 <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
                 <p style="color: #999; font-size: 12px;">此邮件由 AnyRouter 管理平台自动发送</p>
             </body>
@@ -7,9 +7,9 @@ import base64
 import time
 import requests
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
-from .base import NotifyBase, NotifyFactory
+from .base import DigestItem, NotifyBase, NotifyFactory
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +33,11 @@ class FeishuNotify(NotifyBase):
         sign = base64.b64encode(hmac_code).decode('utf-8')
         return sign
 
+    @classmethod
+    def render_digest(cls, label: str, items: List[DigestItem]) -> Tuple[str, str]:
+        """飞书卡片内容为 Markdown 格式，汇总以表格展示"""
+        return cls.render_digest_markdown(label, items)
+
     def send(self, title: str, content: str, account_config: Dict[str, Any] = None) -> bool:
         try:
             webhook = self.config.get("webhook_url") or self.config.get("webhook")
@@ -54,11 +59,8 @@ class FeishuNotify(NotifyBase):
                     },
                     "elements": [
                         {
-                            "tag": "div",
-                            "text": {
-                                "tag": "plain_text",
-                                "content": content
-                            }
+                            "tag": "markdown",
+                            "content": content
                         }
                     ]
                 }
@@ -3,9 +3,9 @@
 """
 import requests
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-from .base import NotifyBase, NotifyFactory
+from .base import DigestItem, NotifyBase, NotifyFactory
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +43,11 @@ class WeChatWorkNotify(NotifyBase):
             logger.error(f"获取企业微信令牌异常: {e}")
             return False
 
+    @classmethod
+    def render_digest(cls, label: str, items: List[DigestItem]) -> Tuple[str, str]:
+        """企业微信消息为 Markdown 格式，汇总以表格展示"""
+        return cls.render_digest_markdown(label, items)
+
     def send(self, title: str, content: str, account_config: Dict[str, Any] = None) -> bool:
         if not self.access_token and not self._get_access_token():
             return False
@@ -54,10 +59,10 @@ class WeChatWorkNotify(NotifyBase):
 
             data = {
                 "touser": user_id,
-                "msgtype": "text",
+                "msgtype": "markdown",
                 "agentid": int(self.config.get("agent_id", 0)),
-                "text": {
-                    "content": f"{title}\n\n{content}"
+                "markdown": {
+                    "content": f"## {title}\n\n{content}"
                 }
             }
 
@@ -0,0 +1,345 @@
+"""
+通知发件箱
+
+签到、重试与健康检查只把通知写入 notify_outbox 表（与签到日志在同一事务中提交），
+由后台投递线程发送，慢速的 webhook / SMTP 不再拖慢签到任务或阻塞接口响应：
+- 投递线程池大小 NOTIFY_WORKERS，每个渠道同时发送不超过 NOTIFY_CHANNEL_CONCURRENCY 条
+- 发送失败按指数退避重试（NOTIFY_RETRY_BASE 起，上限 NOTIFY_RETRY_MAX_BACKOFF，加随机抖动），
+  达到 NOTIFY_MAX_ATTEMPTS 次后标记为 dead，不再发送
+- 进程重启后，上次发送中的通知重新排队（至少发送一次）；已发送的通知按保留天数清理
+- 发送方式为 digest 的渠道，同一次任务（自动签到 / 签到窗口、重试批次、健康检查、批量签到）中
+  各账号的通知先收集到 NotifyDigest，任务结束时按渠道合并为一条写入发件箱；签到窗口的各波次
+  共用一份汇总，最后一个波次结束时写入
+"""
+import json
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AccountNotify, NotifyChannel, NotifyOutbox
+from app.services.notify import NotifyFactory, DigestItem
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+KIND_SIGN = "sign"
+KIND_HEALTH = "health"
+
+DELIVERY_IMMEDIATE = "immediate"
+DELIVERY_DIGEST = "digest"
+DELIVERY_MODES = (DELIVERY_IMMEDIATE, DELIVERY_DIGEST)
+
+
+class NotifyDigest:
+    """
+    一次任务内的汇总通知：按 (渠道, 账号推送配置) 收集各账号结果，任务结束时每组写入一条
+
+    Example:
+        digest = NotifyDigest(KIND_SIGN, "自动签到")
+        for account in accounts:
+            ...
+            enqueue_account_notification(db, account, KIND_SIGN, title, content, item=item, digest=digest)
+        digest.flush(db)
+        db.commit()
+    """
+
+    def __init__(self, kind: str, label: str):
+        self.kind = kind
+        self.label = label
+        self._groups: Dict[Tuple[int, str], List[DigestItem]] = {}
+        self._channel_types: Dict[int, str] = {}
+        # 签到窗口的多个波次可能同时执行，共用一份汇总
+        self._lock = threading.Lock()
+
+    def add(self, channel: NotifyChannel, account_config: Optional[str], item: DigestItem):
+        # 同一渠道下推送配置不同的账号（如不同收件人）分开汇总
+        config = json.dumps(json.loads(account_config), sort_keys=True) if account_config else ""
+        with self._lock:
+            self._groups.setdefault((channel.id, config), []).append(item)
+            self._channel_types[channel.id] = channel.type
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._groups.values())
+
+    def flush(self, db: Session) -> int:
+        """
+        将收集的结果按组写入发件箱（不提交，由调用方提交）
+
+        Returns:
+            int: 写入的通知数
+        """
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        for (channel_id, config), items in groups.items():
+            notifier_class = NotifyFactory.get_class(self._channel_types[channel_id])
+            title, content = notifier_class.render_digest(self.label, items)
+            db.add(NotifyOutbox(
+                channel_id=channel_id,
+                account_id=None,
+                kind=self.kind,
+                title=title,
+                content=content,
+                account_config=config or None,
+                status=STATUS_PENDING,
+                attempts=0,
+                next_attempt_at=datetime.now()
+            ))
+        count = len(groups)
+        if count:
+            total = sum(len(items) for items in groups.values())
+            logger.info(f"{self.label}: {total} 条账号通知合并为 {count} 条汇总通知")
+        return count
+
+
+def enqueue_account_notification(
+    db: Session,
+    account,
+    kind: str,
+    title: str,
+    content: str,
+    item: Optional[DigestItem] = None,
+    digest: Optional[NotifyDigest] = None
+) -> int:
+    """
+    按账号启用的推送渠道写入发件箱（不提交，由调用方与签到日志一起提交）
+
+    传入 digest 时，发送方式为汇总的渠道只收集 item，由 digest.flush 统一写入
+
+    Returns:
+        int: 写入或收集的通知数
+    """
+    rows = db.query(AccountNotify, NotifyChannel).join(
+        NotifyChannel, NotifyChannel.id == AccountNotify.channel_id
+    ).filter(
+        AccountNotify.account_id == account.id,
+        AccountNotify.is_enabled == True,
+        NotifyChannel.is_enabled == True
+    ).all()
+
+    for account_notify, channel in rows:
+        if digest is not None and channel.delivery_mode == DELIVERY_DIGEST:
+            digest.add(channel, account_notify.notify_config, item or DigestItem(account.username, True, content))
+            continue
+        db.add(NotifyOutbox(
+            channel_id=channel.id,
+            account_id=account.id,
+            kind=kind,
+            title=title,
+            content=content,
+            account_config=account_notify.notify_config,
+            status=STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now()
+        ))
+    return len(rows)
+
+
+def retry_backoff(attempts: int) -> timedelta:
+    """第 attempts 次发送失败后的等待时间"""
+    seconds = min(settings.notify_retry_base * 2 ** max(0, attempts - 1), settings.notify_retry_max_backoff)
+    return timedelta(seconds=seconds * random.uniform(1, 1.5))
+
+
+class NotifyDispatcher:
+    """
+    发件箱投递器：一个调度线程领取到期的通知，交给线程池发送
+
+    Example:
+        notify_dispatcher.start()
+        ...
+        db.commit()
+        notify_dispatcher.wake()  # 提交新通知后立即投递，不等下一次轮询
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[int, int] = {}
+        self._last_purge: Optional[datetime] = None
+        self.sent = 0
+        self.failed = 0
+        self.dead = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.recover()
+        self._stopped.clear()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, settings.notify_workers), thread_name_prefix="notify")
+        self._thread = threading.Thread(target=self._loop, name="notify-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"通知投递已启动: {settings.notify_workers} 个线程，每渠道并发 {settings.notify_channel_concurrency}")
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False)
+        self._thread = None
+        logger.info("通知投递已停止")
+
+    def wake(self):
+        self._wake.set()
+
+    def recover(self):
+        """释放上次进程未发送完的通知，并清理过期的已发送通知"""
+        db = SessionLocal()
+        try:
+            released = db.query(NotifyOutbox).filter(NotifyOutbox.status == STATUS_SENDING).update(
+                {NotifyOutbox.status: STATUS_PENDING}, synchronize_session=False
+            )
+            db.commit()
+            if released:
+                logger.info(f"通知发件箱: {released} 条上次发送中的通知重新排队")
+            self._purge(db)
+        finally:
+            db.close()
+
+    def _purge(self, db: Session):
+        cutoff = datetime.now() - timedelta(days=settings.notify_outbox_retention_days)
+        db.query(NotifyOutbox).filter(
+            NotifyOutbox.status == STATUS_SENT,
+            NotifyOutbox.sent_at < cutoff
+        ).delete(synchronize_session=False)
+        db.commit()
+        self._last_purge = datetime.now()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=settings.notify_poll_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error(f"通知投递异常: {e}")
+
+    def drain(self):
+        """按各渠道的空闲并发领取到期通知并提交给线程池"""
+        db = SessionLocal()
+        try:
+            if self._last_purge is None or datetime.now() - self._last_purge > timedelta(hours=1):
+                self._purge(db)
+
+            limit = max(1, settings.notify_channel_concurrency)
+            with self._lock:
+                free_slots = max(0, settings.notify_workers - sum(self._in_flight.values()))
+            if not free_slots:
+                return
+
+            due = db.query(NotifyOutbox).filter(
+                NotifyOutbox.status == STATUS_PENDING,
+                NotifyOutbox.next_attempt_at <= datetime.now()
+            ).order_by(NotifyOutbox.next_attempt_at, NotifyOutbox.id).limit(free_slots * 4).all()
+
+            claimed: List[tuple] = []
+            with self._lock:
+                for entry in due:
+                    if len(claimed) >= free_slots:
+                        break
+                    # 渠道已满的通知留在队列中，等下一轮
+                    if self._in_flight.get(entry.channel_id, 0) >= limit:
+                        continue
+                    self._in_flight[entry.channel_id] = self._in_flight.get(entry.channel_id, 0) + 1
+                    entry.status = STATUS_SENDING
+                    claimed.append((entry.id, entry.channel_id))
+            db.commit()
+
+            for entry_id, channel_id in claimed:
+                self._executor.submit(self._deliver, entry_id, channel_id)
+        finally:
+            db.close()
+
+    def _deliver(self, entry_id: int, channel_id: int):
+        db = SessionLocal()
+        try:
+            entry = db.query(NotifyOutbox).filter(NotifyOutbox.id == entry_id).first()
+            if entry is None:
+                return
+            channel = db.query(NotifyChannel).filter(NotifyChannel.id == channel_id).first()
+            if channel is None or not channel.is_enabled:
+                entry.status = STATUS_DEAD
+                entry.last_error = "渠道已删除或禁用"
+                db.commit()
+                return
+
+            error = None
+            try:
+                config = json.loads(channel.config)
+                account_config = json.loads(entry.account_config) if entry.account_config else {}
+                # 合并配置：账号配置优先，渠道配置作为后备
+                notifier = NotifyFactory.create(channel.type, config)
+                if not notifier.send(entry.title, entry.content, {**config, **account_config}):
+                    error = "发送失败"
+            except Exception as e:
+                error = str(e)
+
+            entry.attempts += 1
+            if error is None:
+                entry.status = STATUS_SENT
+                entry.sent_at = datetime.now()
+                entry.last_error = None
+                self.sent += 1
+                logger.info(f"通知发送成功: {channel.name} -> {entry.title}")
+            elif entry.attempts >= settings.notify_max_attempts:
+                entry.status = STATUS_DEAD
+                entry.last_error = error
+                self.dead += 1
+                logger.error(f"通知发送失败 {entry.attempts} 次，放弃: {channel.name} -> {entry.title}: {error}")
+            else:
+                entry.status = STATUS_PENDING
+                entry.last_error = error
+                entry.next_attempt_at = datetime.now() + retry_backoff(entry.attempts)
+                self.failed += 1
+                logger.warning(f"通知发送失败，稍后重试: {channel.name} -> {entry.title}: {error}")
+            db.commit()
+        except Exception as e:
+            logger.error(f"通知投递异常 {entry_id}: {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._in_flight[channel_id] -= 1
+            # 渠道有空闲并发，继续投递排队的通知
+            self._wake.set()
+
+    def get_stats(self, db: Session) -> Dict[str, Any]:
+        counts = {
+            status: db.query(NotifyOutbox).filter(NotifyOutbox.status == status).count()
+            for status in (STATUS_PENDING, STATUS_SENDING, STATUS_SENT, STATUS_DEAD)
+        }
+        with self._lock:
+            in_flight = {channel_id: count for channel_id, count in self._in_flight.items() if count}
+        return {
+            "running": self.running,
+            "counts": counts,
+            "in_flight": in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dead": self.dead,
+        }
+
+
+# 单例
+notify_dispatcher = NotifyDispatcher()
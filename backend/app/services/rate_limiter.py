@@ -0,0 +1,306 @@
+"""
+上游限流与并发控制
+
+按上游主机维护一个令牌桶（平均速率 + 突发容量）和最大在途请求数，进程内所有请求
+（同步 / 异步服务、调度任务、手动批量操作）共用同一组限额。
+配置了出口池时按 (出口, 主机) 分别计算限额，每个出口的在途上限为该出口的并发上限。
+
+请求分为两个优先级通道：
+- interactive：页面上的单账号操作（默认）
+- bulk：定时签到、批量健康检查等批量任务
+排队时 interactive 通道总是先于 bulk 获得许可，批量任务不会拖慢页面操作。
+"""
+import time
+import asyncio
+import logging
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.config import settings
+from app.services.metrics import current_run_stats
+
+logger = logging.getLogger(__name__)
+
+# 未配置出口池时的出口名称（与 egress.DEFAULT_EGRESS 一致）
+DEFAULT_EGRESS = "default"
+
+LANE_INTERACTIVE = "interactive"
+LANE_BULK = "bulk"
+# 按优先级从高到低排列
+LANES = (LANE_INTERACTIVE, LANE_BULK)
+
+# 异步等待方的轮询间隔上限（秒）
+ASYNC_POLL_INTERVAL = 0.05
+
+_current_lane: ContextVar[str] = ContextVar("upstream_lane", default=LANE_INTERACTIVE)
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    """
+    在当前上下文（线程或异步任务）内以指定通道发出上游请求
+
+    Example:
+        with lane(LANE_BULK):
+            anyrouter_service.sign_in(...)
+    """
+    if name not in LANES:
+        raise ValueError(f"未知的请求通道: {name}")
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def in_lane(name: str) -> Callable:
+    """装饰器：函数内发出的上游请求使用指定通道（用于调度任务）"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with lane(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_lane() -> str:
+    """当前上下文的请求通道"""
+    return _current_lane.get()
+
+
+class LaneStats:
+    """单个通道的排队统计"""
+
+    def __init__(self):
+        self.waiting = 0          # 当前排队数
+        self.max_waiting = 0      # 历史最大排队数
+        self.acquired = 0         # 已获得许可次数
+        self.delayed = 0          # 需要等待才获得许可的次数
+        self.wait_total = 0.0     # 累计等待时间（秒）
+        self.wait_max = 0.0       # 最长等待时间（秒）
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "wait_avg_ms": round(self.wait_total / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+class HostGovernor:
+    """
+    单个上游主机的令牌桶 + 在途请求上限
+
+    Args:
+        host: 主机名（仅用于统计）
+        rate: 每秒允许发出的请求数，<= 0 表示不限速
+        burst: 令牌桶容量（允许的突发请求数）
+        max_in_flight: 最大在途请求数，<= 0 表示不限制
+    """
+
+    def __init__(self, host: str, rate: float, burst: int, max_in_flight: int):
+        self.host = host
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._queues: Dict[str, deque] = {name: deque() for name in LANES}
+        self._stats: Dict[str, LaneStats] = {name: LaneStats() for name in LANES}
+
+    def _refill(self, now: float):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, ticket: object, lane_name: str) -> float:
+        """
+        尝试为排队的 ticket 取得许可（调用方需持有锁）
+
+        Returns:
+            float: 0 表示已取得许可，否则为建议的等待秒数
+        """
+        for name in LANES:
+            if self._queues[name]:
+                if name != lane_name or self._queues[name][0] is not ticket:
+                    # 还没轮到：更高优先级通道或同通道的前序请求在排队
+                    return ASYNC_POLL_INTERVAL
+                break
+
+        if self.max_in_flight > 0 and self.in_flight >= self.max_in_flight:
+            return ASYNC_POLL_INTERVAL
+
+        self._refill(time.monotonic())
+        if self.rate > 0 and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        if self.rate > 0:
+            self._tokens -= 1
+        self.in_flight += 1
+        self._queues[lane_name].popleft()
+        return 0.0
+
+    def _enqueue(self, lane_name: str) -> object:
+        ticket = object()
+        stats = self._stats[lane_name]
+        self._queues[lane_name].append(ticket)
+        stats.waiting += 1
+        stats.max_waiting = max(stats.max_waiting, stats.waiting)
+        return ticket
+
+    def _finish_wait(self, ticket: object, lane_name: str, started: float, granted: bool):
+        """结束排队：记录统计，未取得许可（如任务被取消）时移出队列（调用方需持有锁）"""
+        stats = self._stats[lane_name]
+        stats.waiting -= 1
+        if not granted:
+            try:
+                self._queues[lane_name].remove(ticket)
+            except ValueError:
+                pass
+            return
+        waited = time.monotonic() - started
+        stats.acquired += 1
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        if waited > 0.001:
+            stats.delayed += 1
+            run = current_run_stats()
+            if run is not None:
+                run.observe_stage("queue", waited)
+
+    def acquire(self, lane_name: Optional[str] = None):
+        """阻塞直到取得许可"""
+        lane_name = lane_name or current_lane()
+        started = time.monotonic()
+        granted = False
+        with self._cond:
+            ticket = self._enqueue(lane_name)
+            try:
+                while True:
+                    delay = self._try_take(ticket, lane_name)
+                    if delay == 0:
+                        granted = True
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._finish_wait(ticket, lane_name, started, granted)
+                # 队首已变化，唤醒其他等待方
+                self._cond.notify_all()
+
+    async def acquire_async(self, lane_name: Optional[str] = None):
+        """异步等待直到取得许可"""
+        lane_name = lane_name or current_lane()
+        started = time.monotonic()
+        granted = False
+        with self._cond:
+            ticket = self._enqueue(lane_name)
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_take(ticket, lane_name)
+                    if delay == 0:
+                        granted = True
+                        self._cond.notify_all()
+                        break
+                await asyncio.sleep(min(delay, ASYNC_POLL_INTERVAL))
+        finally:
+            with self._cond:
+                self._finish_wait(ticket, lane_name, started, granted)
+
+    def release(self):
+        """请求结束，归还在途名额"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self.in_flight,
+                "lanes": {name: stats.snapshot() for name, stats in self._stats.items()},
+            }
+
+
+class UpstreamRateLimiter:
+    """按 (出口, 主机) 划分的 HostGovernor 注册表"""
+
+    def __init__(self, rate: float, burst: int, max_in_flight: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._governors: Dict[Tuple[str, str], HostGovernor] = {}
+        self._egress_limits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def set_egress_limit(self, egress: str, max_in_flight: int):
+        """设置出口的在途请求上限（在该出口发出首个请求前调用）"""
+        self._egress_limits[egress] = max_in_flight
+
+    def for_url(self, url: str, egress: str = DEFAULT_EGRESS) -> HostGovernor:
+        """获取 URL 所属主机（经指定出口）的 HostGovernor"""
+        key = (egress, urlsplit(url).netloc)
+        governor = self._governors.get(key)
+        if governor is None:
+            with self._lock:
+                governor = self._governors.get(key)
+                if governor is None:
+                    host = key[1] if egress == DEFAULT_EGRESS else f"{key[1]}@{egress}"
+                    max_in_flight = self._egress_limits.get(egress, self.max_in_flight)
+                    governor = HostGovernor(host, self.rate, self.burst, max_in_flight)
+                    self._governors[key] = governor
+        return governor
+
+    @contextmanager
+    def slot(self, url: str, lane_name: Optional[str] = None, egress: str = DEFAULT_EGRESS) -> Iterator[None]:
+        """在许可范围内发出一次请求"""
+        governor = self.for_url(url, egress)
+        governor.acquire(lane_name)
+        try:
+            yield
+        finally:
+            governor.release()
+
+    @asynccontextmanager
+    async def slot_async(
+        self,
+        url: str,
+        lane_name: Optional[str] = None,
+        egress: str = DEFAULT_EGRESS
+    ) -> AsyncIterator[None]:
+        """在许可范围内发出一次异步请求"""
+        governor = self.for_url(url, egress)
+        await governor.acquire_async(lane_name)
+        try:
+            yield
+        finally:
+            governor.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各主机（出口）的限流与排队统计"""
+        with self._lock:
+            governors = list(self._governors.values())
+        return {governor.host: governor.get_stats() for governor in governors}
+
+
+# 单例
+rate_limiter = UpstreamRateLimiter(
+    rate=settings.upstream_rate_limit,
+    burst=settings.upstream_burst,
+    max_in_flight=settings.upstream_max_in_flight
+)
@@ -2,17 +2,39 @@
 定时任务调度器
 """
 import json
+import math
+import random
+import asyncio
+import hashlib
 import logging
+import threading
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import case, or_
 
 from app.database import SessionLocal
-from app.models import Account, SignLog, Setting, NotifyChannel
-from app.services import anyrouter_service
-from app.services.notify import NotifyFactory
+from app.models import Account, SignLog, SignRetry, Setting
+from app.services import anyrouter_service, AsyncAnyRouterService
+from app.services.anyrouter import sign_operations, health_check_operations
+from app.services.sign_engine import SignEngine, SignTask, MODE_THREAD, parse_sign_result
+from app.services.signed_today import signed_today
+from app.services.sign_retry import (
+    enqueue_sign_retry, claim_due_retries, reschedule_retry, release_retry, recover_sign_retries
+)
+from app.services.rate_limiter import in_lane, LANE_BULK
+from app.services.circuit_breaker import FAILURE_CIRCUIT_OPEN
+from app.config import settings
+from app.services.notify import DigestItem
+from app.services.job_runs import (
+    record_job_run, current_job_run, JOB_AUTO_SIGN, JOB_SIGN_RETRY, JOB_HEALTH_CHECK
+)
+from app.services.notify_outbox import (
+    notify_dispatcher, enqueue_account_notification, NotifyDigest, KIND_SIGN, KIND_HEALTH
+)
 from app.utils import format_quota
 
 logger = logging.getLogger(__name__)
@@ -20,6 +42,76 @@ logger = logging.getLogger(__name__)
 # 全局调度器实例
 scheduler = BackgroundScheduler()
 
+# 最近一次签到前预热的结果（原地更新，供调度器状态接口展示）
+last_prewarm: dict = {}
+# 当前 / 最近一次自动签到的进度（原地更新；签到窗口内各波次累计到同一份进度）
+sign_progress: dict = {}
+_progress_lock = threading.Lock()
+
+# 签到窗口内各波次及其预热的任务 ID 前缀
+SIGN_WAVE_JOB_PREFIX = "auto_sign_wave_"
+SIGN_PREWARM_JOB_PREFIX = "sign_prewarm_wave_"
+
+
+class SignWindow:
+    """
+    一次签到窗口：各波次共用一份汇总通知，最后一个结束的波次把汇总写入发件箱，
+    汇总渠道每个窗口只收到一条通知（而不是每个波次一条）
+
+    窗口状态只在内存中：进程重启后由 resume_sign_window 重新分派剩余账号，但此前已收集的汇总结果
+    丢失（单账号通知不受影响）；
+    熔断顺延的账号在窗口外单独签到，使用各自的汇总
+    """
+
+    def __init__(self, key: str, waves: int):
+        self.key = key
+        self.digest = NotifyDigest(KIND_SIGN, "自动签到")
+        self._pending = set(range(waves))
+        self._lock = threading.Lock()
+
+    def finish(self, wave: int) -> bool:
+        """波次结束（含跳过与异常），返回是否为本窗口最后一个结束的波次"""
+        with self._lock:
+            self._pending.discard(wave)
+            return not self._pending
+
+
+# 进行中的签到窗口（按窗口开始时间索引）
+sign_windows: Dict[str, SignWindow] = {}
+
+
+def start_sign_progress(total: int, **fields):
+    """开始新一轮签到进度（一次自动签到，或一个签到窗口的全部波次）"""
+    with _progress_lock:
+        sign_progress.clear()
+        sign_progress.update({
+            "started_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "finished_at": None,
+            "mode": None,
+            "concurrency": None,
+            "total": total,
+            "done": 0,
+            "success": 0,
+            "already_signed": 0,
+            "failed": 0,
+            "postponed": 0,
+            "skipped": 0,
+            **fields
+        })
+
+
+def add_sign_progress(**counts):
+    """累加签到进度计数（签到窗口的多个波次可能同时执行）"""
+    with _progress_lock:
+        for key, value in counts.items():
+            sign_progress[key] = sign_progress.get(key, 0) + value
+
+
+def set_sign_progress(**fields):
+    """更新签到进度字段"""
+    with _progress_lock:
+        sign_progress.update(fields)
+
 
 def get_setting_value(db, key: str, default=None):
     """获取设置值"""
@@ -32,60 +124,84 @@ def get_setting_value(db, key: str, default=None):
     return default
 
 
-def send_sign_notification(db, account, success: bool, sign_message: str):
-    """发送单个账号的签到通知"""
-    from app.models import AccountNotify
-
-    # 获取账号的推送配置
-    account_notifies = db.query(AccountNotify).filter(
-        AccountNotify.account_id == account.id,
-        AccountNotify.is_enabled == True
-    ).all()
-
-    if not account_notifies:
-        return
-
-    # 获取渠道配置
-    channel_ids = [n.channel_id for n in account_notifies]
-    channels = db.query(NotifyChannel).filter(
-        NotifyChannel.id.in_(channel_ids),
-        NotifyChannel.is_enabled == True
-    ).all()
-
-    if not channels:
-        return
-
-    # 构建通知内容
+def send_sign_notification(
+    db,
+    account,
+    success: bool,
+    sign_message: str,
+    reward_quota: int = 0,
+    digest: Optional[NotifyDigest] = None
+):
+    """将单个账号的签到通知写入发件箱（随签到日志一起提交，由后台投递；汇总渠道收集到 digest）"""
     title = f"签到{'成功' if success else '失败'} - {account.username}"
-    content = sign_message
+    item = DigestItem(account.username, success, sign_message, format_quota(reward_quota) if reward_quota else "")
+    enqueue_account_notification(db, account, KIND_SIGN, title, sign_message, item=item, digest=digest)
+
+
+def postpone_sign_batch(account_ids: list, postponed: int) -> bool:
+    """
+    签到接口熔断时将本批剩余账号顺延到熔断恢复后执行
+
+    Args:
+        account_ids: 尚未签到的账号 ID
+        postponed: 本批已顺延的次数
+
+    Returns:
+        bool: 是否已顺延（顺延次数用尽时不再顺延，账号将快速失败并进入常规重试）
+    """
+    retry_after = anyrouter_service.get_circuit_retry_after("sign_in")
+    if retry_after <= 0 or postponed >= settings.circuit_max_postpones:
+        return False
+
+    run_date = datetime.now() + timedelta(seconds=retry_after + 5)
+    schedule_postponed_sign(account_ids, postponed + 1, run_date)
+    logger.warning(
+        f"签到接口熔断中，{len(account_ids)} 个账号顺延到 {run_date.strftime('%H:%M:%S')} 执行"
+        f"（第 {postponed + 1} 次顺延）"
+    )
+    return True
 
-    # 构建账号配置映射
-    account_notify_map = {n.channel_id: n for n in account_notifies}
 
-    # 发送通知
-    for channel in channels:
-        try:
-            config = json.loads(channel.config)
-            # 获取账号专属配置
-            account_notify = account_notify_map.get(channel.id)
-            account_config = json.loads(account_notify.notify_config) if account_notify and account_notify.notify_config else {}
-            # 合并配置：账号配置优先，渠道配置作为后备
-            merged_config = {**config, **account_config}
-
-            notifier = NotifyFactory.create(channel.type, config)
-            result = notifier.send(title, content, merged_config)
-            if result:
-                logger.info(f"通知发送成功: {channel.name} -> {account.username}")
-            else:
-                logger.error(f"通知发送失败: {channel.name} -> {account.username}")
-        except Exception as e:
-            logger.error(f"通知发送异常 {channel.name}: {e}")
+def schedule_postponed_sign(account_ids: list, postponed: int, run_date: datetime):
+    """安排顺延的签到任务（签到窗口的多个波次先后顺延时合并为一个任务）"""
+    existing = scheduler.get_job("auto_sign_postponed")
+    if existing is not None:
+        account_ids = list(dict.fromkeys(list(existing.args[0]) + list(account_ids)))
+    scheduler.add_job(
+        auto_sign_job,
+        DateTrigger(run_date=run_date),
+        id="auto_sign_postponed",
+        replace_existing=True,
+        args=[account_ids, postponed]
+    )
 
 
-def auto_sign_job():
-    """自动签到任务"""
+@in_lane(LANE_BULK)
+@record_job_run(JOB_AUTO_SIGN)
+def auto_sign_job(
+    account_ids: Optional[list] = None,
+    postponed: int = 0,
+    force: bool = False,
+    window: Optional[str] = None,
+    wave: int = 0
+):
+    """
+    自动签到任务
+
+    Args:
+        account_ids: 只处理这些账号（签到窗口的一个波次或熔断顺延后的剩余账号），为空时处理全部启用账号
+        postponed: 本批已因熔断顺延的次数
+        force: 今日已签到的账号也请求上游
+        window: 所属签到窗口，各波次共用窗口的汇总通知
+        wave: 在签到窗口中的波次序号
+    """
     logger.info("开始执行自动签到任务...")
+    from app.api.accounts import apply_refreshed_user_info
+
     db = SessionLocal()
+    run = current_job_run()
+    sign_window = sign_windows.get(window) if window is not None else None
+    digest: Optional[NotifyDigest] = sign_window.digest if sign_window is not None else None
 
     try:
         # 检查是否启用自动签到
@@ -95,71 +211,113 @@ def auto_sign_job():
             return
 
         # 获取所有启用的账号
-        accounts = db.query(Account).filter(
+        query = db.query(Account).filter(
             Account.is_active == True,
             Account.anyrouter_user_id.isnot(None)
-        ).all()
+        )
+        if account_ids is not None:
+            query = query.filter(Account.id.in_(account_ids))
+        accounts = query.all()
+
+        # 今日已签到的账号不再请求上游
+        local_skipped = 0
+        if not force:
+            unsigned = set(signed_today.unsigned(account.id for account in accounts))
+            local_skipped = len(accounts) - len(unsigned)
+            accounts = [account for account in accounts if account.id in unsigned]
+            if local_skipped:
+                logger.info(f"今日已签到 {local_skipped} 个账号，跳过")
+                run.add(skipped=local_skipped)
+                if sign_window is not None:
+                    add_sign_progress(total=-local_skipped, skipped=local_skipped)
 
         if not accounts:
             logger.info("没有可签到的账号")
             return
 
+        # 上游不可用时整批顺延，不逐个账号空耗重试
+        if postpone_sign_batch([account.id for account in accounts], postponed):
+            if sign_window is not None:
+                add_sign_progress(postponed=len(accounts))
+            return
+
         # 获取重试配置
         retry_enabled = get_setting_value(db, "sign_retry_enabled", True)
-        max_retries = get_setting_value(db, "sign_max_retries", 3)
         retry_interval = get_setting_value(db, "sign_retry_interval", 30)  # 分钟
 
         success_count = 0
         fail_count = 0
         skip_count = 0
-        retry_accounts = []
 
-        for account in accounts:
-            try:
-                # 执行签到
-                success, result = anyrouter_service.sign_in(
-                    account.session_cookie,
-                    str(account.anyrouter_user_id)
-                )
-
-                sign_success = success and result.get("success", False)
-                message = result.get("message", "")
-                reward_quota = 0
-
-                # 判断是否已签到
-                already_signed = sign_success and not message
-
-                if sign_success and message:
-                    import re
-                    match = re.search(r'\$(\d+(?:\.\d+)?)', message)
-                    if match:
-                        from app.config import settings as app_settings
-                        usd_value = float(match.group(1))
-                        reward_quota = int(usd_value * app_settings.quota_to_usd_rate)
+        # 按设置的引擎与并发数签到，结果按完成顺序分块写入
+        engine = SignEngine(
+            mode=get_setting_value(db, "sign_engine_mode", MODE_THREAD),
+            concurrency=get_setting_value(db, "sign_concurrency", 4)
+        )
+        account_map = {account.id: account for account in accounts}
+        tasks = [SignTask(account.id, account.session_cookie, str(account.anyrouter_user_id)) for account in accounts]
+        chunk_size = max(1, settings.sign_log_chunk_size)
+        started = datetime.now()
+        if sign_window is None:
+            start_sign_progress(len(tasks), skipped=local_skipped)
+        set_sign_progress(mode=engine.mode, concurrency=engine.concurrency)
+        logger.info(f"签到引擎: {engine.mode}，并发 {engine.concurrency}，共 {len(tasks)} 个账号")
+        if digest is None:
+            digest = NotifyDigest(KIND_SIGN, "自动签到")
+        # 签到成功的账号在所在分块提交后再记入今日已签到
+        signed_ids = []
+
+        def circuit_open() -> bool:
+            # 执行中途熔断：剩余未提交的账号顺延（顺延次数用尽后继续签到，由常规重试兜底）
+            return postponed < settings.circuit_max_postpones and anyrouter_service.get_circuit_retry_after("sign_in") > 0
+
+        for outcome in engine.run(tasks, should_stop=circuit_open):
+            account = account_map[outcome.account_id]
+
+            if outcome.error is not None:
+                logger.error(f"账号 {account.username} 签到异常: {outcome.error}")
+                fail_count += 1
+                log_status = "failed"
+                # 发送失败通知
+                send_sign_notification(db, account, False, outcome.error, digest=digest)
+                # 加入重试队列
+                if retry_enabled:
+                    enqueue_sign_retry(db, account.id, outcome.error, retry_interval)
+            else:
+                apply_refreshed_user_info(account, outcome.results)
+                sign_success, already_signed, message, reward_quota = parse_sign_result(*outcome.sign_result)
 
                 # 记录日志
                 if already_signed:
                     log_message = "今日已签到"
+                    log_status = "already_signed"
                     skip_count += 1
                 else:
                     log_message = message
                     if sign_success:
+                        log_status = "success"
                         success_count += 1
                     else:
+                        log_status = "failed"
                         fail_count += 1
-                        # 记录需要重试的账号
+                        # 加入重试队列
                         if retry_enabled:
-                            retry_accounts.append({
-                                "account_id": account.id,
-                                "retry_count": 0
-                            })
+                            enqueue_sign_retry(db, account.id, message, retry_interval)
+                if sign_success:
+                    signed_ids.append(account.id)
+                    # 已成功的账号不再重试（正在被轮询任务执行的除外）
+                    db.query(SignRetry).filter(
+                        SignRetry.account_id == account.id,
+                        SignRetry.claimed_at.is_(None)
+                    ).delete(synchronize_session=False)
 
                 log = SignLog(
                     account_id=account.id,
                     success=sign_success,
                     message=log_message,
                     reward_quota=reward_quota,
-                    retry_count=0
+                    retry_count=0,
+                    status=log_status
                 )
                 db.add(log)
 
@@ -167,149 +325,195 @@ def auto_sign_job():
 
                 # 发送该账号的通知（跳过已签到的）
                 if not already_signed:
-                    send_sign_notification(db, account, sign_success, log_message)
-
-            except Exception as e:
-                logger.error(f"账号 {account.username} 签到异常: {e}")
-                fail_count += 1
-                # 发送失败通知
-                send_sign_notification(db, account, False, str(e))
-                # 记录需要重试的账号
-                if retry_enabled:
-                    retry_accounts.append({
-                        "account_id": account.id,
-                        "retry_count": 0
-                    })
-
+                    send_sign_notification(db, account, sign_success, log_message, reward_quota, digest=digest)
+
+            done = success_count + skip_count + fail_count
+            add_sign_progress(done=1, **{log_status: 1})
+            if done % chunk_size == 0:
+                db.commit()
+                signed_today.mark_all(signed_ids)
+                signed_ids.clear()
+                notify_dispatcher.wake()
+                elapsed = (datetime.now() - started).total_seconds()
+                logger.info(f"签到进度: {done}/{len(tasks)}，耗时 {elapsed:.1f} 秒")
+
+        if sign_window is None:
+            digest.flush(db)
         db.commit()
+        signed_today.mark_all(signed_ids)
+        notify_dispatcher.wake()
+        run.add(success=success_count, failed=fail_count, skipped=skip_count)
+        add_sign_progress(postponed=len(engine.unsubmitted))
+        if sign_window is None:
+            set_sign_progress(finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
         logger.info(f"自动签到完成: 成功 {success_count}, 已签 {skip_count}, 失败 {fail_count}")
 
-        # 如果有失败的账号且启用重试，安排重试任务
-        if retry_accounts and retry_enabled:
-            schedule_retry_sign(retry_accounts, max_retries, retry_interval)
+        if engine.unsubmitted and not postpone_sign_batch(engine.unsubmitted, postponed):
+            # 停止提交后熔断已恢复，剩余账号立即补签
+            schedule_postponed_sign(engine.unsubmitted, postponed, datetime.now())
 
     except Exception as e:
+        db.rollback()
+        run.error = str(e)
         logger.error(f"自动签到任务异常: {e}")
     finally:
+        if sign_window is not None:
+            if sign_window.finish(wave):
+                sign_windows.pop(sign_window.key, None)
+                set_sign_progress(finished_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            else:
+                # 窗口内还有未结束的波次，汇总由最后一个结束的波次写入
+                digest = None
+        # 中途异常时已签到账号的汇总、签到窗口最后一个波次的汇总在此写入（其余情况已在上面写入，此处为空）
+        if digest is not None and len(digest):
+            try:
+                digest.flush(db)
+                db.commit()
+                notify_dispatcher.wake()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"写入自动签到汇总通知失败: {e}")
         db.close()
 
 
-def schedule_retry_sign(accounts: list, max_retries: int, retry_interval: int):
-    """安排重试签到任务"""
-    if not accounts:
-        return
+def _retry_log_message(attempt: int, message: str) -> str:
+    return f"重试{attempt}次后: {message}"
 
-    retry_time = datetime.now() + timedelta(minutes=retry_interval)
-    job_id = f"retry_sign_{retry_time.strftime('%Y%m%d%H%M%S')}"
-
-    # 添加一次性重试任务
-    scheduler.add_job(
-        retry_sign_job,
-        DateTrigger(run_date=retry_time),
-        id=job_id,
-        replace_existing=True,
-        args=[accounts, max_retries, retry_interval]
-    )
-    logger.info(f"已安排重试任务 {job_id}，将在 {retry_time.strftime('%H:%M:%S')} 执行")
 
+@in_lane(LANE_BULK)
+@record_job_run(JOB_SIGN_RETRY)
+def sign_retry_poll_job():
+    """签到重试轮询：分批领取到期的重试并行签到，失败的按指数退避重新排队"""
+    from app.api.accounts import apply_refreshed_user_info
 
-def retry_sign_job(accounts: list, max_retries: int, retry_interval: int):
-    """重试签到任务"""
-    logger.info(f"开始执行重试签到任务，共 {len(accounts)} 个账号...")
     db = SessionLocal()
+    run = current_job_run()
 
     try:
-        success_count = 0
-        fail_count = 0
-        retry_accounts = []
-
-        for item in accounts:
-            account_id = item["account_id"]
-            retry_count = item["retry_count"] + 1
-
-            account = db.query(Account).filter(
-                Account.id == account_id,
-                Account.is_active == True
-            ).first()
-
-            if not account or not account.anyrouter_user_id:
-                continue
-
-            try:
-                # 执行签到
-                success, result = anyrouter_service.sign_in(
-                    account.session_cookie,
-                    str(account.anyrouter_user_id)
-                )
-
-                sign_success = success and result.get("success", False)
-                message = result.get("message", "")
-                reward_quota = 0
-
-                # 判断是否已签到
-                already_signed = sign_success and not message
-
-                if sign_success and message:
-                    import re
-                    match = re.search(r'\$(\d+(?:\.\d+)?)', message)
-                    if match:
-                        from app.config import settings as app_settings
-                        usd_value = float(match.group(1))
-                        reward_quota = int(usd_value * app_settings.quota_to_usd_rate)
+        if not get_setting_value(db, "sign_retry_enabled", True):
+            return
+        # 签到接口熔断中：本轮不领取，到期的重试等熔断恢复后执行，不计重试次数
+        if anyrouter_service.get_circuit_retry_after("sign_in") > 0:
+            return
 
-                # 记录日志
-                if already_signed:
-                    log_message = f"重试{retry_count}次后: 今日已签到"
-                    success_count += 1
-                elif sign_success:
-                    log_message = f"重试{retry_count}次后: {message}"
-                    success_count += 1
+        max_retries = get_setting_value(db, "sign_max_retries", 3)
+        retry_interval = get_setting_value(db, "sign_retry_interval", 30)  # 分钟
+        engine = SignEngine(
+            mode=get_setting_value(db, "sign_engine_mode", MODE_THREAD),
+            concurrency=get_setting_value(db, "sign_concurrency", 4)
+        )
+        batch_size = max(1, settings.sign_retry_batch_size)
+
+        while True:
+            entries = {entry.account_id: entry for entry in claim_due_retries(db, batch_size)}
+            if not entries:
+                break
+
+            accounts = {account.id: account for account in db.query(Account).filter(
+                Account.id.in_(entries),
+                Account.is_active == True,
+                Account.anyrouter_user_id.isnot(None)
+            ).all()}
+            # 账号已删除、禁用或今日已签到：移出队列
+            for account_id in entries.keys() - set(signed_today.unsigned(accounts)):
+                db.delete(entries.pop(account_id))
+                accounts.pop(account_id, None)
+                run.add(skipped=1)
+
+            logger.info(f"开始重试签到，共 {len(accounts)} 个账号...")
+            success_count = 0
+            fail_count = 0
+            tasks = [SignTask(account.id, account.session_cookie, str(account.anyrouter_user_id)) for account in accounts.values()]
+            circuit_open = lambda: anyrouter_service.get_circuit_retry_after("sign_in") > 0
+            digest = NotifyDigest(KIND_SIGN, "重试签到")
+            signed_ids = []
+
+            for outcome in engine.run(tasks, should_stop=circuit_open):
+                account = accounts[outcome.account_id]
+                entry = entries[outcome.account_id]
+                attempt = entry.attempts + 1
+
+                if outcome.error is not None:
+                    logger.error(f"账号 {account.username} 重试签到异常: {outcome.error}")
+                    sign_success, already_signed, message, reward_quota = False, False, outcome.error, 0
                 else:
-                    log_message = f"重试{retry_count}次后: {message}"
-                    fail_count += 1
-                    # 如果还有重试次数，继续重试
-                    if retry_count < max_retries:
-                        retry_accounts.append({
-                            "account_id": account_id,
-                            "retry_count": retry_count
-                        })
+                    apply_refreshed_user_info(account, outcome.results)
+                    sign_success, already_signed, message, reward_quota = parse_sign_result(*outcome.sign_result)
+                    log_message = _retry_log_message(attempt, "今日已签到" if already_signed else message)
+                    db.add(SignLog(
+                        account_id=account.id,
+                        success=sign_success or already_signed,
+                        message=log_message,
+                        reward_quota=reward_quota,
+                        retry_count=attempt,
+                        status="already_signed" if already_signed else "success" if sign_success else "failed"
+                    ))
+                    logger.info(f"账号 {account.username} 重试签到(第{attempt}次): {log_message}")
+
+                if sign_success or already_signed:
+                    success_count += 1
+                    signed_ids.append(account.id)
+                    db.delete(entry)
+                    if not already_signed:
+                        send_sign_notification(
+                            db, account, True, f"重试签到成功: {message}", reward_quota, digest=digest
+                        )
+                    continue
 
-                log = SignLog(
-                    account_id=account.id,
-                    success=sign_success or already_signed,
-                    message=log_message,
-                    reward_quota=reward_quota,
-                    retry_count=retry_count
-                )
-                db.add(log)
+                fail_count += 1
+                if attempt < max_retries:
+                    reschedule_retry(entry, message, retry_interval)
+                else:
+                    logger.warning(f"账号 {account.username} 已重试 {attempt} 次仍失败，移出重试队列")
+                    db.delete(entry)
 
-                logger.info(f"账号 {account.username} 重试签到(第{retry_count}次): {log_message}")
+            # 中途熔断：未执行的账号放回队列
+            for account_id in engine.unsubmitted:
+                release_retry(entries[account_id])
 
-                # 发送通知
-                if sign_success and not already_signed:
-                    send_sign_notification(db, account, True, f"重试签到成功: {message}")
+            digest.flush(db)
+            db.commit()
+            signed_today.mark_all(signed_ids)
+            notify_dispatcher.wake()
+            run.add(success=success_count, failed=fail_count)
+            logger.info(f"重试签到完成: 成功 {success_count}, 失败 {fail_count}")
 
-            except Exception as e:
-                logger.error(f"账号 {account.username} 重试签到异常: {e}")
-                fail_count += 1
-                if retry_count < max_retries:
-                    retry_accounts.append({
-                        "account_id": account_id,
-                        "retry_count": retry_count
-                    })
+            if engine.unsubmitted or len(entries) < batch_size:
+                break
 
+    except Exception as e:
+        db.rollback()
+        run.error = str(e)
+        logger.error(f"重试签到任务异常: {e}")
+        # 释放本轮领取的重试，下一轮重新执行
+        db.query(SignRetry).filter(SignRetry.claimed_at.isnot(None)).update(
+            {SignRetry.claimed_at: None}, synchronize_session=False
+        )
         db.commit()
-        logger.info(f"重试签到完成: 成功 {success_count}, 失败 {fail_count}")
+    finally:
+        db.close()
+
 
-        # 如果还有失败的账号，继续安排重试
-        if retry_accounts:
-            schedule_retry_sign(retry_accounts, max_retries, retry_interval)
+def update_sign_retry_schedule():
+    """启动签到重试轮询（恢复上次进程留下的重试队列）"""
+    db = SessionLocal()
 
+    try:
+        recover_sign_retries(db)
     except Exception as e:
-        logger.error(f"重试签到任务异常: {e}")
+        logger.error(f"恢复签到重试队列失败: {e}")
     finally:
         db.close()
 
+    scheduler.add_job(
+        sign_retry_poll_job,
+        IntervalTrigger(seconds=max(1, settings.sign_retry_poll_interval)),
+        id="sign_retry_poller",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
 
 def update_sign_schedule():
     """更新签到定时任务"""
@@ -319,21 +523,32 @@ def update_sign_schedule():
         enabled = get_setting_value(db, "auto_sign_enabled", False)
         sign_time = get_setting_value(db, "auto_sign_time", "08:00")
 
+        prewarm_enabled = get_setting_value(db, "sign_prewarm_enabled", False)
+        prewarm_minutes = get_setting_value(db, "sign_prewarm_minutes", 5)
+        window_minutes = get_setting_value(db, "sign_window_minutes", 0)
+
         # 移除现有任务
-        if scheduler.get_job("auto_sign"):
-            scheduler.remove_job("auto_sign")
+        for job_id in ("auto_sign", "sign_prewarm"):
+            if scheduler.get_job(job_id):
+                scheduler.remove_job(job_id)
 
         if enabled and sign_time:
             hour, minute = map(int, sign_time.split(":"))
 
-            # 添加定时任务
+            # 添加定时任务（设置了签到窗口时，到点后把账号分波次排入窗口）
             scheduler.add_job(
-                auto_sign_job,
+                dispatch_sign_waves if window_minutes > 0 else auto_sign_job,
                 CronTrigger(hour=hour, minute=minute),
                 id="auto_sign",
                 replace_existing=True
             )
-            logger.info(f"自动签到任务已设置: 每天 {sign_time}")
+            if window_minutes > 0:
+                logger.info(f"自动签到任务已设置: 每天 {sign_time} 起 {window_minutes} 分钟内分批签到")
+            else:
+                logger.info(f"自动签到任务已设置: 每天 {sign_time}")
+
+            if prewarm_enabled:
+                schedule_sign_prewarm(hour, minute, prewarm_minutes, window_minutes)
         else:
             logger.info("自动签到任务已禁用")
 
@@ -343,140 +558,395 @@ def update_sign_schedule():
         db.close()
 
 
-def health_check_job():
-    """账号健康检查任务"""
-    logger.info("开始执行账号健康检查任务...")
+def sign_offset_fraction(account_id: int) -> float:
+    """账号在签到窗口中的固定位置（0~1），由账号 ID 的哈希决定，每天相同"""
+    digest = hashlib.blake2b(str(account_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+def active_account_ids(db) -> list:
+    """可自动签到的账号 ID（启用且已绑定上游用户）"""
+    return [account_id for (account_id,) in db.query(Account.id).filter(
+        Account.is_active == True,
+        Account.anyrouter_user_id.isnot(None)
+    ).all()]
+
+
+def plan_sign_waves(account_ids: list, start: datetime, window_minutes: float, wave_size: int) -> list:
+    """
+    把账号按哈希偏移排入签到窗口，每 wave_size 个账号为一个波次
+
+    Returns:
+        list: [(执行时间, 账号 ID 列表)]，按时间排序；波次在其第一个账号的偏移处执行
+    """
+    window = max(0, window_minutes) * 60
+    size = max(1, wave_size)
+    ordered = sorted(account_ids, key=sign_offset_fraction)
+    return [
+        (start + timedelta(seconds=sign_offset_fraction(ordered[index]) * window), ordered[index:index + size])
+        for index in range(0, len(ordered), size)
+    ]
+
+
+def dispatch_sign_waves(end: Optional[datetime] = None):
+    """
+    签到窗口开始：把今日尚未签到的启用账号分成波次，各波次在窗口内的固定时间（加随机抖动）签到
+
+    Args:
+        end: 窗口结束时间；进程重启后恢复进行中的窗口时传入，账号排入窗口的剩余时间
+    """
     db = SessionLocal()
+    resumed = end is not None
 
     try:
-        # 检查是否启用健康检查
-        enabled = get_setting_value(db, "health_check_enabled", True)
-        if not enabled:
-            logger.info("健康检查未启用，跳过")
+        if not get_setting_value(db, "auto_sign_enabled", False):
+            logger.info("自动签到未启用，跳过")
             return
 
-        # 获取所有启用的账号
-        accounts = db.query(Account).filter(
-            Account.is_active == True,
-            Account.anyrouter_user_id.isnot(None)
-        ).all()
+        window_minutes = get_setting_value(db, "sign_window_minutes", 0)
+        wave_size = get_setting_value(db, "sign_wave_size", 20)
+        jitter = get_setting_value(db, "sign_jitter_seconds", 0)
+        prewarm_enabled = get_setting_value(db, "sign_prewarm_enabled", False)
+        prewarm_minutes = get_setting_value(db, "sign_prewarm_minutes", 5)
 
-        if not accounts:
-            logger.info("没有需要检查的账号")
+        account_ids = signed_today.unsigned(active_account_ids(db))
+        if not account_ids:
+            logger.info("没有可签到的账号")
             return
 
-        healthy_count = 0
-        unhealthy_count = 0
-
-        for account in accounts:
-            try:
-                # 尝试获取用户信息来验证凭证
-                success, user_info = anyrouter_service.get_user_info(
-                    account.session_cookie,
-                    str(account.anyrouter_user_id)
+        start = datetime.now()
+        if end is None:
+            end = start + timedelta(minutes=window_minutes)
+        waves = plan_sign_waves(account_ids, start, (end - start).total_seconds() / 60, wave_size)
+        close_sign_windows(db)
+        window = SignWindow(start.strftime("%Y-%m-%d %H:%M:%S"), len(waves))
+        sign_windows[window.key] = window
+        # 各波次累计到同一份进度
+        start_sign_progress(len(account_ids), waves=len(waves))
+        lead = timedelta(minutes=sign_prewarm_lead(prewarm_minutes)) if prewarm_enabled else None
+        for index, (run_at, wave) in enumerate(waves):
+            if jitter > 0:
+                run_at = min(run_at + timedelta(seconds=random.uniform(0, jitter)), end)
+            scheduler.add_job(
+                auto_sign_job,
+                DateTrigger(run_date=run_at),
+                id=f"{SIGN_WAVE_JOB_PREFIX}{index}",
+                replace_existing=True,
+                args=[wave],
+                kwargs={"window": window.key, "wave": index},
+                # 波次不可丢弃：调度线程繁忙时延后执行
+                misfire_grace_time=None
+            )
+            # 各波次执行前预热其账号：窗口开始前的预热任务已覆盖最早的几个波次，恢复的窗口立即预热已到时的波次
+            if lead is not None and (run_at - lead > start or resumed):
+                scheduler.add_job(
+                    sign_prewarm_job,
+                    DateTrigger(run_date=max(run_at - lead, start)),
+                    id=f"{SIGN_PREWARM_JOB_PREFIX}{index}",
+                    replace_existing=True,
+                    args=[wave]
                 )
+        logger.info(
+            f"签到窗口{'恢复' if resumed else '开始'}: {len(account_ids)} 个账号分 {len(waves)} 批，"
+            f"{start.strftime('%H:%M')}-{end.strftime('%H:%M')} 内执行"
+        )
 
-                now = datetime.now()
-                if success:
-                    account.health_status = "healthy"
-                    account.health_message = None
-                    # 顺便更新用户名
-                    if user_info.get("username"):
-                        account.username = user_info.get("username")
-                    if user_info.get("display_name"):
-                        account.display_name = user_info.get("display_name")
-                    # 更新 quota 缓存字段
-                    account.cached_quota = user_info.get("quota", 0)
-                    account.cached_used_quota = user_info.get("used_quota", 0)
-                    account.cached_request_count = user_info.get("request_count", 0)
-                    account.cached_user_group = user_info.get("group", "default")
-                    account.cached_aff_code = user_info.get("aff_code")
-                    account.cached_aff_count = user_info.get("aff_count", 0)
-                    account.cached_aff_history_quota = user_info.get("aff_history_quota", 0)
-                    account.quota_updated_at = now
-                    healthy_count += 1
-                else:
-                    account.health_status = "unhealthy"
-                    account.health_message = user_info.get("message", "凭证验证失败")
-                    unhealthy_count += 1
-                    logger.warning(f"账号 {account.username} 健康检查失败: {account.health_message}")
+    except Exception as e:
+        logger.error(f"签到分批调度异常: {e}")
+    finally:
+        db.close()
 
-                account.last_health_check = now
 
-            except Exception as e:
-                logger.error(f"账号 {account.username} 健康检查异常: {e}")
-                account.health_status = "unhealthy"
-                account.health_message = str(e)
-                account.last_health_check = datetime.now()
-                unhealthy_count += 1
+def close_sign_windows(db):
+    """
+    结束之前的签到窗口：移除其尚未执行的波次，已全部结束的窗口把已收集的汇总写入发件箱
+    （仍在执行的波次结束时照常写入）
+    """
+    for job in scheduler.get_jobs():
+        if job.id.startswith(SIGN_PREWARM_JOB_PREFIX):
+            job.remove()
+        elif job.id.startswith(SIGN_WAVE_JOB_PREFIX):
+            window = sign_windows.get(job.kwargs.get("window"))
+            job.remove()
+            if window is not None and window.finish(job.kwargs.get("wave", 0)):
+                sign_windows.pop(window.key, None)
+                if len(window.digest):
+                    window.digest.flush(db)
+                    db.commit()
+                    notify_dispatcher.wake()
+
+
+def resume_sign_window():
+    """
+    进程重启时恢复进行中的签到窗口：波次任务只在内存中，重启时若正处于今日的签到窗口内，
+    把尚未签到的账号重新排入窗口的剩余时间（今日已签到的账号不会重复签到）
+    """
+    db = SessionLocal()
 
-        db.commit()
-        logger.info(f"健康检查完成: 健康 {healthy_count}, 异常 {unhealthy_count}")
+    try:
+        window_minutes = get_setting_value(db, "sign_window_minutes", 0)
+        sign_time = get_setting_value(db, "auto_sign_time", "08:00")
+        if not get_setting_value(db, "auto_sign_enabled", False) or window_minutes <= 0 or not sign_time:
+            return
+    finally:
+        db.close()
 
-        # 如果有异常账号，发送通知（按账号配置的推送渠道发送）
-        unhealthy_accounts = db.query(Account).filter(
-            Account.is_active == True,
-            Account.health_status == "unhealthy"
-        ).all()
+    hour, minute = map(int, sign_time.split(":"))
+    now = datetime.now()
+    start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    end = start + timedelta(minutes=window_minutes)
+    if start <= now < end:
+        logger.info(f"签到窗口进行中（{sign_time} 开始），恢复尚未执行的签到")
+        dispatch_sign_waves(end=end)
 
-        for account in unhealthy_accounts:
-            send_health_alert_for_account(db, account)
+
+def get_sign_wave_schedule(db) -> list:
+    """
+    各波次的下次执行时间
+
+    签到窗口进行中时返回已排定的波次（含抖动）；否则按下次签到时间预估（不含抖动）
+    """
+    jobs = sorted(
+        (job for job in scheduler.get_jobs() if job.id.startswith(SIGN_WAVE_JOB_PREFIX) and job.next_run_time),
+        key=lambda job: job.next_run_time
+    )
+    if jobs:
+        return [
+            {"run_at": job.next_run_time.strftime("%Y-%m-%d %H:%M:%S"), "accounts": len(job.args[0]), "scheduled": True}
+            for job in jobs
+        ]
+
+    window_minutes = get_setting_value(db, "sign_window_minutes", 0)
+    job = scheduler.get_job("auto_sign")
+    if window_minutes <= 0 or not job or not job.next_run_time:
+        return []
+    waves = plan_sign_waves(active_account_ids(db), job.next_run_time, window_minutes, get_setting_value(db, "sign_wave_size", 20))
+    return [
+        {"run_at": run_at.strftime("%Y-%m-%d %H:%M:%S"), "accounts": len(wave), "scheduled": False}
+        for run_at, wave in waves
+    ]
+
+
+def sign_prewarm_lead(lead_minutes: int) -> int:
+    """预热提前量（分钟）：预热的 Cookies 需在签到时仍未过期，不超过 Cookie 缓存有效期"""
+    return max(1, min(lead_minutes, settings.cookie_cache_ttl // 60 - 1))
+
+
+def schedule_sign_prewarm(hour: int, minute: int, lead_minutes: int, window_minutes: int = 0):
+    """
+    在签到时间前 lead_minutes 分钟安排预热任务
+
+    设置了签到窗口时，该任务只预热窗口开始后 lead_minutes 分钟内执行的波次，
+    其余波次在分派时各自安排预热，在波次执行前 lead_minutes 分钟预热
+    """
+    max_lead = sign_prewarm_lead(lead_minutes)
+    if lead_minutes > max_lead:
+        logger.warning(f"预热提前量 {lead_minutes} 分钟超过 Cookie 缓存有效期，按 {max_lead} 分钟安排")
+    lead_minutes = max_lead
+
+    run_at = datetime(2000, 1, 1, hour, minute) - timedelta(minutes=lead_minutes)
+    scheduler.add_job(
+        sign_window_prewarm_job if window_minutes > 0 else sign_prewarm_job,
+        CronTrigger(hour=run_at.hour, minute=run_at.minute),
+        id="sign_prewarm",
+        replace_existing=True,
+        kwargs={"window_minutes": window_minutes, "lead_minutes": lead_minutes} if window_minutes > 0 else None
+    )
+    logger.info(f"签到预热任务已设置: 每天 {run_at.strftime('%H:%M')}（签到前 {lead_minutes} 分钟）")
+
+
+async def _prewarm_cookies(credentials: list) -> list:
+    """在独立的异步客户端中并发预热 Cookies"""
+    async with AsyncAnyRouterService() as service:
+        return await service.prewarm_cookies(credentials)
+
+
+@in_lane(LANE_BULK)
+def sign_prewarm_job(account_ids: Optional[list] = None):
+    """
+    签到前预热：并发获取并缓存各账号的反爬虫 Cookies，签到时每个账号只需一次签到请求
+
+    Args:
+        account_ids: 只预热这些账号（签到窗口的一个波次），为空时预热全部启用账号
+    """
+    logger.info("开始执行签到预热任务...")
+    db = SessionLocal()
+
+    try:
+        query = db.query(Account).filter(
+            Account.is_active == True,
+            Account.anyrouter_user_id.isnot(None)
+        )
+        if account_ids is not None:
+            query = query.filter(Account.id.in_(account_ids))
+        accounts = query.all()
+
+        started = datetime.now()
+        ready = asyncio.run(_prewarm_cookies(
+            [(account.session_cookie, str(account.anyrouter_user_id)) for account in accounts]
+        )) if accounts else []
+        ready_count = sum(ready)
+
+        last_prewarm.update({
+            "run_at": started.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_s": round((datetime.now() - started).total_seconds(), 2),
+            "total": len(accounts),
+            "ready": ready_count,
+            "failed": len(accounts) - ready_count
+        })
+        logger.info(f"签到预热完成: 就绪 {ready_count}/{len(accounts)}，耗时 {last_prewarm['duration_s']} 秒")
 
     except Exception as e:
-        logger.error(f"健康检查任务异常: {e}")
+        logger.error(f"签到预热任务异常: {e}")
     finally:
         db.close()
 
 
-def send_health_alert_for_account(db, account):
-    """发送单个账号的健康检查告警通知（按账号配置的推送渠道）"""
-    from app.models import AccountNotify
+def sign_window_prewarm_job(window_minutes: int, lead_minutes: int):
+    """签到窗口开始前的预热：只预热窗口开始后 lead_minutes 分钟内执行的波次（其余波次在执行前各自预热）"""
+    db = SessionLocal()
 
     try:
-        # 获取账号的推送配置
-        account_notifies = db.query(AccountNotify).filter(
-            AccountNotify.account_id == account.id,
-            AccountNotify.is_enabled == True
-        ).all()
+        start = datetime.now() + timedelta(minutes=lead_minutes)
+        waves = plan_sign_waves(
+            signed_today.unsigned(active_account_ids(db)), start, window_minutes,
+            get_setting_value(db, "sign_wave_size", 20)
+        )
+    finally:
+        db.close()
+
+    horizon = start + timedelta(minutes=lead_minutes)
+    account_ids = [account_id for run_at, wave in waves if run_at < horizon for account_id in wave]
+    if account_ids:
+        sign_prewarm_job(account_ids)
+
+
+async def _refresh_accounts(credentials: list, operations: tuple) -> list:
+    """在独立的异步客户端中并发执行组合刷新（调度线程拥有自己的事件循环）"""
+    async with AsyncAnyRouterService() as service:
+        return await service.refresh_accounts(credentials, operations)
+
+
+def select_health_check_accounts(db, interval_hours: int, batch_size: int) -> list:
+    """
+    选出本轮滚动健康检查的账号
 
-        if not account_notifies:
+    超过 interval_hours 未观察（健康检查、签到成功或信息刷新）的账号中，异常 / 未知状态优先，
+    其次是从未检查和最久未检查的。每轮数量至少为 batch_size，账号较多时按
+    “全部账号 × 轮询间隔 / 检查间隔”放大，保证每个账号在检查间隔内都能轮到
+    """
+    base = db.query(Account).filter(
+        Account.is_active == True,
+        Account.anyrouter_user_id.isnot(None)
+    )
+    interval_minutes = max(1, interval_hours) * 60
+    limit = max(batch_size, math.ceil(base.count() * settings.health_check_tick_minutes / interval_minutes))
+    cutoff = datetime.now() - timedelta(minutes=interval_minutes)
+    return base.filter(
+        or_(Account.last_health_check.is_(None), Account.last_health_check < cutoff)
+    ).order_by(
+        case((Account.health_status == "healthy", 1), else_=0),
+        Account.last_health_check.isnot(None),
+        Account.last_health_check
+    ).limit(limit).all()
+
+
+@in_lane(LANE_BULK)
+@record_job_run(JOB_HEALTH_CHECK)
+def health_check_job(full: bool = False):
+    """
+    滚动健康检查任务：每轮只并发检查一小批最久未观察的账号
+
+    Args:
+        full: 检查全部启用账号（不按观察时间筛选）
+    """
+    from app.api.accounts import sync_account_tokens, apply_account_health
+
+    db = SessionLocal()
+    run = current_job_run()
+
+    try:
+        # 检查是否启用健康检查
+        enabled = get_setting_value(db, "health_check_enabled", True)
+        if not enabled:
+            logger.info("健康检查未启用，跳过")
             return
 
-        # 获取渠道配置
-        channel_ids = [n.channel_id for n in account_notifies]
-        channels = db.query(NotifyChannel).filter(
-            NotifyChannel.id.in_(channel_ids),
-            NotifyChannel.is_enabled == True
-        ).all()
+        if full:
+            accounts = db.query(Account).filter(
+                Account.is_active == True,
+                Account.anyrouter_user_id.isnot(None)
+            ).all()
+        else:
+            accounts = select_health_check_accounts(
+                db,
+                get_setting_value(db, "health_check_interval", 6),
+                get_setting_value(db, "health_check_batch_size", 50)
+            )
 
-        if not channels:
+        if not accounts:
+            logger.debug("没有需要检查的账号")
             return
 
-        title = f"账号健康告警 - {account.username}"
-        content = f"账号 {account.username} 凭证异常: {account.health_message or '未知错误'}\n请及时更新 Session Cookie。"
+        if anyrouter_service.get_circuit_retry_after("user_info") > 0:
+            logger.warning("用户信息接口熔断中，跳过本轮健康检查")
+            return
 
-        # 构建账号配置映射
-        account_notify_map = {n.channel_id: n for n in account_notifies}
+        healthy_count = 0
+        unhealthy_count = 0
+        skipped_count = 0
+
+        # 并发获取账号的用户信息来验证凭证（按配置在同一会话中同步 Tokens）
+        operations = health_check_operations()
+        refreshed = asyncio.run(_refresh_accounts(
+            [(account.session_cookie, str(account.anyrouter_user_id)) for account in accounts],
+            operations
+        ))
+
+        unhealthy_accounts = []
+        for account, outcome in zip(accounts, refreshed):
+            success, user_info = outcome["user_info"]
+            if success and "tokens" in operations:
+                sync_account_tokens(db, account, pages=outcome["tokens"][1]["pages"])
+            if not success and user_info.get("error_type") == FAILURE_CIRCUIT_OPEN:
+                # 请求未发出，保留原有健康状态
+                skipped_count += 1
+                continue
+
+            apply_account_health(account, success, user_info, datetime.now())
+            if success:
+                healthy_count += 1
+            else:
+                unhealthy_count += 1
+                unhealthy_accounts.append(account)
+                logger.warning(f"账号 {account.username} 健康检查失败: {account.health_message}")
+
+        # 本轮检查异常的账号发送通知（按账号配置的推送渠道发送，汇总渠道每轮一条）
+        digest = NotifyDigest(KIND_HEALTH, "账号健康告警")
+        for account in unhealthy_accounts:
+            send_health_alert_for_account(db, account, digest=digest)
+        digest.flush(db)
+
+        db.commit()
+        notify_dispatcher.wake()
+        run.add(success=healthy_count, failed=unhealthy_count, skipped=skipped_count)
+        logger.info(
+            f"健康检查完成: 检查 {len(accounts)}，健康 {healthy_count}, 异常 {unhealthy_count}, 熔断跳过 {skipped_count}"
+        )
 
-        for channel in channels:
-            try:
-                config = json.loads(channel.config)
-                # 获取账号专属配置
-                account_notify = account_notify_map.get(channel.id)
-                account_config = json.loads(account_notify.notify_config) if account_notify and account_notify.notify_config else {}
-                # 合并配置：账号配置优先，渠道配置作为后备
-                merged_config = {**config, **account_config}
-
-                notifier = NotifyFactory.create(channel.type, config)
-                result = notifier.send(title, content, merged_config)
-                if result:
-                    logger.info(f"健康告警发送成功: {channel.name} -> {account.username}")
-                else:
-                    logger.error(f"健康告警发送失败: {channel.name} -> {account.username}")
-            except Exception as e:
-                logger.error(f"发送健康告警失败 {channel.name}: {e}")
     except Exception as e:
-        logger.error(f"发送健康告警异常: {e}")
+        run.error = str(e)
+        logger.error(f"健康检查任务异常: {e}")
+    finally:
+        db.close()
+
+
+def send_health_alert_for_account(db, account, digest: Optional[NotifyDigest] = None):
+    """将单个账号的健康检查告警写入发件箱（按账号配置的推送渠道，由后台投递；汇总渠道收集到 digest）"""
+    title = f"账号健康告警 - {account.username}"
+    content = f"账号 {account.username} 凭证异常: {account.health_message or '未知错误'}\n请及时更新 Session Cookie。"
+    item = DigestItem(account.username, False, account.health_message or "未知错误")
+    enqueue_account_notification(db, account, KIND_HEALTH, title, content, item=item, digest=digest)
 
 
 def update_health_check_schedule():
@@ -492,14 +962,19 @@ def update_health_check_schedule():
             scheduler.remove_job("health_check")
 
         if enabled:
-            # 添加定时任务（默认每 6 小时检查一次）
+            # 每隔几分钟检查一小批账号，每个账号在 interval_hours 内至少检查一次
             scheduler.add_job(
                 health_check_job,
-                IntervalTrigger(hours=interval_hours),
+                IntervalTrigger(minutes=max(1, settings.health_check_tick_minutes)),
                 id="health_check",
-                replace_existing=True
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True
+            )
+            logger.info(
+                f"健康检查任务已设置: 每 {settings.health_check_tick_minutes} 分钟滚动检查，"
+                f"每个账号每 {interval_hours} 小时至少一次"
             )
-            logger.info(f"健康检查任务已设置: 每 {interval_hours} 小时")
         else:
             logger.info("健康检查任务已禁用")
 
@@ -515,14 +990,23 @@ def init_scheduler():
         scheduler.start()
         logger.info("调度器已启动")
 
+    # 从签到日志重建今日已签到账号
+    signed_today.rebuild()
     # 初始化签到任务
     update_sign_schedule()
+    # 恢复进行中的签到窗口（波次任务只在内存中）
+    resume_sign_window()
+    # 初始化签到重试轮询
+    update_sign_retry_schedule()
+    # 启动通知投递
+    notify_dispatcher.start()
     # 初始化健康检查任务
     update_health_check_schedule()
 
 
 def shutdown_scheduler():
     """关闭调度器"""
+    notify_dispatcher.stop()
     if scheduler.running:
         scheduler.shutdown()
         logger.info("调度器已关闭")
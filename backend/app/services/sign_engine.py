@@ -0,0 +1,198 @@
+"""
+并行签到引擎
+
+按有界并发对多个账号执行签到（含同一会话中的额度刷新），结果按完成顺序逐个产出，
+由调用方在自己的线程中写入签到日志：
+- thread：线程池 + 同步客户端；async：独立事件循环 + 异步客户端
+- 上游请求在工作线程 / 事件循环中执行，不接触调用方的数据库会话
+- 单个账号内的操作顺序不变（先签到、后刷新），不同账号之间并发
+- 每提交一个账号前检查停止条件（如签到接口熔断），未提交的账号留给调用方顺延
+"""
+import re
+import time
+import queue
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.services.anyrouter import anyrouter_service, sign_operations
+from app.services.anyrouter_async import AsyncAnyRouterService
+
+logger = logging.getLogger(__name__)
+
+MODE_THREAD = "thread"
+MODE_ASYNC = "async"
+MODES = (MODE_THREAD, MODE_ASYNC)
+
+# 签到消息中的奖励金额（美元）
+REWARD_PATTERN = re.compile(r'\$(\d+(?:\.\d+)?)')
+
+
+def parse_sign_result(success: bool, result: Dict[str, Any]) -> Tuple[bool, bool, str, int]:
+    """
+    解析签到接口结果
+
+    Returns:
+        Tuple[bool, bool, str, int]: (是否成功, 是否今日已签到, 消息, 奖励额度)；
+        success=true 且 message 为空表示今日已签到
+    """
+    sign_success = success and result.get("success", False)
+    message = result.get("message", "")
+    reward_quota = 0
+    if sign_success and message:
+        match = REWARD_PATTERN.search(message)
+        if match:
+            reward_quota = int(float(match.group(1)) * settings.quota_to_usd_rate)
+    return sign_success, sign_success and not message, message, reward_quota
+
+
+@dataclass
+class SignTask:
+    """待签到的账号"""
+    account_id: int
+    session_cookie: str
+    user_id: str
+
+
+@dataclass
+class SignOutcome:
+    """单个账号的签到结果"""
+    account_id: int
+    results: Dict[str, Tuple[bool, Dict[str, Any]]] = field(default_factory=dict)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def sign_result(self) -> Tuple[bool, Dict[str, Any]]:
+        return self.results.get("sign_in", (False, {"message": self.error or ""}))
+
+
+class SignEngine:
+    """
+    有界并发的签到引擎
+
+    Args:
+        mode: thread / async
+        concurrency: 同时签到的账号数
+        operations: 每个账号执行的组合刷新操作，默认 sign_operations()
+
+    Example:
+        engine = SignEngine(MODE_THREAD, concurrency=8)
+        for outcome in engine.run(tasks, should_stop=circuit_open):
+            ...  # 写入签到日志
+        engine.unsubmitted  # 因停止条件未提交的账号 ID
+    """
+
+    def __init__(self, mode: str = MODE_THREAD, concurrency: int = 1, operations: Optional[Sequence[str]] = None):
+        if mode not in MODES:
+            logger.warning(f"未知的签到引擎模式 {mode}，使用 {MODE_THREAD}")
+            mode = MODE_THREAD
+        self.mode = mode
+        self.concurrency = max(1, int(concurrency))
+        self.operations = tuple(operations or sign_operations())
+        self.unsubmitted: List[int] = []
+
+    def run(self, tasks: List[SignTask], should_stop: Callable[[], bool] = lambda: False) -> Iterator[SignOutcome]:
+        """按完成顺序产出各账号的签到结果"""
+        self.unsubmitted = []
+        if not tasks:
+            return iter(())
+        if self.mode == MODE_ASYNC:
+            return self._run_async(tasks, should_stop)
+        return self._run_threads(tasks, should_stop)
+
+    def _take(self, pending: deque, should_stop: Callable[[], bool]) -> Optional[SignTask]:
+        """取出下一个账号；满足停止条件时剩余账号全部记为未提交"""
+        if not pending:
+            return None
+        if should_stop():
+            self.unsubmitted = [task.account_id for task in pending]
+            pending.clear()
+            return None
+        return pending.popleft()
+
+    # ---------- 线程池 ----------
+
+    def _sign(self, task: SignTask) -> SignOutcome:
+        started = time.monotonic()
+        try:
+            results = anyrouter_service.refresh_account(task.session_cookie, task.user_id, self.operations)
+            return SignOutcome(task.account_id, results, elapsed=time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"账号 {task.account_id} 签到异常: {e}")
+            return SignOutcome(task.account_id, error=str(e), elapsed=time.monotonic() - started)
+
+    def _run_threads(self, tasks: List[SignTask], should_stop: Callable[[], bool]) -> Iterator[SignOutcome]:
+        pending = deque(tasks)
+        running = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sign-worker") as executor:
+            while pending or running:
+                while len(running) < self.concurrency:
+                    task = self._take(pending, should_stop)
+                    if task is None:
+                        break
+                    # 工作线程沿用调用方的上下文（请求通道等）
+                    running.add(executor.submit(contextvars.copy_context().run, self._sign, task))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    # ---------- asyncio ----------
+
+    async def _sign_async(self, service: AsyncAnyRouterService, task: SignTask) -> SignOutcome:
+        started = time.monotonic()
+        try:
+            results = await service.refresh_account(task.session_cookie, task.user_id, self.operations)
+            return SignOutcome(task.account_id, results, elapsed=time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"账号 {task.account_id} 签到异常: {e}")
+            return SignOutcome(task.account_id, error=str(e), elapsed=time.monotonic() - started)
+
+    async def _produce(self, tasks: List[SignTask], should_stop: Callable[[], bool], out: "queue.Queue"):
+        pending = deque(tasks)
+        running = set()
+        async with AsyncAnyRouterService() as service:
+            while pending or running:
+                while len(running) < self.concurrency:
+                    task = self._take(pending, should_stop)
+                    if task is None:
+                        break
+                    running.add(asyncio.ensure_future(self._sign_async(service, task)))
+                if not running:
+                    break
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    out.put(finished.result())
+
+    def _run_async(self, tasks: List[SignTask], should_stop: Callable[[], bool]) -> Iterator[SignOutcome]:
+        # 事件循环在独立线程中运行，结果经队列交给调用方线程
+        out: "queue.Queue" = queue.Queue()
+        done = object()
+
+        def loop_main():
+            try:
+                asyncio.run(self._produce(tasks, should_stop, out))
+            except BaseException as e:
+                out.put(e)
+            finally:
+                out.put(done)
+
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(loop_main,), name="sign-loop", daemon=True)
+        thread.start()
+        while True:
+            item = out.get()
+            if item is done:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        thread.join()
@@ -0,0 +1,119 @@
+"""
+签到重试队列
+
+失败的签到按账号持久化到 sign_retries 表（到期时间、已重试次数、最近错误），
+由调度器中的单个轮询任务分批领取、并行重试：
+- 同一账号只保留一条记录，多次失败合并为一条
+- 重试间隔按指数退避（首次为系统设置中的重试间隔，上限 SIGN_RETRY_MAX_BACKOFF），并加随机抖动
+- 进程重启后队列仍在，启动时释放上次未完成的领取
+"""
+import random
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Account, SignRetry
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts: int, interval_minutes: int) -> timedelta:
+    """第 attempts 次重试之后的等待时间（指数退避加抖动）"""
+    minutes = min(max(1, interval_minutes) * 2 ** max(0, attempts), settings.sign_retry_max_backoff)
+    return timedelta(minutes=minutes * (1 + random.uniform(0, settings.sign_retry_jitter)))
+
+
+def enqueue_sign_retry(db: Session, account_id: int, error: str, interval_minutes: int) -> SignRetry:
+    """
+    将签到失败的账号加入重试队列（已在队列中时只更新错误信息，不推迟到期时间）
+
+    调用方负责提交事务
+    """
+    entry = db.query(SignRetry).filter(SignRetry.account_id == account_id).first()
+    if entry is None:
+        entry = SignRetry(
+            account_id=account_id,
+            attempts=0,
+            due_at=datetime.now() + retry_delay(0, interval_minutes)
+        )
+        db.add(entry)
+    entry.last_error = error
+    return entry
+
+
+def claim_due_retries(db: Session, limit: int) -> List[SignRetry]:
+    """领取已到期的重试（只有一个轮询任务，领取即独占）"""
+    entries = db.query(SignRetry).filter(
+        SignRetry.claimed_at.is_(None),
+        SignRetry.due_at <= datetime.now()
+    ).order_by(SignRetry.due_at).limit(limit).all()
+    now = datetime.now()
+    for entry in entries:
+        entry.claimed_at = now
+    db.commit()
+    return entries
+
+
+def reschedule_retry(entry: SignRetry, error: str, interval_minutes: int):
+    """重试失败：增加重试次数并按退避时间重新排队"""
+    entry.attempts += 1
+    entry.last_error = error
+    entry.due_at = datetime.now() + retry_delay(entry.attempts, interval_minutes)
+    entry.claimed_at = None
+
+
+def release_retry(entry: SignRetry):
+    """放回队列，不计重试次数（如签到接口熔断时未执行）"""
+    entry.claimed_at = None
+
+
+def recover_sign_retries(db: Session) -> int:
+    """
+    启动时恢复重试队列：释放上次进程未完成的领取，移除已删除或禁用账号的记录
+
+    Returns:
+        int: 队列中等待重试的账号数
+    """
+    released = db.query(SignRetry).filter(SignRetry.claimed_at.isnot(None)).update(
+        {SignRetry.claimed_at: None}, synchronize_session=False
+    )
+    active_ids = db.query(Account.id).filter(Account.is_active == True)
+    removed = db.query(SignRetry).filter(~SignRetry.account_id.in_(active_ids)).delete(synchronize_session=False)
+    db.commit()
+
+    pending = db.query(SignRetry).count()
+    if released or removed or pending:
+        logger.info(f"签到重试队列已恢复: 等待 {pending}，释放未完成领取 {released}，移除失效账号 {removed}")
+    return pending
+
+
+def flush_sign_retries(db: Session, account_id: Optional[int] = None) -> int:
+    """将等待中的重试（或指定账号的重试）提前到现在执行"""
+    query = db.query(SignRetry).filter(SignRetry.claimed_at.is_(None))
+    if account_id is not None:
+        query = query.filter(SignRetry.account_id == account_id)
+    count = query.update({SignRetry.due_at: datetime.now()}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def get_retry_queue(db: Session) -> List[Dict]:
+    """重试队列内容（按到期时间排序）"""
+    rows = db.query(SignRetry, Account.username).join(
+        Account, Account.id == SignRetry.account_id
+    ).order_by(SignRetry.due_at).all()
+    return [
+        {
+            "account_id": entry.account_id,
+            "username": username,
+            "attempts": entry.attempts,
+            "due_at": entry.due_at,
+            "last_error": entry.last_error,
+            "claimed": entry.claimed_at is not None,
+            "created_at": entry.created_at,
+        }
+        for entry, username in rows
+    ]
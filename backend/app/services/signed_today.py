@@ -0,0 +1,87 @@
+"""
+今日已签到账号集合
+
+自动签到、批量签到与单账号签到在请求上游前先查询本集合，今日已有成功（含已签到）
+签到日志的账号直接跳过，不再产生预请求、反爬虫挑战与签到请求：
+- 进程启动时从签到日志重建（sign_logs 的 (account_id, sign_time) 索引）
+- 日期变化后首次查询时自动按新的一天重建
+- 签到成功时由各签到入口登记；各入口的 force 参数可绕过本集合
+"""
+import logging
+import threading
+from datetime import date, datetime, time
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import SignLog
+
+logger = logging.getLogger(__name__)
+
+
+class SignedTodayIndex:
+    """今日已签到的账号 ID 集合（按本地日期划分）"""
+
+    def __init__(self):
+        self._day: Optional[date] = None
+        self._ids: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Optional[Session] = None):
+        """从今日的签到日志重建集合"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            today = date.today()
+            rows = db.query(SignLog.account_id).filter(
+                SignLog.sign_time >= datetime.combine(today, time.min),
+                SignLog.success == True
+            ).distinct().all()
+            with self._lock:
+                self._day = today
+                self._ids = {account_id for (account_id,) in rows}
+            logger.info(f"今日已签到账号: {len(rows)} 个")
+        finally:
+            if own_session:
+                db.close()
+
+    def _ensure_today(self):
+        if self._day != date.today():
+            self.rebuild()
+
+    def contains(self, account_id: int) -> bool:
+        self._ensure_today()
+        with self._lock:
+            return account_id in self._ids
+
+    def unsigned(self, account_ids: Iterable[int]) -> List[int]:
+        """过滤出今日尚未签到的账号 ID（保持原顺序）"""
+        self._ensure_today()
+        with self._lock:
+            return [account_id for account_id in account_ids if account_id not in self._ids]
+
+    def mark(self, account_id: int):
+        """登记今日已签到（签到成功或上游返回今日已签到）"""
+        self._ensure_today()
+        with self._lock:
+            self._ids.add(account_id)
+
+    def mark_all(self, account_ids: Iterable[int]):
+        """批量登记今日已签到（在签到日志提交后调用）"""
+        self._ensure_today()
+        with self._lock:
+            self._ids.update(account_ids)
+
+    def discard(self, account_id: int):
+        with self._lock:
+            self._ids.discard(account_id)
+
+    def __len__(self) -> int:
+        self._ensure_today()
+        with self._lock:
+            return len(self._ids)
+
+
+# 单例
+signed_today = SignedTodayIndex()
@@ -0,0 +1,107 @@
+"""
+上游近静态数据缓存
+
+模型列表、分组列表与 /api/status 变化很少，且同一用户组的账号看到的内容相同。
+此处在 AnyRouterService 前加一层缓存：按用户组共享条目，过期后先返回旧值并在后台刷新，
+并提供按类型、按用户组的显式失效。
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+from app.services.anyrouter import AnyRouterService, anyrouter_service
+from app.services.cache import RefreshingCache
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamDataCache:
+    """模型、分组与 API 状态缓存"""
+
+    KINDS = ("models", "groups", "api_status")
+
+    def __init__(self, service: Optional[AnyRouterService] = None):
+        self.service = service or anyrouter_service
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upstream-refresh")
+        stale_ttl = settings.upstream_cache_stale_ttl
+        size = settings.upstream_cache_size
+        self.caches: Dict[str, RefreshingCache] = {
+            "models": RefreshingCache(settings.models_cache_ttl, stale_ttl, size, executor),
+            "groups": RefreshingCache(settings.groups_cache_ttl, stale_ttl, size, executor),
+            "api_status": RefreshingCache(settings.status_cache_ttl, stale_ttl, 1, executor),
+        }
+
+    @staticmethod
+    def _account_key(user_id: str, user_group: Optional[str]) -> Hashable:
+        """同一用户组的账号共享条目；用户组未知时按账号单独缓存"""
+        if user_group:
+            return ("group", user_group)
+        return ("user", str(user_id))
+
+    def get_models(
+        self,
+        session_cookie: str,
+        user_id: str,
+        user_group: Optional[str] = None,
+        force_refresh: bool = False
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """获取可用模型列表（返回值同 AnyRouterService.get_models）"""
+        return self.caches["models"].get_or_load(
+            self._account_key(user_id, user_group),
+            lambda: self.service.get_models(session_cookie, user_id),
+            force=force_refresh
+        )
+
+    def get_groups(
+        self,
+        session_cookie: str,
+        user_id: str,
+        user_group: Optional[str] = None,
+        force_refresh: bool = False
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """获取账号分组列表（返回值同 AnyRouterService.get_groups）"""
+        return self.caches["groups"].get_or_load(
+            self._account_key(user_id, user_group),
+            lambda: self.service.get_groups(session_cookie, user_id),
+            force=force_refresh
+        )
+
+    def get_api_status(self, force_refresh: bool = False) -> Tuple[bool, Dict[str, Any]]:
+        """获取 API 节点状态（返回值同 AnyRouterService.get_api_status）"""
+        return self.caches["api_status"].get_or_load(
+            "api_status",
+            self.service.get_api_status,
+            force=force_refresh
+        )
+
+    def invalidate(self, kind: Optional[str] = None, user_group: Optional[str] = None) -> int:
+        """
+        使缓存失效
+
+        Args:
+            kind: models / groups / api_status，为空时作用于全部类型
+            user_group: 只失效该用户组的条目（对 api_status 无效）
+
+        Returns:
+            int: 失效的条目数
+        """
+        kinds = [kind] if kind else list(self.KINDS)
+        count = 0
+        for name in kinds:
+            cache = self.caches[name]
+            if user_group and name != "api_status":
+                count += int(cache.invalidate(("group", user_group)))
+            elif not user_group:
+                count += len(cache)
+                cache.clear()
+        logger.info(f"上游数据缓存已失效: kind={kind or 'all'}, user_group={user_group or 'all'}, 条目数={count}")
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各类缓存统计"""
+        return {name: cache.get_stats() for name, cache in self.caches.items()}
+
+
+# 单例
+upstream_cache = UpstreamDataCache()
@@ -0,0 +1,174 @@
+"""
+上游请求策略
+
+为每个 AnyRouter 接口声明请求方式、幂等性、重试次数、退避、超时与反爬虫处理方式，
+并提供进程级的重试预算，避免重试在多层之间叠加放大。
+"""
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class RequestPolicy:
+    """
+    单个接口的请求策略
+
+    Attributes:
+        name: 接口名称（用于日志与统计）
+        method: HTTP 方法
+        path_setting: settings 中保存接口路径的字段名
+        idempotent: 是否幂等；非幂等请求只在确认未被处理时（连接失败、挑战页）重发
+        max_attempts: 最大尝试次数（含首次），反爬虫挑战求解后的重发不计入
+        backoff: 重试退避基数（秒），第 n 次重试等待 backoff * 2^(n-1)
+        timeout: 请求超时（秒），None 表示使用 settings.request_timeout
+        handle_challenge: 是否自动求解反爬虫挑战
+        authenticated: 是否需要账号凭证（决定是否做控制台预请求）
+        retry_on_empty: 空响应是否视为可重试
+        hedge: 是否允许对冲请求（仅用于幂等读接口，需开启 settings.hedged_reads_enabled）
+    """
+    name: str
+    method: str
+    path_setting: str
+    idempotent: bool = True
+    max_attempts: int = 2
+    backoff: float = 1.0
+    timeout: Optional[float] = None
+    handle_challenge: bool = True
+    authenticated: bool = True
+    retry_on_empty: bool = False
+    hedge: bool = False
+
+    @property
+    def path(self) -> str:
+        return getattr(settings, self.path_setting)
+
+    def get_timeout(self) -> float:
+        return self.timeout if self.timeout is not None else settings.request_timeout
+
+    def backoff_delay(self, retry_number: int) -> float:
+        """第 retry_number 次重试前的等待时间"""
+        return self.backoff * (2 ** (retry_number - 1))
+
+
+def build_policies() -> Dict[str, RequestPolicy]:
+    """构建各接口的请求策略"""
+    return {
+        "console": RequestPolicy(
+            name="console", method="GET", path_setting="anyrouter_console_url",
+            max_attempts=1, timeout=10
+        ),
+        "user_info": RequestPolicy(
+            name="user_info", method="GET", path_setting="anyrouter_user_api",
+            hedge=True
+        ),
+        "sign_in": RequestPolicy(
+            # 重复签到会返回“已签到”，按幂等处理
+            name="sign_in", method="POST", path_setting="anyrouter_sign_api",
+            max_attempts=settings.retry_times, backoff=settings.retry_interval,
+            retry_on_empty=True
+        ),
+        "tokens": RequestPolicy(
+            name="tokens", method="GET", path_setting="anyrouter_token_api",
+            hedge=True
+        ),
+        "models": RequestPolicy(
+            name="models", method="GET", path_setting="anyrouter_models_api",
+            hedge=True
+        ),
+        "groups": RequestPolicy(
+            name="groups", method="GET", path_setting="anyrouter_groups_api"
+        ),
+        "token_create": RequestPolicy(
+            name="token_create", method="POST", path_setting="anyrouter_token_api",
+            idempotent=False, max_attempts=2
+        ),
+        "token_update": RequestPolicy(
+            name="token_update", method="PUT", path_setting="anyrouter_token_api"
+        ),
+        "token_delete": RequestPolicy(
+            name="token_delete", method="DELETE", path_setting="anyrouter_token_api"
+        ),
+        "api_status": RequestPolicy(
+            name="api_status", method="GET", path_setting="anyrouter_status_api",
+            authenticated=False
+        ),
+    }
+
+
+class RetryBudget:
+    """
+    进程级重试预算
+
+    在滑动窗口内，重试次数不得超过 max(min_retries, ratio * 请求次数)。
+    上游整体异常时重试很快耗尽预算，避免每个账号各自把请求量放大数倍。
+
+    Args:
+        ratio: 允许的重试占首次请求的比例
+        min_retries: 窗口内至少允许的重试次数（低流量时不至于完全无法重试）
+        window: 滑动窗口长度（秒）
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 60.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        while self._requests and self._requests[0] < cutoff:
+            self._requests.popleft()
+        while self._retries and self._retries[0] < cutoff:
+            self._retries.popleft()
+
+    def record_request(self):
+        """记录一次首次请求"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_acquire_retry(self) -> bool:
+        """申请一次重试，预算不足时返回 False"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            allowed = max(self.min_retries, int(len(self._requests) * self.ratio))
+            if len(self._retries) >= allowed:
+                self.rejected += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "window": self.window,
+                "ratio": self.ratio,
+                "requests": len(self._requests),
+                "retries": len(self._retries),
+                "rejected": self.rejected,
+            }
+
+
+retry_budget = RetryBudget(
+    ratio=settings.retry_budget_ratio,
+    min_retries=settings.retry_budget_min,
+    window=settings.retry_budget_window
+)
+
+# 对冲请求同样受预算限制，避免整体请求量明显上升
+hedge_budget = RetryBudget(
+    ratio=settings.hedge_budget_ratio,
+    min_retries=settings.hedge_budget_min,
+    window=settings.retry_budget_window
+)
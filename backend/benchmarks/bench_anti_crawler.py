@@ -0,0 +1,128 @@
+"""
+反爬虫挑战求解基准
+
+对比旧版（逐字符嵌套查找 + 字符串拼接）与当前 AntiCrawlerSolver 的求解耗时，
+并在大批量随机输入上校验两者结果一致。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_anti_crawler [--count 20000] [--repeat 3]
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import settings  # noqa: E402
+from app.services.anyrouter import AntiCrawlerSolver  # noqa: E402
+
+
+class LegacyAntiCrawlerSolver:
+    """旧版求解器（仅用于对比与一致性校验）"""
+
+    def __init__(self, mask=None, pos_list=None):
+        self.mask = settings.anti_crawler_mask if mask is None else mask
+        self.pos_list = settings.anti_crawler_pos_list if pos_list is None else pos_list
+
+    def solve(self, html_content: str):
+        try:
+            arg1_match = re.search(r"var arg1='([^']+)'", html_content)
+            if not arg1_match:
+                return None
+            arg1 = arg1_match.group(1)
+            return self._xor_decrypt(self._reorder_string(arg1))
+        except Exception:
+            return None
+
+    def _reorder_string(self, input_str: str) -> str:
+        output_list = [''] * len(self.pos_list)
+        for i, char in enumerate(input_str):
+            for j, pos in enumerate(self.pos_list):
+                if pos == i + 1:
+                    output_list[j] = char
+                    break
+        return ''.join(output_list)
+
+    def _xor_decrypt(self, input_str: str) -> str:
+        result = ''
+        mask = self.mask
+        for i in range(0, min(len(input_str), len(mask)), 2):
+            if i + 1 < len(input_str) and i + 1 < len(mask):
+                str_char = int(input_str[i:i + 2], 16)
+                mask_char = int(mask[i:i + 2], 16)
+                xor_char = hex(str_char ^ mask_char)[2:].zfill(2)
+                result += xor_char
+        return result
+
+
+def make_challenge(arg1: str) -> str:
+    """构造与线上结构一致的挑战页"""
+    return (
+        "<html><script>var arg1='" + arg1 + "';"
+        "document.cookie='acw_sc__v2='+x;location.reload();</script></html>"
+    )
+
+
+def random_hex(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice("0123456789abcdefABCDEF") for _ in range(length))
+
+
+def check_equivalence(rng: random.Random, count: int) -> int:
+    """随机长度（含奇数、短于/长于位置表）的输入上逐一比对结果"""
+    legacy = LegacyAntiCrawlerSolver()
+    solver = AntiCrawlerSolver(cache_size=0)
+    for _ in range(count):
+        arg1 = random_hex(rng, rng.randint(1, 64))
+        html = make_challenge(arg1)
+        expected = legacy.solve(html)
+        actual = solver.solve(html)
+        if expected != actual:
+            raise AssertionError(f"结果不一致: arg1={arg1!r} legacy={expected!r} new={actual!r}")
+    # 非挑战页
+    assert legacy.solve("<html></html>") is None and solver.solve("<html></html>") is None
+    return count
+
+
+def bench(label: str, solver, pages, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            solver.solve(html)
+        best = min(best, time.perf_counter() - start)
+    per_call_us = best / len(pages) * 1e6
+    print(f"{label:<32} {best * 1000:>10.2f} ms  {per_call_us:>8.2f} us/次")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="反爬虫挑战求解基准")
+    parser.add_argument("--count", type=int, default=20000, help="挑战页数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最优）")
+    parser.add_argument("--seed", type=int, default=20240101)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checked = check_equivalence(rng, min(args.count, 5000))
+    print(f"一致性校验通过: {checked} 个随机输入")
+
+    arg_len = len(settings.anti_crawler_pos_list)
+    unique_pages = [make_challenge(random_hex(rng, arg_len).lower()) for _ in range(args.count)]
+    # 突发场景：少量 arg1 被大量重复下发
+    hot = unique_pages[:16]
+    burst_pages = [rng.choice(hot) for _ in range(args.count)]
+
+    print(f"\n{args.count} 个挑战页，取 {args.repeat} 次最优")
+    legacy_time = bench("旧版 / 互不相同", LegacyAntiCrawlerSolver(), unique_pages, args.repeat)
+    new_time = bench("新版(无缓存) / 互不相同", AntiCrawlerSolver(cache_size=0), unique_pages, args.repeat)
+    burst_legacy = bench("旧版 / 突发重复", LegacyAntiCrawlerSolver(), burst_pages, args.repeat)
+    burst_new = bench("新版(LRU) / 突发重复", AntiCrawlerSolver(), burst_pages, args.repeat)
+
+    print(f"\n加速比: 互不相同 {legacy_time / new_time:.1f}x, 突发重复 {burst_legacy / burst_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
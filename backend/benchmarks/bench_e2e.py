@@ -0,0 +1,259 @@
+"""
+端到端吞吐基准
+
+启动本地模拟服务（benchmarks.mock_anyrouter），在临时 SQLite 数据库中生成合成账号，
+依次驱动 auto_sign_job、health_check_job、/sign/batch 与 Token 同步，
+报告耗时、吞吐、单账号 p50 / p95 / p99 以及上游请求数。
+auto_sign 按 --sign-concurrency 中的每个并发数各跑一次（进程级限流会限制高并发下的加速比，
+测量签到引擎本身时可设置 UPSTREAM_RATE_LIMIT=0 UPSTREAM_MAX_IN_FLIGHT=0）。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_e2e [--accounts 10,100,1000]
+                                   [--scenarios auto_sign,health_check,batch_sign,token_sync]
+                                   [--sign-concurrency 1,8,32] [--sign-engine thread|async]
+                                   [--latency lognormal:0.05,0.5] [--error-rate 0.01] [--challenge-rate 0.05]
+                                   [--json results.json]
+"""
+import os
+import sys
+import json
+import math
+import time
+import socket
+import argparse
+import tempfile
+import functools
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SCENARIOS = ("auto_sign", "health_check", "batch_sign", "token_sync")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class LatencyRecorder:
+    """记录每个账号一次上游操作（含预请求、挑战、重试）的耗时"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+
+    def wrap(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - started)
+        return wrapper
+
+    def wrap_async(self, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples.append(time.perf_counter() - started)
+        return wrapper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端吞吐基准")
+    parser.add_argument("--accounts", default="10,100,1000", help="账号规模，逗号分隔")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="场景，逗号分隔")
+    parser.add_argument("--sync-workers", type=int, default=1, help="Token 同步的并发账号数")
+    parser.add_argument("--sign-concurrency", default="4", help="auto_sign 的并发账号数，逗号分隔")
+    parser.add_argument("--sign-engine", choices=("thread", "async"), default="thread", help="auto_sign 的签到引擎")
+    parser.add_argument("--warm", action="store_true", help="保留各场景之间的 Cookie 缓存（默认每个场景冷启动）")
+    parser.add_argument("--json", dest="json_path", default=None, help="将结果写入 JSON 文件")
+
+    from benchmarks.mock_anyrouter import add_config_arguments  # noqa: E402
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    # 应用在导入时读取配置，必须先指定上游地址与数据库
+    port = _free_port()
+    workdir = tempfile.mkdtemp(prefix="anyrouter-bench-")
+    os.environ["ANYROUTER_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+
+    from benchmarks.mock_anyrouter import MockAnyRouter, config_from_args  # noqa: E402
+    from app.database import Base, SessionLocal, engine, init_db  # noqa: E402
+    from app.models import Account, ApiToken, Setting, SignLog  # noqa: E402
+    from app.services.anyrouter import AnyRouterService, anyrouter_service  # noqa: E402
+    from app.services.anyrouter_async import AsyncAnyRouterService  # noqa: E402
+    from app.services.cache import cookie_cache  # noqa: E402
+    from app.services.signed_today import signed_today  # noqa: E402
+    from app.services import scheduler  # noqa: E402
+    from app.api.sign import batch_sign  # noqa: E402
+    from app.api.accounts import sync_account_tokens  # noqa: E402
+
+    def prepare(count: int, concurrency: int):
+        """重建数据库并生成 count 个合成账号"""
+        Base.metadata.drop_all(bind=engine)
+        init_db()
+        db = SessionLocal()
+        try:
+            for key, value in (
+                ("auto_sign_enabled", True), ("sign_retry_enabled", False), ("health_check_enabled", True),
+                ("sign_engine_mode", args.sign_engine), ("sign_concurrency", concurrency)
+            ):
+                db.add(Setting(key=key, value=json.dumps(value)))
+            db.add_all(
+                Account(session_cookie=f"session-{i}", anyrouter_user_id=i, username=f"user{i}", is_active=True)
+                for i in range(1, count + 1)
+            )
+            db.commit()
+        finally:
+            db.close()
+        signed_today.rebuild()
+
+    def run_token_sync(sync_fn: Callable = sync_account_tokens):
+        from concurrent.futures import ThreadPoolExecutor
+
+        def sync(account_id: int):
+            db = SessionLocal()
+            try:
+                account = db.query(Account).filter(Account.id == account_id).first()
+                sync_fn(db, account)
+            finally:
+                db.close()
+
+        db = SessionLocal()
+        try:
+            ids = [account.id for account in db.query(Account.id).all()]
+        finally:
+            db.close()
+        with ThreadPoolExecutor(max_workers=max(1, args.sync_workers)) as executor:
+            list(executor.map(sync, ids))
+
+    def run_batch_sign():
+        db = SessionLocal()
+        try:
+            batch_sign(db=db)
+        finally:
+            db.close()
+
+    runners: Dict[str, Callable[[], Any]] = {
+        "auto_sign": scheduler.auto_sign_job,
+        "health_check": functools.partial(scheduler.health_check_job, full=True),
+        "batch_sign": run_batch_sign,
+        "token_sync": run_token_sync,
+    }
+    # 单账号耗时统计点
+    instrumented = {
+        "auto_sign": (
+            (AsyncAnyRouterService, "refresh_account", True) if args.sign_engine == "async"
+            else (AnyRouterService, "sign_in", False)
+        ),
+        "batch_sign": (AnyRouterService, "sign_in", False),
+        "health_check": (AsyncAnyRouterService, "get_user_info", True),
+        "token_sync": (None, "sync_account_tokens", False),
+    }
+
+    sizes = [int(v) for v in args.accounts.split(",") if v]
+    concurrencies = [int(v) for v in args.sign_concurrency.split(",") if v]
+    scenarios = [v for v in args.scenarios.split(",") if v]
+    for name in scenarios:
+        if name not in runners:
+            parser.error(f"未知场景: {name}")
+
+    mock = MockAnyRouter(config_from_args(args), port=port).start()
+    anyrouter_service.base_url = mock.url
+    results = []
+    print(f"模拟服务 {mock.url}，延迟 {args.latency}，错误率 {args.error_rate}，挑战率 {args.challenge_rate}\n")
+    header = f"{'场景':<14}{'账号':>6}{'并发':>6}{'耗时(s)':>10}{'账号/秒':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'上游请求':>10}{'请求/账号':>10}{'挑战':>7}"
+    print(header)
+    print("-" * len(header))
+
+    try:
+        runs = [
+            (count, name, concurrency)
+            for count in sizes
+            for name in scenarios
+            # 并发数只影响 auto_sign
+            for concurrency in (concurrencies if name == "auto_sign" else concurrencies[:1])
+        ]
+        for count, name, concurrency in runs:
+            prepare(count, concurrency)
+            if not args.warm:
+                cookie_cache.clear()
+            mock.reset()
+
+            recorder = LatencyRecorder()
+            owner, attr, is_async = instrumented[name]
+            if owner is None:
+                run = functools.partial(run_token_sync, recorder.wrap(sync_account_tokens))
+            else:
+                original = getattr(owner, attr)
+                setattr(owner, attr, recorder.wrap_async(original) if is_async else recorder.wrap(original))
+                run = runners[name]
+
+            started = time.perf_counter()
+            try:
+                run()
+            finally:
+                elapsed = time.perf_counter() - started
+                if owner is not None:
+                    setattr(owner, attr, original)
+
+            stats = mock.stats()
+            db = SessionLocal()
+            try:
+                sign_logs = db.query(SignLog).count()
+                tokens = db.query(ApiToken).count()
+            finally:
+                db.close()
+
+            row = {
+                "scenario": name,
+                "accounts": count,
+                "concurrency": concurrency if name == "auto_sign" else None,
+                "elapsed_s": round(elapsed, 3),
+                "accounts_per_s": round(count / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(recorder.samples, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(recorder.samples, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(recorder.samples, 0.99) * 1000, 1),
+                "upstream_requests": stats["total"],
+                "requests_per_account": round(stats["total"] / count, 2) if count else 0.0,
+                "upstream_by_route": stats["requests"],
+                "challenges": stats["challenges"],
+                "upstream_errors": stats["errors"],
+                "sign_logs": sign_logs,
+                "tokens": tokens,
+            }
+            results.append(row)
+            print(
+                f"{name:<14}{count:>6}{concurrency if name == 'auto_sign' else '-':>6}{row['elapsed_s']:>10.2f}{row['accounts_per_s']:>10.1f}"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+                f"{row['upstream_requests']:>10}{row['requests_per_account']:>10.2f}{row['challenges']:>7}"
+            )
+    finally:
+        mock.stop()
+
+    print("\n各场景上游请求分布:")
+    for row in results:
+        routes = ", ".join(f"{route}={n}" for route, n in sorted(row["upstream_by_route"].items()))
+        print(f"  {row['scenario']}@{row['accounts']}: {routes}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n结果已写入 {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
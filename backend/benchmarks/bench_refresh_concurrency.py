@@ -0,0 +1,113 @@
+"""
+组合刷新并发回归检查
+
+以连接池大小的数倍并发调用 refresh_account（默认 user_info + tokens，每个账号多页 Token），
+检查在 Session 池被占满时所有调用都能在期限内完成，不出现互相等待 Session 的死锁。
+Token 分页与对冲请求会在组合刷新中并发借出 Session，是最容易出问题的路径；
+--hedge 开启对冲请求（先预热延迟样本）。
+
+任一并发档位未在期限内全部完成，或出现等待 Session 超时，退出码为 1。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_refresh_concurrency [--threads 8,16,32] [--tokens-per-account 300]
+                                                   [--operations user_info,tokens] [--hedge] [--deadline 60]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="组合刷新并发回归检查")
+    parser.add_argument("--threads", default=None, help="并发调用数，逗号分隔（默认池大小的 1、2、4 倍）")
+    parser.add_argument("--operations", default="user_info,tokens", help="组合刷新的操作，逗号分隔")
+    parser.add_argument("--hedge", action="store_true", help="开启对冲请求")
+    parser.add_argument("--deadline", type=float, default=60.0, help="每档并发的完成期限（秒）")
+
+    from benchmarks.mock_anyrouter import add_config_arguments  # noqa: E402
+    add_config_arguments(parser)
+    parser.set_defaults(latency="fixed:0.01", tokens_per_account=300)
+    args = parser.parse_args()
+
+    # 应用在导入时读取配置，必须先指定上游地址
+    port = _free_port()
+    os.environ["ANYROUTER_BASE_URL"] = f"http://127.0.0.1:{port}"
+    if args.hedge:
+        os.environ["HEDGED_READS_ENABLED"] = "true"
+        os.environ.setdefault("LATENCY_MIN_SAMPLES", "5")
+
+    from benchmarks.mock_anyrouter import MockAnyRouter, config_from_args  # noqa: E402
+    from app.config import settings  # noqa: E402
+    from app.services.anyrouter import anyrouter_service  # noqa: E402
+    from app.services.cache import cookie_cache  # noqa: E402
+    from app.services.egress import DEFAULT_EGRESS  # noqa: E402
+
+    pool = anyrouter_service.egresses.get(DEFAULT_EGRESS).pool
+    threads = [int(v) for v in args.threads.split(",") if v] if args.threads else [pool.size, pool.size * 2, pool.size * 4]
+    operations = tuple(v for v in args.operations.split(",") if v)
+
+    mock = MockAnyRouter(config_from_args(args), port=port).start()
+    anyrouter_service.base_url = mock.url
+    print(
+        f"模拟服务 {mock.url}，池大小 {pool.size}，每账号 Token {args.tokens_per_account}，"
+        f"分页并发 {settings.token_fetch_concurrency}，对冲 {'开' if args.hedge else '关'}\n"
+    )
+    header = f"{'并发':>6}{'完成':>8}{'耗时(s)':>10}{'等待超时':>10}"
+    print(header)
+    print("-" * len(header))
+
+    failed = False
+    try:
+        if args.hedge:
+            # 先积累延迟样本，使对冲请求生效
+            for i in range(settings.latency_min_samples):
+                anyrouter_service.refresh_account(f"warm-{i}", str(900000 + i), ("user_info",))
+
+        for count in threads:
+            cookie_cache.clear()
+            mock.reset()
+            timeouts_before = pool.stats.snapshot()["acquire_timeouts"]
+            done = []
+            lock = threading.Lock()
+
+            def refresh(index: int):
+                anyrouter_service.refresh_account(f"session-{index}", str(count * 1000 + index), operations)
+                with lock:
+                    done.append(index)
+
+            workers = [threading.Thread(target=refresh, args=(i,), daemon=True) for i in range(count)]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            deadline = started + args.deadline
+            for worker in workers:
+                worker.join(timeout=max(0.0, deadline - time.perf_counter()))
+            elapsed = time.perf_counter() - started
+
+            timeouts = pool.stats.snapshot()["acquire_timeouts"] - timeouts_before
+            ok = len(done) == count and timeouts == 0
+            failed = failed or not ok
+            print(f"{count:>6}{f'{len(done)}/{count}':>8}{elapsed:>10.2f}{timeouts:>10}{'' if ok else '  失败'}")
+    finally:
+        mock.stop()
+
+    if failed:
+        print("\n存在未在期限内完成或等待 Session 超时的调用")
+        sys.exit(1)
+    print("\n全部完成")
+
+
+if __name__ == "__main__":
+    main()
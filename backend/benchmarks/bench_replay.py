@@ -0,0 +1,98 @@
+"""
+cassette 回放基准
+
+用录制的 cassette（UPSTREAM_CASSETTE_MODE=record 时生成）离线重放签到 / 健康检查任务，
+对比录制时与当前版本的上游请求数和总耗时，用于发现多余的往返、等待与重复预请求。
+
+录制（在生产或测试环境中）:
+    UPSTREAM_CASSETTE_MODE=record UPSTREAM_CASSETTE_PATH=./data/sign.cassette.jsonl.gz  # 然后照常运行签到任务
+
+回放（在 backend 目录下）:
+    python -m benchmarks.bench_replay ./data/sign.cassette.jsonl.gz [--job auto_sign] [--time-scale 1.0]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import functools
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+JOBS = ("auto_sign", "health_check", "batch_sign")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cassette 回放基准")
+    parser.add_argument("cassette", help="cassette 文件路径")
+    parser.add_argument("--job", choices=JOBS, default="auto_sign", help="回放时执行的任务")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="录制耗时的倍数，0 表示不等待")
+    args = parser.parse_args()
+
+    # 应用在导入时读取配置，必须先切换到回放模式并使用临时数据库
+    workdir = tempfile.mkdtemp(prefix="anyrouter-replay-")
+    os.environ["UPSTREAM_CASSETTE_MODE"] = "replay"
+    os.environ["UPSTREAM_CASSETTE_PATH"] = str(Path(args.cassette).resolve())
+    os.environ["UPSTREAM_CASSETTE_TIME_SCALE"] = str(args.time_scale)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/replay.db"
+
+    from app.database import SessionLocal, init_db  # noqa: E402
+    from app.models import Account, Setting  # noqa: E402
+    from app.services.cassette import cassette  # noqa: E402
+    from app.services import scheduler  # noqa: E402
+    from app.api.sign import batch_sign  # noqa: E402
+
+    recorded = cassette.summary()
+    user_ids = sorted({int(e["u"]) for e in cassette.exchanges if e.get("u")})
+    if not user_ids:
+        parser.error("cassette 中没有带账号的交互")
+
+    init_db()
+    db = SessionLocal()
+    try:
+        for key, value in (("auto_sign_enabled", True), ("sign_retry_enabled", False), ("health_check_enabled", True)):
+            db.add(Setting(key=key, value=json.dumps(value)))
+        db.add_all(
+            Account(session_cookie=f"replay-{uid}", anyrouter_user_id=uid, username=f"user{uid}", is_active=True)
+            for uid in user_ids
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    def run_batch_sign():
+        session = SessionLocal()
+        try:
+            batch_sign(db=session)
+        finally:
+            session.close()
+
+    runner = {
+        "auto_sign": scheduler.auto_sign_job,
+        "health_check": functools.partial(scheduler.health_check_job, full=True),
+        "batch_sign": run_batch_sign,
+    }[args.job]
+
+    started = time.perf_counter()
+    runner()
+    elapsed = time.perf_counter() - started
+    stats = cassette.get_stats()
+
+    print(f"cassette: {cassette.path}（{len(user_ids)} 个账号，耗时倍数 {args.time_scale}）\n")
+    print(f"{'':<12}{'上游请求':>10}{'耗时(s)':>10}")
+    print(f"{'录制':<12}{recorded['requests']:>10}{recorded['duration_s']:>10.2f}")
+    print(f"{'回放':<12}{stats['served'] + sum(stats['misses'].values()):>10}{elapsed:>10.2f}")
+    print(f"\n已回放 {stats['served']}，未使用 {stats['unused']}，未匹配 {sum(stats['misses'].values())}")
+    if stats["misses"]:
+        print("未匹配（当前版本新增的请求）:")
+        for route, count in sorted(stats["misses"].items()):
+            print(f"  {route}: {count}")
+    print("\n录制时按路径的请求数:")
+    for route, count in sorted(recorded["routes"].items()):
+        print(f"  {route}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+上游响应解析基准
+
+对比旧路径（response.text 检查挑战 + response.json() 再次解码解析）与
+流式读取路径（首块判断类型 + 原始字节一次解析）在大体积 Token/模型列表上的耗时，
+并统计每次请求被解码为文本的字节数。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_response_parsing [--tokens 2000] [--rounds 50]
+"""
+import io
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import http_response  # noqa: E402
+from app.services.http_response import read_response  # noqa: E402
+
+
+def make_response(body: bytes, content_type: str = "application/json") -> requests.Response:
+    """构造与真实请求一致的 stream 响应（未指定 charset，与上游一致）"""
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["content-type"] = content_type
+    response.raw = io.BytesIO(body)
+    response.encoding = None
+    return response
+
+
+def legacy_path(body: bytes):
+    """旧路径：整体解码检查挑战，再由 response.json() 解码并解析"""
+    response = make_response(body)
+    text = response.text
+    decoded = len(body)
+    if "acw_sc__v2" in text and "var arg1=" in text:
+        return None, decoded
+    data = response.json()
+    decoded += len(body)
+    return data, decoded
+
+
+def streaming_path(body: bytes):
+    """新路径：流式读取，首块判断类型，原始字节一次解析"""
+    upstream = read_response(make_response(body))
+    if upstream.is_challenge:
+        return None, len(upstream.body)
+    return upstream.json(), 0
+
+
+def make_tokens_payload(count: int) -> bytes:
+    tokens = [
+        {
+            "id": i,
+            "key": f"sk-{i:032d}",
+            "name": f"令牌-{i}",
+            "status": 1,
+            "remain_quota": 500000,
+            "used_quota": i * 13,
+            "unlimited_quota": False,
+            "model_limits_enabled": True,
+            "model_limits": "claude-sonnet-4,claude-opus-4,gpt-4o",
+            "created_time": 1700000000 + i,
+            "accessed_time": 1700000000 + i,
+            "expired_time": -1
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"success": True, "message": "", "data": tokens}, ensure_ascii=False).encode("utf-8")
+
+
+def run(label: str, fn, body: bytes, rounds: int):
+    decoded_total = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        data, decoded = fn(body)
+        decoded_total += decoded
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed / rounds * 1000:>9.2f} ms/次  解码 {decoded_total // rounds:>10,} 字节/次")
+    return elapsed, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上游响应解析基准")
+    parser.add_argument("--tokens", type=int, default=2000, help="Token 列表条数")
+    parser.add_argument("--rounds", type=int, default=50, help="每条路径的执行次数")
+    args = parser.parse_args()
+
+    body = make_tokens_payload(args.tokens)
+    decoder = "orjson" if http_response.orjson is not None else "json"
+    print(f"响应体 {len(body):,} 字节，{args.tokens} 个 Token，JSON 解析器: {decoder}")
+
+    legacy_time, legacy_data = run("旧路径", legacy_path, body, args.rounds)
+    new_time, new_data = run("流式路径", streaming_path, body, args.rounds)
+    assert legacy_data == new_data, "两条路径解析结果不一致"
+
+    print(f"\n加速比: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+本地 AnyRouter 模拟服务
+
+实现客户端用到的全部上游接口，用于在不访问 anyrouter.top 的情况下压测签到、健康检查与 Token 同步：
+- /console：未携带有效 acw_sc__v2 时返回挑战页（arg1 按配置的 mask / pos_list 可解）
+- /api/user/self、/api/user/sign_in（每个账号每天首次返回奖励，之后返回空消息即“已签到”）
+- /api/token/（分页，支持 {items, total, page, page_size} 与旧版列表两种格式）及增删改
+- /api/user/models、/api/user/self/groups、/api/status
+- /__mock__/stats、/__mock__/reset：查看与清空请求计数
+
+可配置响应延迟分布、错误率（返回 502 网关页）与挑战频率（携带有效 Cookie 时仍返回挑战页的概率）。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.mock_anyrouter [--port 18080] [--latency lognormal:0.08,0.5]
+                                        [--error-rate 0.01] [--challenge-rate 0.05]
+"""
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from collections import Counter
+from http.cookies import SimpleCookie
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    解析延迟分布（秒）
+
+    - fixed:0.05
+    - uniform:0.02,0.2
+    - lognormal:0.08,0.5（中位数, sigma）
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if kind == "fixed":
+        delay = values[0] if values else 0.0
+        return lambda rng: delay
+    if kind == "uniform":
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "lognormal":
+        median, sigma = values
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    raise ValueError(f"未知的延迟分布: {spec}")
+
+
+@dataclass
+class MockConfig:
+    """模拟服务配置"""
+    latency: str = "lognormal:0.05,0.5"
+    error_rate: float = 0.0
+    challenge_rate: float = 0.0
+    tokens_per_account: int = 25
+    paginated: bool = True
+    seed: Optional[int] = None
+
+
+class MockState:
+    """模拟服务的共享状态与请求计数"""
+
+    def __init__(self, config: MockConfig):
+        # 延迟导入：基准脚本需在应用读取配置前设置上游地址与数据库
+        from app.services.anyrouter import AntiCrawlerSolver
+
+        self.config = config
+        self.delay = parse_latency(config.latency)
+        self.rng = random.Random(config.seed)
+        self.arg1 = "".join(self.rng.choice("0123456789ABCDEF") for _ in range(40))
+        self.cookie = AntiCrawlerSolver(cache_size=0).solve(f"var arg1='{self.arg1}'")
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests: Counter = Counter()
+            self.challenges = 0
+            self.errors = 0
+            self.signed: set = set()
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def sample_delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.delay(self.rng))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "total": sum(self.requests.values()),
+                "challenges": self.challenges,
+                "errors": self.errors,
+                "signed": len(self.signed),
+            }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """模拟 AnyRouter 的请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Any, content_type: str = "application/json", cookies: Dict[str, str] = None):
+        data = body if isinstance(body, bytes) else (
+            json.dumps(body, ensure_ascii=False) if not isinstance(body, str) else body
+        ).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (cookies or {}).items():
+            self.send_header("Set-Cookie", f"{name}={value}; Path=/")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, data: Any, message: str = "", success: bool = True):
+        self._reply(200, {"success": success, "message": message, "data": data})
+
+    def _challenge(self):
+        html = (
+            "<html><script>var arg1='" + self.state.arg1 + "';"
+            "document.cookie='acw_sc__v2='+x;location.reload();</script></html>"
+        )
+        self._reply(200, html, "text/html; charset=utf-8")
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        parts = urlsplit(self.path)
+        path = parts.path
+        state = self.state
+
+        if path.startswith("/__mock__/"):
+            if path == "/__mock__/reset":
+                state.reset()
+            return self._reply(200, state.stats())
+
+        route = "/api/token/:id" if path.startswith("/api/token/") and path.rstrip("/") != "/api/token" else path
+        with state.lock:
+            state.requests[f"{self.command} {route}"] += 1
+
+        time.sleep(state.sample_delay())
+
+        if state.roll(state.config.error_rate):
+            with state.lock:
+                state.errors += 1
+            return self._reply(502, "<html><body>502 Bad Gateway</body></html>", "text/html")
+
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        solved = "acw_sc__v2" in cookies and cookies["acw_sc__v2"].value == state.cookie
+        if not solved or state.roll(state.config.challenge_rate):
+            with state.lock:
+                state.challenges += 1
+            return self._challenge()
+
+        if path == "/console":
+            return self._reply(200, "<html>console</html>", "text/html", cookies={"console_seen": "1"})
+        if path == "/api/status":
+            return self._json({"api_info": [
+                {"id": i, "route": f"线路{i}", "url": f"https://api{i}.example.com", "description": "", "color": "blue"}
+                for i in range(1, 4)
+            ]})
+
+        if "session" not in cookies:
+            return self._reply(401, {"success": False, "message": "未登录"})
+        user_id = self.headers.get("new-api-user") or "0"
+
+        if path == "/api/user/self":
+            return self._json({
+                "id": int(user_id), "username": f"user{user_id}", "display_name": f"用户{user_id}",
+                "quota": 500000, "used_quota": 1200, "request_count": 42, "group": "default",
+                "aff_code": f"aff{user_id}", "aff_count": 0, "aff_history_quota": 0,
+            })
+        if path == "/api/user/sign_in":
+            with state.lock:
+                first = user_id not in state.signed
+                state.signed.add(user_id)
+            return self._reply(200, {"success": True, "message": "签到成功，获得 $25 额度" if first else ""})
+        if path == "/api/user/models":
+            return self._json(["claude-sonnet-4", "claude-opus-4", "gpt-4o"])
+        if path == "/api/user/self/groups":
+            return self._json({"default": {"ratio": 1, "desc": "默认分组"}})
+        if path.rstrip("/") == "/api/token":
+            if self.command == "GET":
+                return self._tokens(int(user_id), parse_qs(parts.query))
+            return self._json(json.loads(body or b"{}"), "操作成功")
+        if path.startswith("/api/token/"):
+            return self._json(None, "删除成功" if self.command == "DELETE" else "操作成功")
+        self._reply(404, {"success": False, "message": "not found"})
+
+    def _tokens(self, user_id: int, query: Dict[str, list]):
+        page = int(query.get("p", ["0"])[0])
+        size = int(query.get("size", ["50"])[0])
+        total = self.state.config.tokens_per_account
+        start = page * size
+        items = [
+            {
+                "id": user_id * 100000 + i, "key": f"sk-{user_id:08d}{i:024d}", "name": f"令牌-{i}",
+                "status": 1, "remain_quota": 500000, "used_quota": i, "unlimited_quota": False,
+                "model_limits_enabled": False, "model_limits": "", "group": "default",
+                "created_time": 1700000000 + i, "accessed_time": 1700000000 + i, "expired_time": -1,
+            }
+            for i in range(start, min(start + size, total))
+        ]
+        if self.state.config.paginated:
+            return self._json({"items": items, "total": total, "page": page, "page_size": size})
+        return self._json(items)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+
+class _MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class MockAnyRouter:
+    """
+    在后台线程中运行的模拟服务
+
+    Example:
+        with MockAnyRouter(MockConfig(latency="fixed:0.02")) as mock:
+            ...  # 将 ANYROUTER_BASE_URL 指向 mock.url
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.state = MockState(config or MockConfig())
+        handler = type("BoundMockHandler", (MockHandler,), {"state": self.state})
+        self.server = _MockServer((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockAnyRouter":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-anyrouter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self):
+        self.state.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.state.stats()
+
+    def __enter__(self) -> "MockAnyRouter":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """模拟服务的命令行参数（供基准脚本复用）"""
+    parser.add_argument("--latency", default=MockConfig.latency, help="延迟分布: fixed:s | uniform:a,b | lognormal:中位数,sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 502 的概率")
+    parser.add_argument("--challenge-rate", type=float, default=0.0, help="携带有效 Cookie 时仍返回挑战页的概率")
+    parser.add_argument("--tokens-per-account", type=int, default=MockConfig.tokens_per_account, help="每个账号的 Token 数")
+    parser.add_argument("--legacy-token-list", action="store_true", help="Token 接口返回旧版不分页列表")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        challenge_rate=args.challenge_rate,
+        tokens_per_account=args.tokens_per_account,
+        paginated=not args.legacy_token_list,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 AnyRouter 模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockAnyRouter(config_from_args(args), args.host, args.port)
+    print(f"模拟服务已启动: {mock.url}（Ctrl+C 退出）")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
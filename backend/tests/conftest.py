@@ -0,0 +1,8 @@
+"""
+测试公共配置：在 backend 目录下运行 python -m pytest
+"""
+import sys
+from pathlib import Path
+
+# 与 benchmarks 相同，以 backend 目录为导入根
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
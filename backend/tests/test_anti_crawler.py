@@ -0,0 +1,107 @@
+"""
+AntiCrawlerSolver 与旧版逐字符实现的等价性测试
+"""
+import random
+
+import pytest
+
+from app.config import settings
+from app.services.anyrouter import AntiCrawlerSolver
+from benchmarks.bench_anti_crawler import LegacyAntiCrawlerSolver, make_challenge, random_hex
+
+MASKS = [
+    settings.anti_crawler_mask,
+    "3000176000856006061501533003690027800375",
+    # 奇数长度：末尾不成对的字符不参与异或
+    "3000176000856006061501533003690027800375a",
+    "f",
+    "",
+]
+
+POS_LISTS = [
+    settings.anti_crawler_pos_list,
+    list(range(1, 21)),
+    # 重复位置：只有首次出现取值
+    [3, 1, 3, 2, 1, 4, 4],
+    # 0 与负数位置不取值
+    [0, 2, -1, 1, 0, 3],
+    # 超出 arg1 长度的位置不取值
+    [1, 50, 2, 99, 3, 4],
+    [],
+]
+
+ARG1_VALUES = [
+    "3a2f9c1b7e4d6058a3b2c1d0e9f8a7b6c5d4e3f2",
+    "ABCDEF0123456789abcdef0123456789ABCDEF01",
+    "a",
+    "abc",
+    "0123456789",
+    # 非十六进制与含空白的输入
+    "zz12xx34yy56ww78vv90",
+    "g0123456789abcdef",
+    "ab cd ef 01 23 45 67 89",
+    " abcdef0123456789",
+    "abcdef\t0123456789",
+    "ab\ncd",
+    "+1ab-2cd",
+    "0x12ab",
+    "1_23ab",
+    "１２ab",
+]
+
+
+def assert_same(mask, pos_list, html):
+    expected = LegacyAntiCrawlerSolver(mask, pos_list).solve(html)
+    actual = AntiCrawlerSolver(mask, pos_list, cache_size=0).solve(html)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("mask", MASKS)
+@pytest.mark.parametrize("pos_list", POS_LISTS)
+@pytest.mark.parametrize("arg1", ARG1_VALUES)
+def test_matches_legacy(mask, pos_list, arg1):
+    assert_same(mask, pos_list, make_challenge(arg1))
+
+
+@pytest.mark.parametrize("html", [
+    "",
+    "<html></html>",
+    "<html><script>var arg2='abcdef';</script></html>",
+    "<html><script>var arg1='';</script></html>",
+    '<html><script>var arg1="abcdef0123";</script></html>',
+])
+def test_page_without_arg1(html):
+    assert LegacyAntiCrawlerSolver().solve(html) is None
+    assert AntiCrawlerSolver(cache_size=0).solve(html) is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_on_random_input(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        arg1 = random_hex(rng, rng.randint(1, 64))
+        assert_same(settings.anti_crawler_mask, settings.anti_crawler_pos_list, make_challenge(arg1))
+
+
+def test_cache_hit_matches_cold_solve():
+    cached = AntiCrawlerSolver(cache_size=8)
+    pages = [make_challenge(arg1) for arg1 in ARG1_VALUES[:5]]
+
+    first = [cached.solve(html) for html in pages]
+    again = [cached.solve(html) for html in pages]
+    cold = [AntiCrawlerSolver(cache_size=0).solve(html) for html in pages]
+    legacy = [LegacyAntiCrawlerSolver().solve(html) for html in pages]
+
+    assert again == first == cold == legacy
+    info = cached.cache_info()
+    assert info["hits"] == len(pages)
+    assert info["misses"] == len(pages)
+
+
+def test_cache_eviction_keeps_results():
+    solver = AntiCrawlerSolver(cache_size=2)
+    pages = [make_challenge(arg1) for arg1 in ARG1_VALUES[:4]]
+    first = [solver.solve(html) for html in pages]
+    # 容量为 2，前两项已被淘汰，重新计算的结果不变
+    assert [solver.solve(html) for html in pages] == first
+    assert solver.cache_info()["size"] == 2
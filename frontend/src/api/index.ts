@@ -88,10 +88,14 @@ export const accountApi = {
 
 // 签到 API
 export const signApi = {
-  sign: (accountId: number) => api.post(`/accounts/${accountId}/sign`),
-  batchSign: () => api.post('/sign/batch'),
+  sign: (accountId: number, force = false) => api.post(`/accounts/${accountId}/sign`, null, { params: { force } }),
+  batchSign: (force = false) => api.post('/sign/batch', null, { params: { force } }),
   getAllLogs: (params?: { page?: number; size?: number; account_id?: number; success?: boolean; start_date?: string; end_date?: string }) =>
-    api.get('/sign-logs', { params })
+    api.get('/sign-logs', { params }),
+  // 重试队列
+  getRetries: () => api.get('/sign/retries'),
+  runRetries: (accountId?: number) => api.post('/sign/retries/run', null, { params: { account_id: accountId } }),
+  deleteRetry: (accountId: number) => api.delete(`/sign/retries/${accountId}`)
 }
 
 // 推送渠道 API
@@ -103,7 +107,11 @@ export const notifyApi = {
   testChannel: (id: number) => api.post(`/notify/channels/${id}/test`),
   getAccountNotify: (accountId: number) => api.get(`/notify/accounts/${accountId}`),
   updateAccountNotify: (accountId: number, data: any) =>
-    api.put(`/notify/accounts/${accountId}`, data)
+    api.put(`/notify/accounts/${accountId}`, data),
+  // 发件箱
+  getOutbox: (params?: { status?: string; page?: number; size?: number }) =>
+    api.get('/notify/outbox', { params }),
+  retryOutbox: (id: number) => api.post(`/notify/outbox/${id}/retry`)
 }
 
 // 仪表盘 API
@@ -115,7 +123,9 @@ export const dashboardApi = {
 export const settingsApi = {
   get: () => api.get('/settings'),
   update: (data: any) => api.put('/settings', data),
-  getScheduler: () => api.get('/settings/scheduler')
+  getScheduler: () => api.get('/settings/scheduler'),
+  getSchedulerRuns: (params?: { job?: string; days?: number; limit?: number }) =>
+    api.get('/settings/scheduler/runs', { params })
 }
 
 // API 节点
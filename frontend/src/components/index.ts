@@ -1,2 +1,3 @@
 // Dashboard components
 export * from './dashboard'
+export * from './settings'
@@ -0,0 +1 @@
+export { default as JobRunChart } from './JobRunChart.vue'
@@ -138,6 +138,7 @@ export interface NotifyChannel {
   name: string
   config: Record<string, any>
   is_enabled: boolean
+  delivery_mode: 'immediate' | 'digest'
   created_at: string
   updated_at: string
 }
@@ -183,6 +184,29 @@ export interface DailyTrend {
   fail: number
 }
 
+// 调度任务运行记录
+export type JobName = 'auto_sign' | 'sign_retry' | 'health_check'
+
+export interface JobRun {
+  id: number
+  job: JobName
+  job_name: string
+  status: 'success' | 'failed'
+  started_at: string
+  finished_at: string | null
+  duration_seconds: number
+  accounts: number
+  success_count: number
+  fail_count: number
+  skip_count: number
+  upstream_calls: number
+  sleep_seconds: number
+  latency_p50_ms: number | null
+  latency_p95_ms: number | null
+  stage_seconds: Record<string, number>
+  error: string | null
+}
+
 // 统计相关类型
 export interface StatisticsOverview {
   total_accounts: number
@@ -223,9 +247,17 @@ export interface SystemSettings {
   auto_sign_time: string
   health_check_enabled: boolean
   health_check_interval: number
+  health_check_batch_size: number
   sign_retry_enabled: boolean
   sign_max_retries: number
   sign_retry_interval: number
+  sign_prewarm_enabled: boolean
+  sign_prewarm_minutes: number
+  sign_engine_mode: 'thread' | 'async'
+  sign_concurrency: number
+  sign_window_minutes: number
+  sign_wave_size: number
+  sign_jitter_seconds: number
 }
 
 // 审计日志相关类型